@@ -0,0 +1,113 @@
+import time
+from array import array
+
+class WindowAggregator:
+    """Agregados deslizantes (mín/máx/média/último) por sinal numérico
+    
+    Cada janela é dividida em BUCKETS baldes de duração fixa guardados em
+    arrays pré-alocados; uma amostra atualiza só o balde corrente de cada
+    janela (O(1) por frame, sem alocação). A consulta combina os baldes
+    ainda dentro da janela, que cobre entre BUCKETS - 1 e BUCKETS baldes.
+    """
+    
+    WINDOWS = (1, 10, 60)    # Segundos
+    BUCKETS = 10             # Baldes por janela
+    
+    def __init__(self, decoder):
+        # Só sinais numéricos: textuais não têm média
+        self.index = {}
+        for name, _, _ in decoder.SIGNALS:
+            if name not in decoder.ENUMS:
+                self.index[name] = len(self.index)
+        self.last = array('f', bytes(4 * len(self.index)))
+        
+        size = len(self.index) * self.BUCKETS
+        self.windows = []
+        for seconds in self.WINDOWS:
+            self.windows.append((
+                seconds,
+                seconds * 1000 // self.BUCKETS,   # Duração do balde (ms)
+                array('f', bytes(4 * size)),      # mínimo
+                array('f', bytes(4 * size)),      # máximo
+                array('f', bytes(4 * size)),      # soma
+                array('I', bytes(4 * size)),      # amostras
+                array('i', [-1] * size)           # época do balde
+            ))
+        
+        # Relógio em ms sem overflow: ticks_ms dá a volta em poucos dias
+        self._ticks = time.ticks_ms()
+        self._ms = 0
+    
+    def now(self):
+        """Milissegundos desde a criação do agregador (só a aquisição avança)"""
+        ticks = time.ticks_ms()
+        self._ms += time.ticks_diff(ticks, self._ticks)
+        self._ticks = ticks
+        return self._ms
+    
+    def update(self, name, value, now=None):
+        """Acumula uma amostra do sinal no balde corrente de cada janela"""
+        i = self.index.get(name)
+        if i is None:
+            return
+        if now is None:
+            now = self.now()
+        self.last[i] = value
+        base = i * self.BUCKETS
+        for _, width, mins, maxs, sums, counts, epochs in self.windows:
+            epoch = now // width
+            b = base + epoch % self.BUCKETS
+            if epochs[b] != epoch:
+                epochs[b] = epoch
+                mins[b] = maxs[b] = sums[b] = value
+                counts[b] = 1
+            else:
+                if value < mins[b]:
+                    mins[b] = value
+                elif value > maxs[b]:
+                    maxs[b] = value
+                sums[b] += value
+                counts[b] += 1
+    
+    def query(self, seconds, names=None):
+        """Retorna {sinal: {min, max, mean, last, count}} da janela pedida
+        
+        Sinais sem amostras na janela ficam de fora. Levanta ValueError se
+        a janela não for uma das configuradas.
+        """
+        for window in self.windows:
+            if window[0] == seconds:
+                break
+        else:
+            raise ValueError(f'Janela inválida: {seconds}')
+        _, width, mins, maxs, sums, counts, epochs = window
+        
+        # Leitura sem avançar o relógio, que pertence à thread de aquisição
+        current = (self._ms + time.ticks_diff(time.ticks_ms(), self._ticks)) // width
+        oldest = current - self.BUCKETS + 1
+        result = {}
+        for name in names or self.index:
+            i = self.index.get(name)
+            if i is None:
+                continue
+            lo = hi = total = None
+            count = 0
+            for b in range(i * self.BUCKETS, (i + 1) * self.BUCKETS):
+                if epochs[b] < oldest or not counts[b]:
+                    continue
+                if count == 0:
+                    lo, hi, total = mins[b], maxs[b], sums[b]
+                else:
+                    lo = min(lo, mins[b])
+                    hi = max(hi, maxs[b])
+                    total += sums[b]
+                count += counts[b]
+            if count:
+                result[name] = {
+                    'min': round(lo, 3),
+                    'max': round(hi, 3),
+                    'mean': round(total / count, 3),
+                    'last': round(self.last[i], 3),
+                    'count': count
+                }
+        return result
@@ -0,0 +1,83 @@
+import time
+import json
+
+class BootProfile:
+    """Tempos das fases do boot, medidos com ticks_us
+    
+    Criado na importação por `main.py`, antes dos outros módulos: o início
+    de main é o instante zero e `main_us` guarda os µs desde o reset
+    (boot do MicroPython e boot.py). Cada fase marca uma vez os µs desde o
+    início; marcas depois de WINDOW_MS são ignoradas (ticks_us dá a volta
+    em ~17 min). `mark` só grava na RAM e escreve no console serial; a
+    gravação na flash (últimos MAX_BOOTS boots) fica para `save_if_due`,
+    chamado com o servidor ocioso.
+    """
+    
+    PROFILE_FILE = 'boot_profile.json'
+    MAX_BOOTS = 10
+    WINDOW_MS = 300000
+    
+    def __init__(self):
+        self.start = time.ticks_us()
+        self.phases = []    # [nome, µs desde o início de main]
+        self.history = []   # Boots anteriores, do mais antigo para o mais recente
+        self.boot = 1
+        self._dirty = False
+        self._load()
+    
+    def _load(self):
+        """Carrega os boots anteriores da flash"""
+        try:
+            with open(self.PROFILE_FILE) as f:
+                self.history = json.load(f)[-(self.MAX_BOOTS - 1):]
+        except (OSError, ValueError):
+            self.history = []
+        if self.history:
+            self.boot = self.history[-1].get('boot', 0) + 1
+    
+    def mark(self, name):
+        """Registra o fim de uma fase (só a primeira marca de cada nome vale)"""
+        elapsed = time.ticks_diff(time.ticks_us(), self.start)
+        if elapsed > self.WINDOW_MS * 1000:
+            return
+        phases = self.phases
+        for phase in phases:
+            if phase[0] == name:
+                return
+        previous = phases[-1][1] if phases else 0
+        phases.append([name, elapsed])
+        self._dirty = True
+        print('[boot] %-12s +%8.1f ms  %9.1f ms' % (name, (elapsed - previous) / 1000, elapsed / 1000))
+    
+    def current(self):
+        """Boot atual no formato gravado"""
+        return {'boot': self.boot, 'main_us': self.start, 'phases': list(self.phases)}
+    
+    def save_if_due(self):
+        """Grava o histórico se houve fase nova desde a última gravação"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            with open(self.PROFILE_FILE, 'w') as f:
+                json.dump(self.history + [self.current()], f)
+        except OSError as e:
+            print(f'Erro ao gravar perfil de boot: {e}')
+    
+    def status(self):
+        """Boot atual e anteriores (/boot)"""
+        return {'current': self.current(), 'history': self.history}
+
+_profile = BootProfile()
+
+def mark(name):
+    """Marca o fim de uma fase do boot atual"""
+    _profile.mark(name)
+
+def save_if_due():
+    """Grava as fases novas na flash (chamar fora da aquisição)"""
+    _profile.save_if_due()
+
+def status():
+    """Boot atual e anteriores"""
+    return _profile.status()
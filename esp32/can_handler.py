@@ -1,10 +1,46 @@
 from machine import Pin, SPI
 import time
-from logger import Logger
+import _thread
+from logger import get_logger
+from frame_buffer import FrameBuffer
+from j1939_decoder import J1939Decoder
+from aggregates import WindowAggregator
+from latest_values import LatestValues
+import clock
+from metrics import Histogram
+import boot_profile
 
 class CANHandler:
+    # Aquisição
+    POLL_INTERVAL_MS = 1     # Intervalo entre leituras do controlador
+    LATE_POLL_MS = 5         # Intervalo a partir do qual o controlador pode perder frames
+    SIM_INTERVAL_MS = 100    # Intervalo entre frames simulados
+    
+    # Limites (µs) dos histogramas exportados em /metrics
+    LOOP_BUCKETS_US = (1000, 1500, 2000, 3000, 5000, 10000, 20000, 50000, 100000)
+    DECODE_BUCKETS_US = (50, 100, 200, 500, 1000, 2000, 5000)
+    
+    # Publicação por exceção: sinal -> (banda absoluta, banda em % do último
+    # valor publicado, intervalo mínimo ms, intervalo máximo ms). Mudanças
+    # dentro da banda só são publicadas após o intervalo máximo (0 = nunca);
+    # nenhuma mudança é publicada antes do intervalo mínimo.
+    PUBLISH = {
+        'engine_speed': (5, 0, 100, 5000),
+        'engine_temp': (0.5, 0, 0, 10000),
+        'coolant_level': (1, 0, 0, 30000),
+        'oil_level': (1, 0, 0, 30000),
+        'transmission_speed': (0.1, 0, 100, 5000),
+        'hydraulic_pressure': (0, 1, 100, 5000),
+        'hydraulic_flow': (0, 1, 100, 5000),
+        'hydraulic_temp': (0.5, 0, 0, 10000),
+        'implement_load': (0, 1, 100, 5000),
+        'fuel_consumption': (0.1, 0, 500, 10000),
+        'fuel_level': (1, 0, 0, 30000),
+        'vehicle_speed': (0.1, 0, 100, 5000),
+    }
+    
     def __init__(self, spi=None, cs=None):
-        self.logger = Logger()
+        self.logger = get_logger()
         if spi is None:
             # Configuração padrão do SPI
             spi = SPI(1, baudrate=10000000, polarity=0, phase=0)
@@ -15,6 +51,48 @@ class CANHandler:
         self.spi = spi
         self.cs = cs
         
+        # Buffer circular de frames brutos
+        self.frames = FrameBuffer()
+        self._running = False
+        self._last_sim = time.ticks_ms()
+        
+        # Atrasos da aquisição (carga do servidor não pode causar perdas)
+        self.max_gap_ms = 0
+        self.late_polls = 0
+        self._first_frame = True   # Marca o primeiro frame no perfil de boot
+        self.loop_period = Histogram(
+            'jd_acq_loop_period_seconds', 'Intervalo entre leituras do controlador CAN',
+            self.LOOP_BUCKETS_US)
+        self.decode_time = Histogram(
+            'jd_can_decode_seconds', 'Tempo para gravar e decodificar um frame',
+            self.DECODE_BUCKETS_US)
+        
+        # Estado de trabalho da aquisição (só a thread de aquisição acessa):
+        # últimos valores decodificados por sinal
+        self.decoder = J1939Decoder()
+        self._signals = {}
+        
+        # Versão dos dados: incrementa quando algum sinal muda de valor e
+        # cada sinal guarda a versão da sua última mudança
+        self._version = 0
+        self._signal_versions = {}
+        
+        # Endereço de origem (ECU) do último valor de cada sinal
+        self._signal_sources = {}
+        
+        # Cópia publicada para o lado da rede, lida sem lock
+        self.latest = LatestValues()
+        
+        # Regras de publicação só para sinais numéricos, e instante (ms do
+        # relógio dos agregados) da última publicação de cada sinal
+        self.publish_rules = {name: rule for name, rule in self.PUBLISH.items()
+                              if name not in self.decoder.ENUMS}
+        self.published_at = {}
+        self.suppressed = 0
+        
+        # Mín/máx/média por janela, atualizados a cada frame decodificado
+        self.aggregates = WindowAggregator(self.decoder)
+        
     def init_can(self):
         """Inicializa interface CAN"""
         try:
@@ -31,13 +109,143 @@ class CANHandler:
         # Implementar configuração do MCP2515
         pass
         
+    def poll(self):
+        """Lê frames pendentes do controlador para o buffer circular"""
+        # Simulação de dados para teste: EEC1 (prioridade 3, origem 0)
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._last_sim) < self.SIM_INTERVAL_MS:
+            return 0
+        self._last_sim = now
+        self.store_frame((3 << 26) | (61444 << 8), bytes(8), now)
+        return 1
+        
+    def store_frame(self, can_id, data, timestamp=None):
+        """Grava frame no buffer circular e atualiza os sinais decodificados
+        
+        Todo valor alimenta os agregados, mas só entra nos sinais (e muda
+        a versão) se passar pela regra de publicação do sinal. Mudanças são
+        publicadas de uma vez em `latest` ao fim do frame.
+        """
+        start = time.ticks_us()
+        if timestamp is None:
+            timestamp = time.ticks_ms()
+        self.frames.append(can_id, data, timestamp)
+        if self._first_frame:
+            self._first_frame = False
+            boot_profile.mark('first_frame')
+        decoded = self.decoder.decode_message(can_id, data)
+        if decoded:
+            changed = False
+            now = self.aggregates.now()
+            signals = self._signals
+            for name, value in decoded.items():
+                if name == 'unit':
+                    continue
+                self.aggregates.update(name, value, now)
+                last = signals.get(name)
+                if last == value:
+                    continue
+                rule = self.publish_rules.get(name)
+                if rule is not None and last is not None:
+                    elapsed = now - self.published_at.get(name, 0)
+                    if not self._significant(rule, last, value, elapsed):
+                        self.suppressed += 1
+                        continue
+                if not changed:
+                    self._version += 1
+                    changed = True
+                signals[name] = value
+                self._signal_versions[name] = self._version
+                self._signal_sources[name] = can_id & 0xFF
+                self.published_at[name] = now
+            if changed:
+                self.latest.publish(self._version, signals, self._signal_versions,
+                                    self._signal_sources, timestamp)
+        self.decode_time.observe(time.ticks_diff(time.ticks_us(), start))
+    
+    @staticmethod
+    def _significant(rule, last, value, elapsed):
+        """Verifica se a mudança deve ser publicada segundo a regra do sinal"""
+        band, percent, min_interval, max_interval = rule
+        if elapsed < min_interval:
+            return False
+        if max_interval and elapsed >= max_interval:
+            return True
+        return abs(value - last) > max(band, abs(last) * percent / 100)
+    
+    def start_acquisition(self):
+        """Inicia thread de aquisição que alimenta o buffer de frames"""
+        if not self._running:
+            self._running = True
+            _thread.start_new_thread(self._acquisition_loop, ())
+    
+    def stop_acquisition(self):
+        """Para thread de aquisição"""
+        self._running = False
+    
+    def _acquisition_loop(self):
+        """Loop de aquisição de frames"""
+        self.logger.info('can', 'Aquisição iniciada')
+        last = time.ticks_us()
+        while self._running:
+            now = time.ticks_us()
+            gap_us = time.ticks_diff(now, last)
+            last = now
+            self.loop_period.observe(gap_us)
+            gap = gap_us // 1000
+            if gap > self.max_gap_ms:
+                self.max_gap_ms = gap
+            if gap >= self.LATE_POLL_MS:
+                self.late_polls += 1
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.error('can', f'Erro na aquisição: {e}')
+            time.sleep_ms(self.POLL_INTERVAL_MS)
+    
     def read_message(self):
         """Lê mensagem do barramento CAN"""
-        # Simulação de dados para teste
+        if not self._running:
+            self.poll()
+        if not self.frames.seq:
+            return None
+        
+        _, can_id, _, data = self.frames.unpack(self.frames.seq - 1)
         return {
-            'pgn': 61444,  # Electronic Engine Controller 1
-            'source': 0,
-            'priority': 3,
-            'timestamp': time.time(),
-            'data': [0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
-        } 
\ No newline at end of file
+            'pgn': (can_id >> 8) & 0x1FFFF,
+            'source': can_id & 0xFF,
+            'priority': (can_id >> 26) & 0x07,
+            'timestamp': clock.unix(),
+            'data': list(data)
+        }
+        
+    @property
+    def version(self):
+        """Versão dos sinais publicados"""
+        return self.latest.version
+        
+    def read_state(self):
+        """Retorna cópia consistente (versão, sinais, versões, origens, ticks)
+        
+        `ticks` é (ticks_ms do frame no barramento, ticks_ms da publicação)
+        da última mudança, para medir a latência até o cliente.
+        """
+        if not self._running:
+            self.poll()
+        return self.latest.read()
+        
+    def read_signals(self, since=None):
+        """Retorna (versão, cópia dos últimos valores decodificados, ticks)
+        
+        Com `since`, apenas os sinais alterados depois dessa versão.
+        """
+        version, signals, versions, _, ticks = self.read_state()
+        if since is not None:
+            signals = {name: value for name, value in signals.items()
+                       if versions[name] > since}
+        return version, signals, ticks
+        
+    def snapshot(self):
+        """Retorna (versão dos sinais, última mensagem bruta)"""
+        msg = self.read_message()
+        return self.version, msg
@@ -0,0 +1,89 @@
+import time
+import _thread
+from logger import get_logger
+
+try:
+    import ntptime
+except ImportError:
+    ntptime = None
+
+# Segundos entre a época Unix e a do MicroPython (2000-01-01 no ESP32)
+EPOCH_OFFSET = 946684800 if time.gmtime(0)[0] == 2000 else 0
+
+# time.ticks_ms dá a volta a cada TICKS_PERIOD ms
+TICKS_PERIOD = time.ticks_add(0, -1) + 1
+
+def unix():
+    """Segundos desde 1970-01-01 UTC (só é real após sincronizar o RTC)"""
+    return time.time() + EPOCH_OFFSET
+
+def unix_ms():
+    """Milissegundos desde 1970-01-01 UTC"""
+    return time.time_ns() // 1000000 + EPOCH_OFFSET * 1000
+
+class Clock:
+    """Sincroniza o RTC por SNTP em segundo plano
+    
+    O RTC começa em 2000-01-01 a cada boot. Sem internet, NTP_HOSTS pode
+    apontar para um servidor local (ex.: o notebook que roda o app). Mesmo
+    sem sincronizar, o host estima o deslocamento dos ticks por /time.
+    """
+    
+    NTP_HOSTS = ('pool.ntp.org',)
+    NTP_TIMEOUT = 1          # Segundos por tentativa
+    RESYNC_INTERVAL = 3600   # Segundos entre sincronizações
+    RETRY_INTERVAL = 60      # Segundos até tentar de novo após falha
+    
+    def __init__(self):
+        self.logger = get_logger()
+        self.synced = False
+        self.host = None
+        self._running = False
+    
+    def sync(self):
+        """Ajusta o RTC pelo primeiro servidor SNTP que responder"""
+        if ntptime is None:
+            return False
+        ntptime.timeout = self.NTP_TIMEOUT
+        for host in self.NTP_HOSTS:
+            ntptime.host = host
+            try:
+                before = unix()
+                ntptime.settime()
+            except Exception as e:
+                self.logger.debug('clock', 'SNTP %s não respondeu: %s', host, e)
+                continue
+            self.synced = True
+            self.host = host
+            self.logger.info('clock', f'Relógio sincronizado com {host} (ajuste de {unix() - before} s)')
+            return True
+        self.logger.warning('clock', 'Falha ao sincronizar relógio por SNTP')
+        return False
+    
+    def start(self):
+        """Inicia thread de sincronização periódica"""
+        if not self._running:
+            self._running = True
+            _thread.start_new_thread(self._sync_loop, ())
+    
+    def stop(self):
+        """Para thread de sincronização"""
+        self._running = False
+    
+    def _sync_loop(self):
+        """Sincroniza e aguarda o próximo intervalo"""
+        while self._running:
+            interval = self.RESYNC_INTERVAL if self.sync() else self.RETRY_INTERVAL
+            deadline = time.ticks_add(time.ticks_ms(), interval * 1000)
+            while self._running and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+                time.sleep(1)
+    
+    def status(self):
+        """Relógio do dispositivo para estimativa de deslocamento pelo host"""
+        return {
+            'ticks': time.ticks_ms(),
+            'ticks_period': TICKS_PERIOD,
+            'unix_ms': unix_ms(),
+            'synced': self.synced,
+            'ntp_host': self.host
+        }
@@ -0,0 +1,75 @@
+import struct
+import time
+
+class FrameBuffer:
+    """Buffer circular de frames CAN brutos com número de sequência
+    
+    Os frames ficam empacotados num bytearray pré-alocado, no mesmo
+    layout binário enviado aos clientes, evitando alocação por frame.
+    
+    Produtor único sem lock: só a thread de aquisição chama `append`, que
+    grava o registro e só então avança `seq`, o único índice compartilhado.
+    Cada leitor mantém o próprio cursor e nunca escreve no buffer, então a
+    aquisição não espera por nenhum consumidor.
+    """
+    
+    # timestamp (ms), ID 29 bits, DLC, dados
+    RECORD = '<IIB8s'
+    RECORD_SIZE = 17
+    
+    # Registros mais antigos tratados como já perdidos: o produtor pode
+    # sobrescrevê-los enquanto um leitor ainda os copia
+    GUARD = 32
+    
+    def __init__(self, size=512):
+        self.size = size
+        self.buf = bytearray(size * self.RECORD_SIZE)
+        self.seq = 0  # Sequência do próximo frame (total já gravado)
+    
+    def append(self, can_id, data, timestamp=None):
+        """Grava frame no buffer, sobrescrevendo o mais antigo se cheio"""
+        if timestamp is None:
+            timestamp = time.ticks_ms()
+        offset = (self.seq % self.size) * self.RECORD_SIZE
+        struct.pack_into(self.RECORD, self.buf, offset,
+                         timestamp & 0xFFFFFFFF, can_id & 0x1FFFFFFF,
+                         len(data), bytes(data))
+        self.seq += 1
+    
+    def oldest(self):
+        """Sequência do frame mais antigo que pode ser lido com segurança"""
+        return max(0, self.seq - self.size + self.GUARD)
+    
+    def record(self, seq):
+        """Retorna memoryview do registro empacotado da sequência"""
+        offset = (seq % self.size) * self.RECORD_SIZE
+        return memoryview(self.buf)[offset:offset + self.RECORD_SIZE]
+    
+    def unpack(self, seq):
+        """Retorna (timestamp, can_id, dlc, dados) da sequência"""
+        ts, can_id, dlc, data = struct.unpack_from(
+            self.RECORD, self.buf, (seq % self.size) * self.RECORD_SIZE)
+        return ts, can_id, dlc, data[:dlc]
+    
+    def pgn(self, seq):
+        """Extrai o PGN do frame sem desempacotar o registro inteiro"""
+        can_id = struct.unpack_from('<I', self.buf, (seq % self.size) * self.RECORD_SIZE + 4)[0]
+        return (can_id >> 8) & 0x1FFFF
+    
+    def read_into(self, since, out, max_count, pgns=None):
+        """Copia frames a partir de `since` para `out`, opcionalmente filtrando por PGN
+        
+        Retorna (próxima sequência, quantidade copiada, houve perda).
+        """
+        overrun = since < self.oldest()
+        seq = max(since, self.oldest())
+        end = self.seq
+        count = 0
+        pos = 0
+        while seq < end and count < max_count:
+            if pgns is None or self.pgn(seq) in pgns:
+                out[pos:pos + self.RECORD_SIZE] = self.record(seq)
+                pos += self.RECORD_SIZE
+                count += 1
+            seq += 1
+        return seq, count, overrun
@@ -1,6 +1,37 @@
 class J1939Decoder:
     """Decodificador de mensagens J1939 para implementos John Deere"""
     
+    # Estados codificados como texto
+    TRANSMISSION_MODES = ['Manual', 'Auto', 'PowrShift', 'IVT']
+    IMPLEMENT_STATES = ['Desligado', 'Ligado', 'Erro', 'Manutenção']
+    
+    # Esquema de sinais decodificados: o índice é o ID estável usado no
+    # formato binário. Novos sinais entram sempre no final da tupla.
+    SIGNALS = (
+        ('engine_speed', 0xF004, 'RPM'),
+        ('engine_temp', 0xFEF2, '°C'),
+        ('coolant_level', 0xFEF3, '%'),
+        ('oil_level', 0xFEF3, '%'),
+        ('gear', 0xF005, None),
+        ('mode', 0xF005, None),
+        ('transmission_speed', 0xFEF5, 'km/h'),
+        ('hydraulic_pressure', 0xFE80, 'bar'),
+        ('hydraulic_flow', 0xFE81, 'L/min'),
+        ('hydraulic_temp', 0xFE82, '°C'),
+        ('implement_status', 0xFE0F, None),
+        ('implement_position', 0xFE10, '%'),
+        ('implement_load', 0xFE11, 'kg'),
+        ('fuel_consumption', 0xFEF1, 'L/h'),
+        ('fuel_level', 0xFEE9, '%'),
+        ('vehicle_speed', 0xFEFC, 'km/h'),
+    )
+    
+    # Sinais textuais e seus valores possíveis (enviados como índice)
+    ENUMS = {
+        'mode': TRANSMISSION_MODES,
+        'implement_status': IMPLEMENT_STATES,
+    }
+    
     def __init__(self):
         # Dicionário de PGNs suportados
         self.pgns = {
@@ -88,7 +119,7 @@ class J1939Decoder:
         """Decodifica estado da transmissão"""
         gear = data[0] & 0x0F
         mode = (data[0] >> 4) & 0x0F
-        modes = ['Manual', 'Auto', 'PowrShift', 'IVT']
+        modes = self.TRANSMISSION_MODES
         return {
             'gear': gear,
             'mode': modes[mode] if mode < len(modes) else 'Unknown'
@@ -129,7 +160,7 @@ class J1939Decoder:
     def _decode_implement_status(self, data):
         """Decodifica status do implemento"""
         status = data[0] & 0x0F
-        states = ['Desligado', 'Ligado', 'Erro', 'Manutenção']
+        states = self.IMPLEMENT_STATES
         return {
             'implement_status': states[status] if status < len(states) else 'Unknown'
         }
@@ -253,6 +284,16 @@ class J1939Decoder:
         }
     }
 
+    def get_schema(self):
+        """Retorna esquema de sinais (ID, nome, PGN, unidade, valores textuais)"""
+        schema = []
+        for signal_id, (name, pgn, unit) in enumerate(self.SIGNALS):
+            entry = {'id': signal_id, 'name': name, 'pgn': pgn, 'unit': unit}
+            if name in self.ENUMS:
+                entry['enum'] = self.ENUMS[name]
+            schema.append(entry)
+        return schema
+        
     def get_unit(self, parameter):
         """Retorna unidade de medida"""
         try:
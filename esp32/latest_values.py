@@ -0,0 +1,44 @@
+import time
+
+class LatestValues:
+    """Últimos valores decodificados publicados em buffer duplo, sem lock
+    
+    Só a thread de aquisição escreve: atualiza o buffer de trás e publica
+    incrementando `gen`, cuja paridade indica o buffer da frente. Leitores
+    copiam a frente e repetem se `gen` mudou durante a cópia, pois o
+    escritor pode ter passado a reutilizar aquele buffer (seqlock).
+    """
+    
+    def __init__(self):
+        # Cada buffer: [versão, sinais, versão de cada sinal, ECU de origem,
+        # (ticks_ms do frame no barramento, ticks_ms da publicação)]
+        self._buffers = ([0, {}, {}, {}, (0, 0)], [0, {}, {}, {}, (0, 0)])
+        self.gen = 0
+    
+    @property
+    def version(self):
+        """Versão publicada mais recente"""
+        return self._buffers[self.gen & 1][0]
+    
+    def publish(self, version, signals, versions, sources, bus_ticks):
+        """Copia o estado de trabalho da aquisição para o buffer de trás e o publica
+        
+        Os dicionários de trabalho só ganham chaves, então `update` deixa o
+        buffer de trás idêntico a eles sem alocar após o aquecimento.
+        """
+        back = self._buffers[(self.gen + 1) & 1]
+        back[0] = version
+        back[1].update(signals)
+        back[2].update(versions)
+        back[3].update(sources)
+        back[4] = (bus_ticks, time.ticks_ms())
+        self.gen += 1
+    
+    def read(self):
+        """Retorna cópia consistente (versão, sinais, versões, origens, ticks)"""
+        while True:
+            gen = self.gen
+            front = self._buffers[gen & 1]
+            state = (front[0], dict(front[1]), dict(front[2]), dict(front[3]), front[4])
+            if self.gen == gen:
+                return state
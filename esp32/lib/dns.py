@@ -1,98 +1,118 @@
 import socket
 import select
-import os
+import struct
 
 class DNSServer:
-    """Servidor DNS simples para captive portal"""
+    """Servidor DNS simples para captive portal
     
-    def __init__(self):
+    Consultas A/IN de qualquer nome são respondidas com o IP do ESP32.
+    Outros tipos (AAAA, HTTPS, PTR...) recebem resposta vazia (NOERROR sem
+    registros): o cliente usa o A, o que não acontece com NXDOMAIN, que
+    marca o nome inteiro como inexistente.
+    
+    A resposta é montada num buffer alocado uma vez: ID, flags e pergunta
+    copiados da consulta e o registro A fixo logo depois da pergunta.
+    """
+    
+    PORT = 53
+    TTL = 60                 # Segundos
+    POLL_TIMEOUT_MS = 500    # Intervalo para perceber `stop()`
+    MAX_PACKET = 512         # DNS sobre UDP sem EDNS
+    
+    # Códigos de resposta
+    FORMERR = 1
+    NOTIMP = 4
+    
+    # QDCOUNT, ANCOUNT, NSCOUNT, ARCOUNT
+    COUNTS_ANSWER = b'\x00\x01\x00\x01\x00\x00\x00\x00'
+    COUNTS_EMPTY = b'\x00\x01\x00\x00\x00\x00\x00\x00'
+    COUNTS_NONE = bytes(8)
+    
+    def __init__(self, ip='192.168.4.1'):
         self.sock = None
         self.running = False
-        
+        self._reply = bytearray(self.MAX_PACKET + 16)
+        self._view = memoryview(self._reply)
+        # Registro A: ponteiro para o nome da pergunta, tipo A, classe IN, TTL, tamanho, IP
+        self._answer = struct.pack('>HHHIH', 0xC00C, 1, 1, self.TTL, 4) + \
+                       bytes(int(part) for part in ip.split('.'))
+    
     def start(self):
-        """Inicia o servidor DNS"""
+        """Inicia o servidor DNS (bloqueia até `stop()`)"""
         try:
             # Cria socket UDP
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock = self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('0.0.0.0', self.PORT))
             
-            # Força bind na porta 53
-            try:
-                self.sock.bind(('0.0.0.0', 53))
-            except:
-                os.umount('/dns_port')  # Libera porta 53 se necessário
-                self.sock.bind(('0.0.0.0', 53))
-                
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
             self.running = True
             
-            # Loop principal com timeout curto
+            # Espera no poll: sem consultas a thread não ocupa a CPU
             while self.running:
+                if not poller.poll(self.POLL_TIMEOUT_MS):
+                    continue
                 try:
-                    data, addr = self.sock.recvfrom(1024)
-                    response = self._build_response(data)
-                    if response:
-                        self.sock.sendto(response, addr)
-                except:
-                    pass
-                    
+                    data, addr = sock.recvfrom(self.MAX_PACKET)
+                    size = self._build_response(data)
+                    if size:
+                        sock.sendto(self._view[:size], addr)
+                except OSError as e:
+                    if self.running:
+                        print(f'Erro ao processar requisição DNS: {e}')
+        
         except Exception as e:
-            print(f'Erro no servidor DNS: {e}')
+            if self.running:
+                print(f'Erro no servidor DNS: {e}')
+        finally:
             self.stop()
-            
+    
     def stop(self):
         """Para o servidor DNS"""
         self.running = False
         if self.sock:
             self.sock.close()
             self.sock = None
-            
-    def _handle_request(self):
-        """Processa uma requisição DNS"""
-        try:
-            # Recebe dados
-            data, addr = self.sock.recvfrom(1024)
-            
-            # Monta resposta redirecionando para IP local
-            response = self._build_response(data)
-            
-            # Envia resposta
-            if response:
-                self.sock.sendto(response, addr)
-                
-        except Exception as e:
-            print(f'Erro ao processar requisição DNS: {e}')
-            
+    
     def _build_response(self, data):
-        """Monta pacote de resposta DNS"""
-        try:
-            # Cabeçalho DNS
-            header = data[:12]
-            
-            # Modifica flags
-            flags = bytearray(header[2:4])
-            flags[0] |= 0x80  # QR=1 (resposta)
-            flags[0] &= 0x7f  # RCODE=0 (sem erro)
-            flags[1] &= 0x7f  # RA=0
-            
-            # Monta resposta
-            response = bytearray(header[:2] + flags + header[4:])
-            response[7] = 1  # ANCOUNT=1
-            
-            # Adiciona query original
-            response.extend(data[12:])
-            
-            # Adiciona resposta apontando para 192.168.4.1
-            response.extend(b'\xc0\x0c')  # Ponteiro para nome
-            response.extend(b'\x00\x01')  # TYPE=A
-            response.extend(b'\x00\x01')  # CLASS=IN
-            response.extend(b'\x00\x00\x00\x3c')  # TTL=60s
-            response.extend(b'\x00\x04')  # RDLENGTH=4
-            
-            # IP 192.168.4.1 em bytes
-            response.extend(bytes([192, 168, 4, 1]))
-            
-            return response
-            
-        except Exception as e:
-            print(f'Erro ao montar resposta DNS: {e}')
-            return None 
\ No newline at end of file
+        """Monta a resposta em `_reply`; retorna o tamanho (0 = ignorar)"""
+        size = len(data)
+        if size < 12 or data[2] & 0x80:
+            return 0  # Curto demais ou não é consulta
+        
+        view = self._view
+        view[0:2] = data[0:2]                          # ID
+        self._reply[2] = 0x84 | (data[2] & 0x79)       # QR, AA; opcode e RD da consulta
+        
+        # Só consultas padrão (opcode 0) com uma pergunta
+        if data[2] & 0x78:
+            return self._header_only(self.NOTIMP)
+        if data[4] != 0 or data[5] != 1:
+            return self._header_only(self.FORMERR)
+        
+        # Fim do nome (rótulos sem compressão) + tipo e classe
+        pos = 12
+        while pos < size:
+            length = data[pos]
+            if length == 0 or length & 0xC0:
+                break
+            pos += length + 1
+        if pos >= size or data[pos] != 0 or pos + 5 > size:
+            return self._header_only(self.FORMERR)
+        end = pos + 5
+        
+        self._reply[3] = 0                             # RA=0, NOERROR
+        view[12:end] = data[12:end]                    # Pergunta
+        if data[pos + 1:end] == b'\x00\x01\x00\x01':   # A, IN
+            view[4:12] = self.COUNTS_ANSWER
+            view[end:end + 16] = self._answer
+            return end + 16
+        view[4:12] = self.COUNTS_EMPTY
+        return end
+    
+    def _header_only(self, rcode):
+        """Resposta de erro só com o cabeçalho"""
+        self._reply[3] = rcode
+        self._view[4:12] = self.COUNTS_NONE
+        return 12
@@ -1,4 +1,148 @@
-# Baixar de: https://github.com/miguelgrinberg/microdot 
+# Baixar de: https://github.com/miguelgrinberg/microdot
+
+import json
+
+# Textos de status usados nas respostas
+STATUS_TEXT = {
+    200: 'OK',
+    204: 'No Content',
+    206: 'Partial Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    408: 'Request Timeout',
+    413: 'Payload Too Large',
+    416: 'Range Not Satisfiable',
+    429: 'Too Many Requests',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+
+class HTTPError(Exception):
+    """Erro HTTP com código de status"""
+    def __init__(self, status, message=None):
+        super().__init__(message or STATUS_TEXT.get(status, 'Error'))
+        self.status = status
+        self.message = message or STATUS_TEXT.get(status, 'Error')
+
+def unquote(value):
+    """Decodifica valor de query string (%XX e '+')"""
+    value = value.replace('+', ' ')
+    if '%' not in value:
+        return value
+    parts = value.split('%')
+    out = bytearray(parts[0].encode())
+    for part in parts[1:]:
+        try:
+            out.append(int(part[:2], 16))
+            out.extend(part[2:].encode())
+        except ValueError:
+            out.extend(('%' + part).encode())
+    return out.decode()
+
+class Request:
+    """Requisição HTTP lida de forma incremental do socket"""
+    
+    # Limites para não esgotar a RAM com requisições malformadas
+    MAX_HEADER = 2048
+    MAX_BODY = 4096
+    RECV_SIZE = 512
+    
+    def __init__(self, method, target, headers, body=b'', version='HTTP/1.1'):
+        self.method = method
+        self.target = target
+        self.path, _, qs = target.partition('?')
+        self.query = {}
+        for pair in qs.split('&'):
+            if pair:
+                key, _, value = pair.partition('=')
+                self.query[unquote(key)] = unquote(value)
+        self.headers = headers
+        self.body = body
+        
+        # HTTP/1.1 mantém a conexão por padrão; HTTP/1.0 só se pedir
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            self.keep_alive = 'keep-alive' in connection
+        else:
+            self.keep_alive = 'close' not in connection
+    
+    def json(self):
+        """Decodifica corpo JSON"""
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, 'JSON inválido')
+    
+    @classmethod
+    def read(cls, sock, buffered=b'', max_recv=None):
+        """Lê uma requisição completa (linha, headers e corpo por Content-Length)
+        
+        Retorna (requisição, bytes excedentes já recebidos) ou (None, b'') se
+        o cliente fechou a conexão antes de enviar algo. Com `max_recv`, faz
+        no máximo esse número de recv (quem usa poll só lê o que chegou) e
+        retorna (None, bytes recebidos) se a requisição ainda está incompleta.
+        """
+        data = buffered
+        recvs = 0
+        while True:
+            end = data.find(b'\r\n\r\n')
+            if end >= 0:
+                break
+            if len(data) > cls.MAX_HEADER:
+                raise HTTPError(431)
+            if recvs == max_recv:
+                return None, data
+            recvs += 1
+            chunk = sock.recv(cls.RECV_SIZE)
+            if not chunk:
+                if data:
+                    raise HTTPError(400, 'Requisição incompleta')
+                return None, b''
+            data += chunk
+        
+        if end > cls.MAX_HEADER:
+            raise HTTPError(431)
+        
+        try:
+            lines = data[:end].decode().split('\r\n')
+        except UnicodeError:
+            raise HTTPError(400, 'Cabeçalho inválido')
+        parts = lines[0].split(' ')
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise HTTPError(400, 'Linha de requisição inválida')
+        method, target, version = parts
+        
+        headers = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(':')
+            if not sep:
+                raise HTTPError(400, 'Header inválido')
+            headers[key.strip().lower()] = value.strip()
+        
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, 'Content-Length inválido')
+        if length < 0:
+            raise HTTPError(400, 'Content-Length inválido')
+        if length > cls.MAX_BODY:
+            raise HTTPError(413)
+        
+        head, data = data[:end + 4], data[end + 4:]
+        while len(data) < length:
+            if recvs == max_recv:
+                return None, head + data
+            recvs += 1
+            chunk = sock.recv(min(cls.RECV_SIZE, length - len(data)))
+            if not chunk:
+                raise HTTPError(400, 'Corpo incompleto')
+            data += chunk
+        
+        return cls(method, target, headers, data[:length], version), data[length:]
 
 class Response:
     """Classe para respostas HTTP"""
@@ -10,7 +154,7 @@ class Response:
         # Define content-type padrão
         if 'Content-Type' not in self.headers:
             self.headers['Content-Type'] = 'text/plain'
-            
+        
         # Adiciona CORS headers
         self.headers.update({
             'Access-Control-Allow-Origin': '*',
@@ -21,21 +165,33 @@ class Response:
 class Microdot:
     """Servidor web minimalista"""
     def __init__(self):
+        # Tabela de despacho O(1): (método, path) -> handler
         self.routes = {}
-        
+        # Métodos aceitos por path, para responder 405
+        self.paths = {}
+    
     def route(self, path, methods=None):
         """Decorador para registrar rotas"""
-        if methods is None:
-            methods = ['GET']
-            
         def decorator(handler):
-            self.routes[path] = {
-                'handler': handler,
-                'methods': methods
-            }
+            self.add_route(path, methods, handler)
             return handler
         return decorator
-        
+    
+    def add_route(self, path, methods, handler):
+        """Registra handler para path e métodos"""
+        if methods is None:
+            methods = ['GET']
+        for method in methods:
+            self.routes[(method, path)] = handler
+        self.paths.setdefault(path, set()).update(methods)
+    
+    def match(self, method, path):
+        """Retorna handler da rota ou levanta HTTPError 404/405"""
+        handler = self.routes.get((method, path))
+        if handler is None:
+            raise HTTPError(405 if path in self.paths else 404)
+        return handler
+    
     def run(self, host='0.0.0.0', port=80, debug=False):
         """Inicia o servidor"""
         import socket
@@ -46,26 +202,19 @@ class Microdot:
         s.listen(1)
         
         while True:
+            conn = None
             try:
                 conn, addr = s.accept()
-                request = conn.recv(1024).decode()
                 
                 # Processa requisição
                 try:
-                    # Extrai método e path
-                    method = request.split()[0]
-                    path = request.split()[1]
-                    
-                    # Busca rota
-                    if path in self.routes:
-                        route = self.routes[path]
-                        if method in route['methods']:
-                            response = route['handler'](request)
-                        else:
-                            response = Response('Method not allowed', 405)
-                    else:
-                        response = Response('Not found', 404)
-                        
+                    request, _ = Request.read(conn)
+                    if request is None:
+                        continue
+                    response = self.match(request.method, request.path)(request)
+                
+                except HTTPError as e:
+                    response = Response(e.message, e.status)
                 except Exception as e:
                     if debug:
                         response = Response(str(e), 500)
@@ -73,13 +222,17 @@ class Microdot:
                         response = Response('Internal error', 500)
                 
                 # Envia resposta
-                status_line = f'HTTP/1.0 {response.status_code}\r\n'
+                body = response.body.encode() if isinstance(response.body, str) else response.body
+                response.headers['Content-Length'] = len(body)
+                status_line = f'HTTP/1.1 {response.status_code} {STATUS_TEXT.get(response.status_code, "")}\r\n'
                 headers = '\r\n'.join([f'{k}: {v}' for k, v in response.headers.items()])
-                conn.send(f'{status_line}{headers}\r\n\r\n{response.body}'.encode())
-                
+                conn.send(f'{status_line}{headers}\r\n\r\n'.encode())
+                conn.send(body)
+            
             except Exception as e:
                 if debug:
                     print(f'Server error: {e}')
-                    
+            
             finally:
-                conn.close() 
\ No newline at end of file
+                if conn:
+                    conn.close()
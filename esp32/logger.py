@@ -1,100 +1,524 @@
 import time
 import os
+import io
+import struct
+import _thread
+from array import array
+
+try:
+    import deflate
+except ImportError:
+    deflate = None
+
+# Formato binário dos logs (tools/expand_logs.py converte para texto)
+#
+# Sequência de registros, cada um começando pelo tipo (u8):
+#   REC_START    '<3sBH': b'JDL', versão, ano da época do relógio (2000 no
+#                ESP32). Início de arquivo e de cada boot: zera os dicionários
+#   REC_MODULE   '<BH': ID do módulo, tamanho + nome
+#   REC_TEMPLATE '<HH': ID do modelo, tamanho + texto da mensagem
+#   REC_ENTRY    '<IBBHB': hora (s), nível, módulo, modelo, quantidade de
+#                argumentos; cada argumento é uma tag seguida do valor:
+#                b'i' '<i', b'f' '<f' ou b's' '<H' tamanho + texto
+#   REC_TEXT     '<IBBH': hora, nível, módulo, tamanho + mensagem pronta
+#
+# Mensagens com argumentos viram modelos na primeira ocorrência; sem
+# argumentos, na segunda (mensagens montadas com f-string raramente se
+# repetem e só ocupariam o dicionário). Como no console, o modelo só passa
+# por % quando o registro tem argumentos: '%' literal fica como está.
+
+REC_START = 0
+REC_MODULE = 1
+REC_TEMPLATE = 2
+REC_ENTRY = 3
+REC_TEXT = 4
+FORMAT_VERSION = 1
 
 class Logger:
-    """Sistema de logs com rotação de arquivos"""
+    """Sistema de logs binários com rotação e compressão de arquivos
+    
+    Os registros ficam num buffer em RAM e vão para a flash em blocos:
+    quando o buffer enche, quando o registro pendente mais antigo passa de
+    FLUSH_INTERVAL_MS, em mensagens ERROR ou acima e em `flush()`. O
+    tamanho do arquivo é contado a cada gravação, sem consultar a flash.
+    
+    Ao passar de MAX_LOG_SIZE o arquivo atual é só renomeado; a compressão
+    com gzip fica para o próximo momento ocioso do servidor (`flush_if_due`),
+    fora do lock: quem registra não espera por ela.
+    
+    Argumentos extras são gravados sem formatar; o eco no console aplica %
+    apenas se o nível passar no filtro: `logger.debug('can', 'Frame %s',
+    frame_id)` custa só a comparação de nível quando debug está desligado.
+    """
     
     # Níveis de log
     DEBUG = 10
     INFO = 20
     WARNING = 30
     ERROR = 40
+    CRITICAL = 50
     
     # Configurações
-    MAX_LOG_SIZE = 1024 * 1024  # 1MB
-    MAX_LOG_FILES = 3
+    MAX_LOG_SIZE = 256 * 1024   # Arquivo atual, sem compressão
+    MAX_LOG_FILES = 12          # Arquivos rotacionados (comprimidos se o deflate funciona)
+    BUFFER_SIZE = 4096          # Bytes acumulados em RAM antes de gravar
+    FLUSH_INTERVAL_MS = 5000    # Idade máxima de um registro pendente
+    MAX_TEMPLATES = 256         # Modelos por arquivo; depois, texto pronto
+    MAX_SEEN = 64               # Mensagens sem argumento vistas uma vez
+    COMPRESS_WBITS = 10         # Janela de 1 KB: cabe na RAM do ESP32
+    TAIL_INDEX = 200            # Posições dos últimos registros (tail sem ler o arquivo todo)
+    ARCHIVE_SUFFIX = '.gz'
     
     def __init__(self, min_level=INFO):
         self.min_level = min_level
         self.log_dir = 'logs'
-        self.log_file = 'jd_monitor.log'
+        self.log_file = 'jd_monitor.jdl'
+        self.log_path = f'{self.log_dir}/{self.log_file}'
+        
+        self._buf = bytearray(self.BUFFER_SIZE)
+        self._pos = 0
+        self._pending_since = 0
+        self._lock = _thread.allocate_lock()
+        self._tail_index = array('I', bytes(4 * self.TAIL_INDEX))
         
         # Cria diretório de logs
         if not self.log_dir in os.listdir():
             os.mkdir(self.log_dir)
-            
-        # Verifica tamanho do log
-        self._check_log_size()
-            
-    def _check_log_size(self):
-        """Verifica e rotaciona logs se necessário"""
+        
+        # Tamanho atual lido uma vez; depois só incrementado
         try:
-            log_path = f'{self.log_dir}/{self.log_file}'
-            if log_path in os.listdir(self.log_dir):
-                if os.stat(log_path)[6] > self.MAX_LOG_SIZE:
-                    self._rotate_logs()
-        except:
-            pass
-            
+            self._size = os.stat(self.log_path)[6]
+        except OSError:
+            self._size = 0
+        
+        # Arquivos rotacionados antes de um desligamento, ainda sem compressão
+        try:
+            os.stat(self.archive_path(0))
+            self._archive_pending = True
+        except OSError:
+            self._archive_pending = False
+        self._staged = False       # `.1` sem compressão aguardando o gzip
+        self._compressing = False
+        self._compress_ok = self._compression_works()
+        if self._compress_ok:
+            try:
+                os.stat(self._staged_path())
+                self._staged = True
+            except OSError:
+                pass
+        
+        # Cada boot continua o arquivo atual com dicionários novos
+        self._start_segment()
+    
+    def _compression_works(self):
+        """Testa o deflate com uma escrita em memória
+        
+        O módulo pode existir num firmware compilado sem o compressor; sem
+        o teste, cada rotação falharia e os rotacionados ficariam vazios.
+        """
+        if deflate is None:
+            return False
+        try:
+            stream = deflate.DeflateIO(io.BytesIO(), deflate.GZIP, self.COMPRESS_WBITS)
+            stream.write(b'JDL')
+            stream.close()
+            return True
+        except Exception as e:
+            print(f"Compressão de logs indisponível: {e}")
+            return False
+    
+    def archive_path(self, index):
+        """Caminho do arquivo rotacionado (0 = aguardando compressão)"""
+        if index == 0:
+            return f'{self.log_path}.0'
+        if not self._compress_ok:
+            return f'{self.log_path}.{index}'
+        return f'{self.log_path}.{index}{self.ARCHIVE_SUFFIX}'
+    
+    def _start_segment(self):
+        """Zera os dicionários e grava o registro de início"""
+        self._modules = {}
+        self._templates = {}
+        self._seen = set()
+        self._entries = 0   # Linhas do segmento; a posição de cada uma vai para _tail_index
+        self._append(struct.pack('<B3sBH', REC_START, b'JDL', FORMAT_VERSION, time.gmtime(0)[0]))
+    
+    def _staged_path(self):
+        """Rotacionado já na posição 1, ainda sem compressão"""
+        return f'{self.log_path}.1'
+    
+    def _rotate_if_due(self):
+        """Rotaciona se o arquivo passou de MAX_LOG_SIZE (com o lock)
+        
+        Com o anterior ainda aguardando a compressão a rotação fica adiada:
+        o atual cresce mais um pouco, os registros seguem no buffer como de
+        costume e `flush_if_due` tenta de novo quando a compressão termina.
+        """
+        if self._size + self._pos <= self.MAX_LOG_SIZE or (self._archive_pending and self._staged):
+            return
+        self._flush()
+        self._rotate_logs()
+    
     def _rotate_logs(self):
-        """Rotaciona arquivos de log"""
+        """Rotaciona o arquivo atual (a compressão fica para depois)"""
+        if self._archive_pending:
+            self._archive()
         try:
-            # Remove log mais antigo
-            old_log = f'{self.log_dir}/{self.log_file}.{self.MAX_LOG_FILES}'
-            if old_log in os.listdir(self.log_dir):
-                os.remove(old_log)
-                
-            # Move logs existentes
-            for i in range(self.MAX_LOG_FILES-1, 0, -1):
-                old = f'{self.log_dir}/{self.log_file}.{i}'
-                new = f'{self.log_dir}/{self.log_file}.{i+1}'
-                if old in os.listdir(self.log_dir):
-                    os.rename(old, new)
-                    
-            # Move log atual
-            os.rename(
-                f'{self.log_dir}/{self.log_file}',
-                f'{self.log_dir}/{self.log_file}.1'
-            )
-        except:
+            os.rename(self.log_path, self.archive_path(0))
+            self._archive_pending = True
+        except OSError:
             pass
-            
-    def _log(self, level, module, message):
-        """Registra uma mensagem de log"""
-        if level >= self.min_level:
+        self._size = 0
+        self._start_segment()
+    
+    def _archive(self):
+        """Desloca os rotacionados e põe o pendente na posição 1 (com o lock)
+        
+        Só troca nomes; a compressão (`_compress`) roda depois, sem o lock.
+        Cada posição pode ter o arquivo comprimido ou, se a compressão
+        falhou, o original: os dois são deslocados.
+        """
+        # Remove o mais antigo e desloca os demais
+        for i in range(self.MAX_LOG_FILES, 0, -1):
+            for suffix in (self.ARCHIVE_SUFFIX, ''):
+                old = f'{self.log_path}.{i}{suffix}'
+                try:
+                    if i == self.MAX_LOG_FILES:
+                        os.remove(old)
+                    else:
+                        os.rename(old, f'{self.log_path}.{i + 1}{suffix}')
+                except OSError:
+                    pass  # Arquivo ainda não existe
+        
+        try:
+            if not self._compress_ok:
+                os.rename(self.archive_path(0), self.archive_path(1))
+            else:
+                os.rename(self.archive_path(0), self._staged_path())
+                self._staged = True
+        except OSError as e:
+            print(f"Erro ao rotacionar log: {e}")
+        self._archive_pending = False
+    
+    def _compress(self):
+        """Comprime o rotacionado da posição 1 (sem o lock do logger)
+        
+        Se falhar, o `.gz` parcial é removido e o original fica na posição
+        1 sem compressão; a próxima rotação o desloca como os demais.
+        """
+        staged = self._staged_path()
+        try:
+            chunk = bytearray(512)
+            with open(staged, 'rb') as src, open(self.archive_path(1), 'wb') as dst:
+                stream = deflate.DeflateIO(dst, deflate.GZIP, self.COMPRESS_WBITS)
+                try:
+                    while True:
+                        size = src.readinto(chunk)
+                        if not size:
+                            break
+                        stream.write(memoryview(chunk)[:size])
+                finally:
+                    stream.close()
+            os.remove(staged)
+        except Exception as e:
+            print(f"Erro ao comprimir log: {e}")
             try:
-                # Formata mensagem
-                timestamp = time.localtime()
-                log_entry = (
-                    f"{timestamp[3]:02d}:{timestamp[4]:02d}:{timestamp[5]:02d} "
-                    f"[{module}] {message}\n"
-                )
-                
-                # Imprime no console
-                print(log_entry, end='')
-                
-                # Salva no arquivo
-                with open(f'{self.log_dir}/{self.log_file}', 'a') as f:
-                    f.write(log_entry)
-                    
-                # Verifica tamanho
-                self._check_log_size()
-                    
+                os.stat(staged)
+                os.remove(self.archive_path(1))
+            except OSError:
+                pass
+        self._staged = False
+    
+    def _write(self, data):
+        """Grava bloco no arquivo atual"""
+        with open(self.log_path, 'ab') as f:
+            f.write(data)
+        self._size += len(data)
+    
+    def _flush(self):
+        """Grava o buffer pendente (com o lock já adquirido)"""
+        if self._pos:
+            try:
+                self._write(memoryview(self._buf)[:self._pos])
             except Exception as e:
                 print(f"Erro ao salvar log: {e}")
-                
-    def debug(self, module, message):
-        self._log(self.DEBUG, module, message)
+            self._pos = 0
+    
+    def flush(self):
+        """Grava na flash os registros pendentes"""
+        with self._lock:
+            self._flush()
+    
+    def flush_if_due(self):
+        """Grava os registros pendentes se o mais antigo passou de
+        FLUSH_INTERVAL_MS e comprime o arquivo rotacionado, se houver
         
-    def info(self, module, message):
-        self._log(self.INFO, module, message)
+        Chamado nos momentos ociosos do servidor, para que registros de um
+        período sem novos logs não fiquem retidos na RAM e para que a
+        compressão não atrase quem está registrando. Com o lock só se
+        trocam nomes; as threads das duas portas não comprimem juntas.
+        """
+        if self._pos and time.ticks_diff(time.ticks_ms(), self._pending_since) >= self.FLUSH_INTERVAL_MS:
+            self.flush()
+        if not (self._archive_pending or self._staged):
+            return
+        with self._lock:
+            if self._archive_pending and not self._staged:
+                self._archive()
+            compress = self._staged and not self._compressing
+            if compress:
+                self._compressing = True
+        if compress:
+            try:
+                self._compress()
+            finally:
+                self._compressing = False
+            with self._lock:
+                self._rotate_if_due()  # Rotação adiada durante a compressão
+    
+    def tail_start(self, count):
+        """(posição, módulos, modelos) para ler as últimas `count` linhas do
+        arquivo atual sem decodificá-lo desde o início, ou None se o índice
+        não as cobre (mais que TAIL_INDEX ou anteriores ao boot atual)
+        
+        Grava os registros pendentes. Os dicionários vêm invertidos (ID →
+        texto), no formato do LogReader.
+        """
+        with self._lock:
+            self._flush()
+            if count > self.TAIL_INDEX or count > self._entries:
+                return None
+            if count:
+                offset = self._tail_index[(self._entries - count) % self.TAIL_INDEX]
+            else:
+                offset = self._size
+            return (offset,
+                    {value: key for key, value in self._modules.items()},
+                    {value: key for key, value in self._templates.items()})
+    
+    def _append(self, data):
+        """Copia bytes para o buffer, gravando antes se não couberem"""
+        size = len(data)
+        if self._pos + size > self.BUFFER_SIZE:
+            self._flush()
+        if size > self.BUFFER_SIZE:
+            self._write(data)
+            return
+        if not self._pos:
+            self._pending_since = time.ticks_ms()
+        self._buf[self._pos:self._pos + size] = data
+        self._pos += size
+    
+    def _template_id(self, message, has_args):
+        """ID do modelo da mensagem, definindo-o se preciso, ou None"""
+        template_id = self._templates.get(message)
+        if template_id is not None:
+            return template_id
+        if len(self._templates) >= self.MAX_TEMPLATES:
+            return None
+        if not has_args:
+            key = hash(message)
+            if key not in self._seen:
+                if len(self._seen) >= self.MAX_SEEN:
+                    self._seen.clear()
+                self._seen.add(key)
+                return None
+        template_id = len(self._templates)
+        self._templates[message] = template_id
+        text = message.encode()
+        self._append(struct.pack('<BHH', REC_TEMPLATE, template_id, len(text)) + text)
+        return template_id
+    
+    def _record(self, level, module, message, args):
+        """Acrescenta o registro binário da mensagem (com o lock adquirido)"""
+        module_id = self._modules.get(module)
+        if module_id is None:
+            module_id = len(self._modules)
+            self._modules[module] = module_id
+            name = module.encode()
+            self._append(struct.pack('<BBH', REC_MODULE, module_id, len(name)) + name)
         
-    def warning(self, module, message):
-        self._log(self.WARNING, module, message)
+        now = time.time()
+        template_id = self._template_id(message, bool(args))
+        # Posição no arquivo do registro da linha (definições já gravadas antes dela)
+        self._tail_index[self._entries % self.TAIL_INDEX] = self._size + self._pos
+        self._entries += 1
+        if template_id is None:
+            text = (message % args if args else message).encode()
+            self._append(struct.pack('<BIBBH', REC_TEXT, now, level, module_id, len(text)) + text)
+            return
         
-    def error(self, module, message):
-        self._log(self.ERROR, module, message)
+        self._append(struct.pack('<BIBBHB', REC_ENTRY, now, level, module_id, template_id, len(args)))
+        for arg in args:
+            kind = type(arg)
+            if kind is int and -0x80000000 <= arg < 0x80000000:
+                self._append(b'i' + struct.pack('<i', arg))
+            elif kind is float:
+                self._append(b'f' + struct.pack('<f', arg))
+            else:
+                text = str(arg).encode()
+                self._append(b's' + struct.pack('<H', len(text)) + text)
+    
+    def _log(self, level, module, message, args):
+        """Registra uma mensagem de log"""
+        if level < self.min_level:
+            return
+        try:
+            # Imprime no console
+            timestamp = time.localtime()
+            print(
+                f"{timestamp[3]:02d}:{timestamp[4]:02d}:{timestamp[5]:02d} "
+                f"[{module}] {message % args if args else message}"
+            )
+            
+            with self._lock:
+                self._record(level, module, message, args)
+                self._rotate_if_due()
+                if level >= self.ERROR or time.ticks_diff(time.ticks_ms(), self._pending_since) >= self.FLUSH_INTERVAL_MS:
+                    self._flush()
         
-    def critical(self, module, message):
+        except Exception as e:
+            print(f"Erro ao salvar log: {e}")
+    
+    def debug(self, module, message, *args):
+        self._log(self.DEBUG, module, message, args)
+    
+    def info(self, module, message, *args):
+        self._log(self.INFO, module, message, args)
+    
+    def warning(self, module, message, *args):
+        self._log(self.WARNING, module, message, args)
+    
+    def error(self, module, message, *args):
+        self._log(self.ERROR, module, message, args)
+    
+    def critical(self, module, message, *args):
         """Log nível CRITICAL"""
-        self._log(50, module, message) 
\ No newline at end of file
+        self._log(self.CRITICAL, module, message, args)
+
+class LogReader:
+    """Converte em texto os registros de um arquivo de log, lido em blocos
+    
+    Guarda a posição e os dicionários entre chamadas de `read()`: quem
+    acompanha o arquivo recebe só os registros gravados desde a última
+    leitura. Um registro cortado no fim do arquivo (o buffer pode gravar
+    parte dele) fica para a próxima leitura.
+    """
+    
+    CHUNK = 512
+    LEVELS = {10: 'DEBUG', 20: 'INFO', 30: 'WARNING', 40: 'ERROR', 50: 'CRITICAL'}
+    
+    def __init__(self, path, start=None):
+        """`start`: (posição, módulos, modelos) de `Logger.tail_start` para
+        começar no meio do arquivo"""
+        self.path = path
+        self.offset = 0
+        self._modules = {}
+        self._templates = {}
+        if start:
+            self.offset, self._modules, self._templates = start
+    
+    def read(self):
+        """Gera as linhas de texto dos registros completos após `offset`"""
+        data = b''
+        pos = 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while True:
+                chunk = f.read(self.CHUNK)
+                if not chunk:
+                    break
+                data = data[pos:] + chunk
+                pos = 0
+                while pos < len(data):
+                    result = self._decode(data, pos)
+                    if result is None:
+                        break  # Registro incompleto: lê mais um bloco
+                    self.offset += result[0] - pos
+                    pos = result[0]
+                    if result[1]:
+                        yield result[1]
+    
+    def _decode(self, data, pos):
+        """Decodifica o registro em `pos`: (fim, linha ou None) ou None se
+        o registro ainda não está completo em `data`"""
+        end = len(data)
+        kind = data[pos]
+        pos += 1
+        
+        if kind == REC_START:
+            if pos + 6 > end:
+                return None
+            if data[pos:pos + 3] != b'JDL':
+                raise ValueError('Arquivo de log inválido')
+            self._modules = {}
+            self._templates = {}
+            return pos + 6, None
+        
+        if kind == REC_MODULE or kind == REC_TEMPLATE:
+            head = 3 if kind == REC_MODULE else 4
+            if pos + head > end:
+                return None
+            key, size = struct.unpack_from('<BH' if kind == REC_MODULE else '<HH', data, pos)
+            pos += head
+            if pos + size > end:
+                return None
+            names = self._modules if kind == REC_MODULE else self._templates
+            names[key] = data[pos:pos + size].decode()
+            return pos + size, None
+        
+        if kind == REC_TEXT:
+            if pos + 8 > end:
+                return None
+            seconds, level, module_id, size = struct.unpack_from('<IBBH', data, pos)
+            pos += 8
+            if pos + size > end:
+                return None
+            return pos + size, self._line(seconds, level, module_id, data[pos:pos + size].decode())
+        
+        if kind == REC_ENTRY:
+            if pos + 9 > end:
+                return None
+            seconds, level, module_id, template_id, count = struct.unpack_from('<IBBHB', data, pos)
+            pos += 9
+            args = []
+            for _ in range(count):
+                if pos + 3 > end:
+                    return None
+                tag = data[pos]
+                if tag == 0x73:  # b's'
+                    size = struct.unpack_from('<H', data, pos + 1)[0]
+                    pos += 3
+                    if pos + size > end:
+                        return None
+                    args.append(data[pos:pos + size].decode())
+                    pos += size
+                else:
+                    if pos + 5 > end:
+                        return None
+                    args.append(struct.unpack_from('<i' if tag == 0x69 else '<f', data, pos + 1)[0])
+                    pos += 5
+            template = self._templates.get(template_id, '')
+            try:
+                message = template % tuple(args) if args else template
+            except (TypeError, ValueError):
+                message = f'{template} {args}'
+            return pos, self._line(seconds, level, module_id, message)
+        
+        raise ValueError(f'Registro de log desconhecido: {kind}')
+    
+    def _line(self, seconds, level, module_id, message):
+        t = time.gmtime(seconds)
+        return (
+            f'{t[0]}-{t[1]:02d}-{t[2]:02d} {t[3]:02d}:{t[4]:02d}:{t[5]:02d} '
+            f'{self.LEVELS.get(level, level)} [{self._modules.get(module_id, module_id)}] {message}'
+        )
+
+_shared = None
+
+def get_logger():
+    """Logger único do processo, compartilhado por todos os módulos"""
+    global _shared
+    if _shared is None:
+        _shared = Logger()
+    return _shared
@@ -1,29 +1,39 @@
+import boot_profile  # Primeiro: marca o início de main
 from wifi_manager import WifiManager
 from can_handler import CANHandler
 from web_server import WebServer
-from logger import Logger
+from logger import get_logger
+
+boot_profile.mark('imports')
 
 def main():
     try:
-        logger = Logger()
+        logger = get_logger()
         logger.info('main', 'Iniciando sistema...')
+        boot_profile.mark('logger')
         
         # Inicializa WiFi
         wifi = WifiManager()
+        boot_profile.mark('wifi_init')
         
         # Inicializa CAN com retry
         can = CANHandler()
         if not can.init_can():
             logger.error('main', 'Falha ao inicializar CAN')
             return
+        boot_profile.mark('mcp2515')
+        can.start_acquisition()
             
         # Inicializa servidor
         server = WebServer(wifi, can)
+        boot_profile.mark('server_init')
         
         # Registra handlers de cleanup
         def cleanup():
+            can.stop_acquisition()
             server.cleanup()
             wifi.cleanup()
+            logger.flush()
             
         # Inicia servidor
         server.start()
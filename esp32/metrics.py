@@ -0,0 +1,57 @@
+from array import array
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+class Histogram:
+    """Histograma de baldes fixos exportado no formato de texto do Prometheus
+    
+    Os limites são definidos na criação, na unidade inteira das amostras
+    (ex.: µs de ticks_us); `scale` converte para segundos na exportação.
+    `observe` só incrementa contadores pré-alocados, sem alocar por amostra.
+    """
+    
+    def __init__(self, name, help_text, bounds, scale=1000000):
+        self.name = name
+        self.help = help_text
+        self.bounds = bounds
+        self.scale = scale
+        # Último balde recebe as amostras acima do maior limite (+Inf)
+        self.counts = array('I', bytes(4 * (len(bounds) + 1)))
+        # Soma em mega-unidades + resto: mantém inteiros pequenos (sem alocar)
+        self._sum_mega = 0
+        self._sum = 0
+    
+    def observe(self, value):
+        """Registra uma amostra (inteiro na unidade dos limites)"""
+        i = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        total = self._sum + value
+        while total >= 1000000:
+            total -= 1000000
+            self._sum_mega += 1
+        self._sum = total
+    
+    def render(self, out):
+        """Acrescenta as linhas do histograma (baldes cumulativos) em `out`"""
+        name = self.name
+        out.append(f'# HELP {name} {self.help}')
+        out.append(f'# TYPE {name} histogram')
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            out.append(f'{name}_bucket{{le="{bound / self.scale}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        out.append(f'{name}_bucket{{le="+Inf"}} {cumulative}')
+        total = self._sum_mega * 1000000 + self._sum
+        out.append(f'{name}_sum {total / self.scale}')
+        out.append(f'{name}_count {cumulative}')
+
+def sample(out, name, kind, help_text, value):
+    """Acrescenta em `out` uma métrica simples (counter ou gauge)"""
+    out.append(f'# HELP {name} {help_text}')
+    out.append(f'# TYPE {name} {kind}')
+    out.append(f'{name} {value}')
@@ -0,0 +1,42 @@
+import time
+
+class RateLimiter:
+    """Token bucket por IP do cliente e endpoint
+    
+    Cada par (IP, endpoint) acumula tokens na taxa do endpoint até o
+    tamanho da rajada; cada requisição consome um token.
+    """
+    
+    MAX_BUCKETS = 32    # Ao exceder, o balde parado há mais tempo é descartado
+    
+    def __init__(self, limits, default):
+        self.limits = limits      # endpoint -> (requisições/s, rajada)
+        self.default = default
+        self.buckets = {}
+        self.rejected = 0
+    
+    def allow(self, ip, path):
+        """Consome um token; retorna 0 se permitido ou segundos até o próximo"""
+        # Endpoints sem limite próprio dividem um balde por cliente
+        if path not in self.limits:
+            path = '*'
+        rate, burst = self.limits.get(path, self.default)
+        now = time.ticks_ms()
+        key = (ip, path)
+        
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.MAX_BUCKETS:
+                stale = max(self.buckets, key=lambda k: time.ticks_diff(now, self.buckets[k][1]))
+                del self.buckets[stale]
+            bucket = self.buckets[key] = [burst, now]
+        else:
+            elapsed = time.ticks_diff(now, bucket[1])
+            bucket[0] = min(burst, bucket[0] + elapsed * rate / 1000)
+            bucket[1] = now
+        
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        self.rejected += 1
+        return (1 - bucket[0]) / rate
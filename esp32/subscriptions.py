@@ -0,0 +1,140 @@
+import time
+
+class Subscription:
+    """Seleção de sinais de um cliente, compilada uma vez no registro
+    
+    `names` já vem resolvido a partir de sinais e PGNs pedidos; na entrega
+    só resta percorrer essa tupla. `sent` guarda o último valor entregue
+    de cada sinal para aplicar a banda morta.
+    """
+    
+    def __init__(self, sub_id, names, sources, rate, deadband):
+        self.id = sub_id
+        self.names = names
+        self.sources = sources
+        self.rate = rate
+        self.deadband = deadband
+        self.sent = {}
+        self.version = -1
+        self.last_used = time.ticks_ms()
+    
+    def select(self, signals, sources):
+        """Retorna os sinais assinados que mudaram além da banda morta
+        
+        Atualiza os valores entregues; a primeira chamada retorna todos os
+        sinais assinados já recebidos.
+        """
+        out = {}
+        sent = self.sent
+        for name in self.names:
+            value = signals.get(name)
+            if value is None:
+                continue
+            if self.sources is not None and sources.get(name) not in self.sources:
+                continue
+            last = sent.get(name)
+            if last is not None:
+                band = self.deadband.get(name)
+                if band is None:
+                    if value == last:
+                        continue
+                elif abs(value - last) <= band:
+                    continue
+            out[name] = value
+            sent[name] = value
+        return out
+    
+    def to_dict(self):
+        """Descrição da assinatura devolvida ao cliente"""
+        return {
+            'id': self.id,
+            'signals': list(self.names),
+            'sources': sorted(self.sources) if self.sources is not None else None,
+            'rate': self.rate,
+            'deadband': self.deadband
+        }
+
+class Subscriptions:
+    """Tabela de assinaturas de sinais dos clientes"""
+    
+    MAX_SUBSCRIPTIONS = 8    # Ao exceder, a menos usada é descartada
+    TTL = 600                # Segundos sem uso até expirar
+    MIN_RATE = 0.1           # Entregas por segundo nos endpoints de push
+    
+    def __init__(self, decoder, max_rate):
+        self.max_rate = max_rate
+        self.subs = {}
+        self._next_id = 1
+        
+        # Índices do esquema usados para compilar os seletores
+        self.names = tuple(name for name, _, _ in decoder.SIGNALS)
+        self.by_pgn = {}
+        for name, pgn, _ in decoder.SIGNALS:
+            self.by_pgn.setdefault(pgn, []).append(name)
+        self.enums = decoder.ENUMS
+    
+    def create(self, spec):
+        """Compila e registra assinatura; levanta ValueError se inválida
+        
+        `spec`: {"signals": [...], "pgns": [...], "sources": [...],
+        "rate": Hz, "deadband": número ou {sinal: número}}. Sem sinais
+        nem PGNs, assina todos.
+        """
+        wanted = set()
+        for name in spec.get('signals') or ():
+            if name not in self.names:
+                raise ValueError(f'Sinal desconhecido: {name}')
+            wanted.add(name)
+        for pgn in spec.get('pgns') or ():
+            names = self.by_pgn.get(int(pgn))
+            if names is None:
+                raise ValueError(f'PGN sem sinais decodificados: {pgn}')
+            wanted.update(names)
+        # Ordem do esquema, igual à do snapshot completo
+        names = tuple(n for n in self.names if not wanted or n in wanted)
+        
+        sources = spec.get('sources')
+        if sources is not None:
+            sources = frozenset(int(s) & 0xFF for s in sources)
+        
+        rate = float(spec.get('rate', 1))
+        rate = min(max(rate, self.MIN_RATE), self.max_rate)
+        
+        # Banda morta só se aplica a sinais numéricos
+        band = spec.get('deadband') or {}
+        if isinstance(band, dict):
+            for name in band:
+                if name not in names:
+                    raise ValueError(f'Banda morta para sinal não assinado: {name}')
+            deadband = {n: float(v) for n, v in band.items() if n not in self.enums}
+        else:
+            deadband = {n: float(band) for n in names if n not in self.enums}
+        
+        self.expire()
+        if len(self.subs) >= self.MAX_SUBSCRIPTIONS:
+            now = time.ticks_ms()
+            idlest = max(self.subs.values(), key=lambda s: time.ticks_diff(now, s.last_used))
+            del self.subs[idlest.id]
+        
+        sub = Subscription(self._next_id, names, sources, rate, deadband)
+        self._next_id += 1
+        self.subs[sub.id] = sub
+        return sub
+    
+    def get(self, sub_id):
+        """Retorna assinatura pelo ID (marcando uso) ou None"""
+        sub = self.subs.get(sub_id)
+        if sub is not None:
+            sub.last_used = time.ticks_ms()
+        return sub
+    
+    def remove(self, sub_id):
+        """Remove assinatura; retorna False se não existia"""
+        return self.subs.pop(sub_id, None) is not None
+    
+    def expire(self):
+        """Descarta assinaturas sem uso há mais de TTL segundos"""
+        now = time.ticks_ms()
+        for sub in list(self.subs.values()):
+            if time.ticks_diff(now, sub.last_used) > self.TTL * 1000:
+                del self.subs[sub.id]
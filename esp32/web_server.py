@@ -1,14 +1,28 @@
-from microdot import Response
+from microdot import Microdot, Request, HTTPError, STATUS_TEXT
 import json
 import os
-from logger import Logger
+from logger import get_logger, LogReader
 import time
 import socket
+import select
+import struct
+import hashlib
 import _thread
 import ubinascii
 import urandom
 from dns import DNSServer
 from captive_portal import CaptivePortal
+import wire_format
+from subscriptions import Subscriptions
+from rate_limit import RateLimiter
+import metrics
+import clock
+import boot_profile
+
+try:
+    import deflate
+except ImportError:
+    deflate = None
 
 class WebServer:
     # Portas configuráveis
@@ -16,15 +30,114 @@ class WebServer:
     DATA_PORT = 8502     # Porta de dados
     DNS_PORT = 53        # DNS
     
+    # Conexões persistentes (HTTP/1.1 keep-alive), por porta
+    MAX_CONNECTIONS = 4          # Conexões abertas; a mais ociosa cede lugar
+    KEEPALIVE_TIMEOUT = 5        # Segundos sem requisição até fechar
+    KEEPALIVE_MAX_REQUESTS = 100 # Requisições por conexão antes de fechar
+    REQUEST_TIMEOUT = 2          # Segundos para receber uma requisição inteira (e limite de cada envio)
+    
+    # Limite por IP e endpoint: (requisições/s, rajada)
+    RATE_LIMITS = {
+        '/scan': (2, 5),         # Servido do cache; varreduras têm intervalo mínimo próprio
+        '/connect': (0.2, 2),
+        '/data': (20, 20),
+        '/frames': (20, 20),
+        '/aggregate': (5, 5),
+        '/subscribe': (1, 5),
+        '/stream': (0.5, 2),
+        '/ws': (0.5, 2),
+        '/time': (10, 10),       # Rajada de amostras de ida e volta do host
+        '/logs': (2, 20),        # Download de todos os arquivos em sequência
+    }
+    RATE_LIMIT_DEFAULT = (5, 10)
+    
+    # Fatia de CPU: após SERVE_SLICE_MS atendendo clientes, o servidor pausa
+    # ACQ_YIELD_MS para a thread de aquisição esvaziar o controlador CAN
+    SERVE_SLICE_MS = 20
+    ACQ_YIELD_MS = 2
+    
+    # Páginas estáticas gravadas na flash com gzip (tools/upload_files.py)
+    STATUS_PAGE = 'status.html'
+    STATIC_CHUNK = 1024      # Bytes lidos da flash por envio
+    STATIC_MAX_AGE = 300     # Cache do navegador (s)
+    
+    # Streaming (Server-Sent Events)
+    MAX_STREAMS = 2          # Conexões /stream simultâneas
+    STREAM_MAX_RATE = 10     # Eventos por segundo (máximo)
+    STREAM_HEARTBEAT = 15    # Segundos sem eventos até enviar heartbeat
+    
+    # WebSocket de frames brutos
+    WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    WS_BATCH_FRAMES = 64     # Frames por mensagem binária
+    WS_INTERVAL_MS = 20      # Intervalo entre lotes
+    WS_MAX_BACKLOG = 256     # Frames pendentes além disso são descartados
+    STREAM_SEND_TIMEOUT = 2  # Segundos bloqueado num envio até desistir do cliente
+    
+    # Publicação UDP (broadcast ou multicast) para vários consumidores na LAN
+    UDP_ENABLED = False
+    UDP_ADDRESS = '255.255.255.255'  # Ou grupo multicast, ex: '239.10.0.1'
+    UDP_PORT = 8503
+    UDP_RATE = 10                    # Datagramas de snapshot por segundo
+    UDP_MODE = 'snapshot'            # 'snapshot' ou 'frames'
+    UDP_BATCH_FRAMES = 80            # Frames por datagrama (cabe em 1 MTU)
+    
+    # Leitura em lote do buffer de frames (/frames)
+    FRAMES_DEFAULT = 100
+    FRAMES_MAX = 200
+    
+    # Logs da flash (/logs), lidos em blocos de STATIC_CHUNK
+    LOGS_TAIL_DEFAULT = 50
+    LOGS_TAIL_MAX = 200           # Linhas mantidas na RAM por tail
+    LOGS_FOLLOW_INTERVAL_MS = 1000
+    
+    # Limites (µs) dos histogramas exportados em /metrics
+    HTTP_BUCKETS_US = (1000, 2000, 5000, 10000, 20000, 50000, 100000, 250000, 1000000)
+    SEND_BUCKETS_US = (200, 500, 1000, 2000, 5000, 10000, 50000, 250000, 1000000)
+    
     def __init__(self, wifi_manager, can_handler):
         self.wifi_manager = wifi_manager
         self.can_handler = can_handler
-        self.logger = Logger()
+        self.logger = get_logger()
         self.auth_token = None
         self.load_or_create_token()
         self.running = True
         self.dns_server = None
         self.captive_portal = None
+        self._streams = 0
+        self._streams_lock = _thread.allocate_lock()  # Vagas disputadas pelas duas portas
+        self._static_buf = bytearray(self.STATIC_CHUNK)
+        self.snapshot_encoder = wire_format.SnapshotEncoder(
+            can_handler.decoder, can_handler.frames.RECORD_SIZE)
+        
+        # Snapshot serializado uma vez por versão: formato -> (versão, corpo, resposta)
+        self._snapshot_cache = {}
+        self._cache_lock = _thread.allocate_lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        self.rate_limiter = RateLimiter(self.RATE_LIMITS, self.RATE_LIMIT_DEFAULT)
+        self.ws_dropped = 0
+        self._first_response = True   # Marca a primeira resposta no perfil de boot
+        self._closing = set()         # Conexões cuja resposta atual é a última
+        
+        # Tempos exportados em /metrics
+        self.http_time = metrics.Histogram(
+            'jd_http_request_seconds', 'Tempo para atender uma requisição HTTP',
+            self.HTTP_BUCKETS_US)
+        self.send_time = metrics.Histogram(
+            'jd_socket_send_seconds', 'Tempo bloqueado em send de respostas e eventos',
+            self.SEND_BUCKETS_US)
+        
+        # Relógio sincronizado por SNTP; ticks para o host em /time
+        self.clock = clock.Clock()
+        
+        # Assinaturas de sinais dos clientes (/subscribe)
+        self.subscriptions = Subscriptions(can_handler.decoder, self.STREAM_MAX_RATE)
+        
+        # Tabelas de despacho da porta web e da porta de dados
+        self.web_routes = Microdot()
+        self.data_routes = Microdot()
+        self._register_routes()
         
     def load_or_create_token(self):
         """Carrega ou cria token de autenticação"""
@@ -46,64 +159,593 @@ class WebServer:
         if self.wifi_manager.get_status()['ap_active']:
             return True  # Não requer auth em modo AP
             
-        token = request.headers.get('X-Auth-Token')
+        token = request.headers.get('x-auth-token')
         if not token:
             return False
         return token == self.auth_token
         
-    def handle_request(self, client):
-        """Processa requisição HTTP"""
-        try:
-            request = client.recv(1024).decode()
-            self.logger.debug('web_server', f'Nova requisição: {request.splitlines()[0]}')
+    def _register_routes(self):
+        """Registra rotas dos servidores web e de dados"""
+        shared = (
+            ('/data', self.send_data),
+            ('/schema', self.send_schema),
+            ('/frames', self.send_frames),
+            ('/stats', self.send_stats),
+            ('/metrics', self.send_metrics),
+            ('/time', self.send_clock),
+            ('/logs', self.send_logs),
+            ('/boot', self.send_boot_profile),
+            ('/aggregate', self.send_aggregate),
+            ('/stream', self.handle_stream),
+        )
+        for path, handler in shared:
+            self.web_routes.add_route(path, ['GET'], handler)
+            self.data_routes.add_route(path, ['GET'], handler)
+        for routes in (self.web_routes, self.data_routes):
+            routes.add_route('/subscribe', ['POST'], self.handle_subscribe)
+            routes.add_route('/subscribe', ['GET', 'DELETE'], self.send_subscription)
             
-            # Verifica CORS
-            if "OPTIONS" in request:
-                return self.send_cors_headers(client)
-                
-            # Rotas principais
-            if "GET / " in request:
-                if self.wifi_manager.get_status()['ap_active']:
-                    # Em modo AP: mostra página de configuração WiFi
-                    return self.send_html_response(client, self.captive_portal.get_config_page())
-                else:
-                    # Em modo cliente: mostra página de dados CAN
-                    return self.send_html_response(client, self.get_status_page())
+        self.web_routes.add_route('/', ['GET'], self.send_index)
+        self.web_routes.add_route('/scan', ['GET'], self.send_scan)
+        self.web_routes.add_route('/connect', ['POST'], self.handle_connect)
+        self.data_routes.add_route('/ws', ['GET'], self.handle_websocket)
+        
+    def serve(self, sock, routes):
+        """Atende uma porta com conexões persistentes multiplexadas por poll
+        
+        Cada conexão guarda [bytes excedentes, último uso, requisições
+        atendidas, IP, início da requisição incompleta]. Conexões ociosas
+        por mais de KEEPALIVE_TIMEOUT são fechadas, assim como as que não
+        completam uma requisição em REQUEST_TIMEOUT (os bytes são lidos só
+        quando chegam: um cliente lento não bloqueia os outros). Com
+        MAX_CONNECTIONS abertas, a mais ociosa cede lugar à nova. Sob carga
+        contínua o laço cede a CPU à aquisição a cada SERVE_SLICE_MS.
+        """
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        conns = {}
+        idle_ms = self.KEEPALIVE_TIMEOUT * 1000
+        request_ms = self.REQUEST_TIMEOUT * 1000
+        slice_start = time.ticks_ms()
+        try:
+            while self.running:
+                events = poller.poll(1000)
+                if not events:
+                    slice_start = time.ticks_ms()
+                    self.logger.flush_if_due()  # Grava logs pendentes com a rede ociosa
+                    boot_profile.save_if_due()
+                elif time.ticks_diff(time.ticks_ms(), slice_start) >= self.SERVE_SLICE_MS:
+                    time.sleep_ms(self.ACQ_YIELD_MS)
+                    slice_start = time.ticks_ms()
                     
-            elif "GET /scan" in request:
-                networks = self.wifi_manager.scan_networks()
-                return self.send_json_response(client, {'networks': networks})
+                for entry in events:
+                    obj, event = entry[0], entry[1]
+                    if obj is sock:
+                        self._accept(sock, poller, conns)
+                    elif obj in conns:
+                        if event & (select.POLLHUP | select.POLLERR):
+                            self._drop(poller, conns, obj)
+                            continue
+                        try:
+                            alive = self.handle_request(obj, routes, conns[obj])
+                        except Exception as e:
+                            # Falha ao enviar a própria resposta de erro
+                            self.logger.error('web_server', f'Erro na conexão: {e}')
+                            self._drop(poller, conns, obj)
+                            continue
+                        if not alive:
+                            # Fechada ou entregue a uma thread de streaming
+                            poller.unregister(obj)
+                            del conns[obj]
                 
-            elif "GET /data" in request:
-                data = self.can_handler.read_message()
-                return self.send_json_response(client, {
-                    'data': data,
-                    'timestamp': time.time()
-                })
-                
-            elif "POST /connect" in request:
-                body = request.split('\r\n\r\n')[1]
-                config = json.loads(body)
-                success = self.wifi_manager.connect(config['ssid'], config['password'])
+                now = time.ticks_ms()
+                for client in [c for c, s in conns.items() if time.ticks_diff(now, s[1]) > idle_ms
+                               or (s[4] is not None and time.ticks_diff(now, s[4]) > request_ms)]:
+                    self._drop(poller, conns, client)
+        finally:
+            for client in list(conns):
+                self._drop(poller, conns, client)
+    
+    def _accept(self, sock, poller, conns):
+        """Aceita nova conexão e registra no poll"""
+        try:
+            client, addr = sock.accept()
+        except OSError as e:
+            self.logger.error('web_server', f'Erro na conexão: {e}')
+            return
+        self.logger.debug('web_server', 'Nova conexão de %s', addr)
+        
+        now = time.ticks_ms()
+        if len(conns) >= self.MAX_CONNECTIONS:
+            idlest = max(conns, key=lambda c: time.ticks_diff(now, conns[c][1]))
+            self._drop(poller, conns, idlest)
+        
+        client.settimeout(self.REQUEST_TIMEOUT)  # Envios; a leitura só ocorre com dados no poll
+        poller.register(client, select.POLLIN)
+        conns[client] = [b'', now, 0, addr[0], None]
+    
+    def _drop(self, poller, conns, client):
+        """Remove conexão do poll e fecha o socket"""
+        poller.unregister(client)
+        del conns[client]
+        try:
+            client.close()
+        except OSError:
+            pass
+    
+    def handle_request(self, client, routes, state):
+        """Processa as requisições recebidas numa conexão
+        
+        Handlers recebem (client, request) e retornam True quando assumem a
+        conexão (streaming). Faz um único recv (o poll indicou dados): uma
+        requisição incompleta fica em `state` até o próximo evento.
+        Requisições já enfileiradas pelo cliente (pipelining) são
+        respondidas em ordem. Retorna True se a conexão continua aberta
+        aguardando a próxima requisição.
+        """
+        keep_alive = True
+        max_recv = 1
+        try:
+            while keep_alive:
+                request, state[0] = Request.read(client, state[0], max_recv)
+                max_recv = 0
+                if request is None:
+                    if state[0]:
+                        # Incompleta: o restante chega em outro evento, até REQUEST_TIMEOUT
+                        if state[4] is None:
+                            state[4] = time.ticks_ms()
+                        break
+                    keep_alive = False  # Cliente fechou a conexão
+                    break
+                state[4] = None
+                state[2] += 1
+                self.logger.debug('web_server', 'Nova requisição: %s %s', request.method, request.target)
+                start = time.ticks_us()
+                if not (request.keep_alive and state[2] < self.KEEPALIVE_MAX_REQUESTS):
+                    self._closing.add(client)  # Resposta leva `Connection: close`
                 
-                if success:
-                    # Desativa modo AP
-                    self.wifi_manager.stop_ap()
-                    if self.dns_server:
-                        self.dns_server.stop()
-                    self.running = False
-                    
-                return self.send_json_response(client, {
-                    'status': 'success' if success else 'error',
-                    'ip': self.wifi_manager.get_status()['sta_ip']
-                })
+                try:
+                    wait = self.rate_limiter.allow(state[3], request.path)
+                    if wait:
+                        self.send_rate_limited(client, wait)
+                    # Preflight CORS vale para qualquer rota
+                    elif request.method == 'OPTIONS':
+                        self.send_cors_headers(client)
+                    elif routes.match(request.method, request.path)(client, request) is True:
+                        self._closing.discard(client)
+                        return False
+                except HTTPError as e:
+                    self.logger.debug('web_server', 'HTTP %s: %s', e.status, e.message)
+                    self.send_status(client, e.status, e.message)
+                self.http_time.observe(time.ticks_diff(time.ticks_us(), start))
+                if self._first_response:
+                    self._first_response = False
+                    boot_profile.mark('first_http')
                 
+                keep_alive = request.keep_alive and state[2] < self.KEEPALIVE_MAX_REQUESTS
+                if b'\r\n\r\n' not in state[0]:
+                    break
+            
+            state[1] = time.ticks_ms()
+            
+        except HTTPError as e:
+            # Requisição malformada: não dá para achar o início da próxima
+            self.logger.debug('web_server', 'HTTP %s: %s', e.status, e.message)
+            self._closing.add(client)
+            self.send_status(client, e.status, e.message)
+            keep_alive = False
+        except OSError as e:
+            self.logger.debug('web_server', 'Conexão encerrada: %s', e)
+            keep_alive = False
         except Exception as e:
             self.logger.error('web_server', f'Erro: {e}')
-            return self.send_error(client, str(e))
+            self._closing.add(client)
+            self.send_error(client, str(e))
+            keep_alive = False
+        
+        self._closing.discard(client)
+        if not keep_alive:
+            client.close()
+        return keep_alive
+    
+    def _connection_header(self, client):
+        """`Connection: close` quando a conexão fecha após a resposta atual"""
+        return 'Connection: close\r\n' if client in self._closing else ''
+                
+    def send_index(self, client, request):
+        """Página inicial: configuração WiFi em modo AP, status em modo cliente"""
+        if self.wifi_manager.get_status()['ap_active']:
+            return self.send_static(client, self.captive_portal.get_config_page(), request)
+        return self.send_static(client, self.get_status_page(), request)
+        
+    def send_scan(self, client, request):
+        """Envia redes WiFi da última varredura (/scan?refresh=1 pede outra)
+        
+        No modo AP a varredura roda em segundo plano e a resposta sai do
+        cache na hora; `scanning` indica que há resultado novo a caminho.
+        Fora do portal (sem scanner) varre na própria requisição.
+        """
+        wifi = self.wifi_manager
+        if not wifi.scanner_active:
+            wifi.scan_networks()
+        elif request.query.get('refresh'):
+            wifi.request_scan()
+        networks, age = wifi.cached_networks()
+        return self.send_json_response(client, {
+            'networks': networks,
+            'age': age,
+            'scanning': wifi.scanning or wifi.scan_requested
+        })
+        
+    def send_schema(self, client, request):
+        """Envia esquema de sinais"""
+        return self.send_json_response(client, self.get_schema())
+        
+    def send_stats(self, client, request):
+        """Envia contadores do servidor"""
+        return self.send_json_response(client, self.get_stats())
+        
+    def send_metrics(self, client, request):
+        """Envia contadores e histogramas de tempo no formato do Prometheus"""
+        can = self.can_handler
+        out = []
+        metrics.sample(out, 'jd_can_frames_total', 'counter', 'Frames CAN recebidos', can.frames.seq)
+        metrics.sample(out, 'jd_data_version', 'gauge', 'Versão dos sinais publicados', can.version)
+        metrics.sample(out, 'jd_suppressed_updates_total', 'counter',
+                       'Mudanças retidas pela publicação por exceção', can.suppressed)
+        metrics.sample(out, 'jd_acq_late_polls_total', 'counter',
+                       'Leituras do controlador CAN com atraso >= LATE_POLL_MS', can.late_polls)
+        metrics.sample(out, 'jd_acq_max_gap_seconds', 'gauge',
+                       'Maior intervalo entre leituras do controlador CAN', can.max_gap_ms / 1000)
+        metrics.sample(out, 'jd_cache_hits_total', 'counter', 'Snapshots servidos do cache', self.cache_hits)
+        metrics.sample(out, 'jd_cache_misses_total', 'counter', 'Snapshots serializados', self.cache_misses)
+        metrics.sample(out, 'jd_rate_limited_total', 'counter',
+                       'Requisições recusadas pelo limite de taxa', self.rate_limiter.rejected)
+        metrics.sample(out, 'jd_ws_backlog_drops_total', 'counter',
+                       'Atrasos de WebSocket descartados', self.ws_dropped)
+        metrics.sample(out, 'jd_streams', 'gauge', 'Streams SSE e WebSocket abertos', self._streams)
+        metrics.sample(out, 'jd_subscriptions', 'gauge', 'Assinaturas ativas', len(self.subscriptions.subs))
+        wifi = self.wifi_manager
+        metrics.sample(out, 'jd_wifi_connected', 'gauge', 'Estação WiFi conectada', int(wifi.connected))
+        metrics.sample(out, 'jd_wifi_disconnects_total', 'counter', 'Quedas da conexão WiFi', wifi.disconnects)
+        if wifi.rssi_avg is not None:
+            metrics.sample(out, 'jd_wifi_rssi_dbm', 'gauge', 'Sinal do AP (média móvel)', wifi.rssi_avg)
+        if wifi.join_ms is not None:
+            metrics.sample(out, 'jd_wifi_join_seconds', 'gauge',
+                           'Duração da última conexão WiFi', wifi.join_ms / 1000)
+        for histogram in (can.loop_period, can.decode_time, self.http_time, self.send_time):
+            histogram.render(out)
+        out.append('')
+        return self.send_response(client, '\n'.join(out).encode(), metrics.CONTENT_TYPE)
+        
+    def send_clock(self, client, request):
+        """Envia ticks e hora do dispositivo (estimativa de deslocamento no host)"""
+        return self.send_json_response(client, self.clock.status())
+    
+    def send_boot_profile(self, client, request):
+        """Envia os tempos das fases do boot atual e dos anteriores"""
+        return self.send_json_response(client, boot_profile.status())
+        
+    def send_logs(self, client, request):
+        """Logs gravados na flash (/logs)
+        
+        Sem parâmetros lista os arquivos, do mais antigo para o atual.
+        `file=<nome>` envia o arquivo binário como está (aceita Range),
+        `tail=N` as últimas N linhas do arquivo atual em texto e `follow=1`
+        abre um stream SSE com as linhas novas, precedidas do tail.
+        Arquivo, tail e follow seguem numa thread com vaga de stream, para
+        não parar a porta; retorna True se a conexão passou para ela. Fora
+        do modo AP exige o token (`X-Auth-Token`).
+        """
+        if not self.check_auth(request):
+            return self.send_unauthorized(client)
+        query = request.query
+        self.logger.flush()  # Registros pendentes na RAM entram na resposta
+        if 'file' in query:
+            return self.send_log_file(client, request, query['file'])
+        if query.get('follow'):
+            return self._start_log_thread(client, self._log_follow_loop, self._tail_count(query))
+        if 'tail' in query:
+            return self._start_log_thread(client, self._log_tail_loop, self._tail_count(query))
+        return self.send_json_response(client, {
+            'files': self.list_logs(),
+            'current': self.logger.log_file
+        })
+    
+    def list_logs(self):
+        """Arquivos de log [{name, size}], do mais antigo para o atual"""
+        log_dir, log_file = self.logger.log_dir, self.logger.log_file
+        files = []
+        for name in os.listdir(log_dir):
+            if name.startswith(log_file):
+                files.append({'name': name, 'size': os.stat(f'{log_dir}/{name}')[6]})
+        
+        def age(entry):
+            # jd_monitor.jdl.N[.gz]: maior N = mais antigo; .0 aguarda compressão
+            index = entry['name'][len(log_file) + 1:].split('.')[0]
+            return -int(index) if index else 1
+        
+        files.sort(key=age)
+        return files
+    
+    def _tail_count(self, query):
+        """Quantidade de linhas pedida em `tail`, limitada a LOGS_TAIL_MAX"""
+        try:
+            count = int(query.get('tail', self.LOGS_TAIL_DEFAULT))
+        except ValueError:
+            raise HTTPError(400, 'tail inválido')
+        return min(max(count, 0), self.LOGS_TAIL_MAX)
+    
+    def tail_log(self, count):
+        """(leitor no fim do arquivo atual, últimas `count` linhas)
+        
+        O índice do logger dá a posição da primeira linha pedida; sem ele
+        (linhas de antes do boot atual) o arquivo é lido do início.
+        """
+        reader = LogReader(self.logger.log_path, self.logger.tail_start(count))
+        lines = []
+        for line in reader.read():
+            lines.append(line)
+            if len(lines) > count:
+                lines.pop(0)
+        return reader, lines
+    
+    def _start_log_thread(self, client, loop, *args):
+        """Passa a conexão para `loop(client, *args)` numa thread com vaga
+        de stream; retorna True se passou"""
+        if not self._reserve_stream():
+            self.send_streams_busy(client)
+            return False
+        try:
+            _thread.start_new_thread(loop, (client,) + args)
+        except Exception as e:
+            self._release_stream()
+            self.logger.error('web_server', f'Erro ao iniciar thread de logs: {e}')
+            return False
+        return True
+    
+    def _log_tail_loop(self, client, count):
+        """Envia as últimas `count` linhas em texto e fecha a conexão"""
+        try:
+            client.settimeout(self.STREAM_SEND_TIMEOUT)
+            _, lines = self.tail_log(count)
+            self.send_response(client, ''.join(line + '\n' for line in lines).encode(),
+                               'text/plain; charset=utf-8', headers='Connection: close\r\n')
+        except OSError:
+            self.logger.debug('web_server', 'Cliente do tail de logs desconectou')
+        except Exception as e:
+            self.logger.error('web_server', f'Erro no tail de logs: {e}')
+        finally:
+            self._release_stream()
+            client.close()
+    
+    @staticmethod
+    def parse_range(spec, size):
+        """Intervalo [início, fim) de um header Range de faixa única
+        
+        Retorna None se o header deve ser ignorado (unidade ou sintaxe não
+        suportada) e levanta ValueError se a faixa não é satisfazível.
+        """
+        unit, _, spec = spec.partition('=')
+        if unit.strip() != 'bytes' or ',' in spec:
+            return None
+        first, _, last = spec.strip().partition('-')
+        try:
+            if first:
+                start = int(first)
+                end = int(last) + 1 if last else size
+                if last and end <= start:
+                    return None  # Faixa invertida: sintaxe inválida
+            else:
+                start = size - int(last)  # Sufixo: últimos N bytes
+                end = size
+        except ValueError:
+            return None
+        start, end = max(start, 0), min(end, size)
+        if start >= end:
+            raise ValueError('Faixa fora do arquivo')
+        return start, end
+    
+    def send_log_file(self, client, request, name):
+        """Envia arquivo de log da flash, inteiro ou a faixa do Range
+        
+        O arquivo atual só cresce: o tamanho vale no momento da requisição
+        e um cliente retoma o download pedindo `Range: bytes=<recebido>-`.
+        Nome e faixa são verificados aqui; os blocos seguem numa thread.
+        Retorna True se a conexão passou para ela.
+        """
+        logger = self.logger
+        if '/' in name or not name.startswith(logger.log_file):
+            raise HTTPError(404, 'Arquivo de log desconhecido')
+        path = f'{logger.log_dir}/{name}'
+        try:
+            size = os.stat(path)[6]
+        except OSError:
+            raise HTTPError(404, 'Arquivo de log desconhecido')
+        
+        start, end = 0, size
+        status, extra = 200, ''
+        if 'range' in request.headers:
+            try:
+                span = self.parse_range(request.headers['range'], size)
+            except ValueError:
+                return self.send_response(client, b'', status=416,
+                                          headers=f'Content-Range: bytes */{size}\r\n')
+            if span:
+                start, end = span
+                status = 206
+                extra = f'Content-Range: bytes {start}-{end - 1}/{size}\r\n'
+            
+        content_type = 'application/gzip' if name.endswith('.gz') else 'application/octet-stream'
+        head = (
+            f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {end - start}\r\n'
+            'Accept-Ranges: bytes\r\n'
+            f'{extra}'
+            'Connection: close\r\n'
+            'Access-Control-Allow-Origin: *\r\n'
+            'Access-Control-Expose-Headers: Content-Range\r\n\r\n'
+        ).encode()
+        return self._start_log_thread(client, self._log_file_loop, path, head, start, end)
+            
+    def _log_file_loop(self, client, path, head, start, end):
+        """Envia o arquivo em blocos de STATIC_CHUNK e fecha a conexão"""
+        try:
+            client.settimeout(self.STREAM_SEND_TIMEOUT)
+            with open(path, 'rb') as f:
+                self._send(client, head)
+                f.seek(start)
+                # Buffer próprio: cada download tem sua thread
+                buf = bytearray(self.STATIC_CHUNK)
+                view = memoryview(buf)
+                remaining = end - start
+                while remaining:
+                    size = f.readinto(buf)
+                    if not size:
+                        break  # Menor que o anunciado (rotacionado): o cliente vê o fechamento
+                    size = min(size, remaining)
+                    self._send(client, view[:size])
+                    remaining -= size
+        except OSError:
+            self.logger.debug('web_server', 'Cliente do download de log desconectou')
+        except Exception as e:
+            self.logger.error('web_server', f'Erro no download de log: {e}')
+        finally:
+            self._release_stream()
+            client.close()
+    
+    def _log_follow_loop(self, client, count):
+        """Envia o tail e depois as linhas novas até o cliente desconectar
+        
+        Enquanto alguém acompanha, os registros pendentes do logger são
+        gravados a cada LOGS_FOLLOW_INTERVAL_MS em vez de FLUSH_INTERVAL_MS.
+        """
+        logger = self.logger
+        try:
+            client.settimeout(self.STREAM_SEND_TIMEOUT)
+            self._send_stream_header(client)
+            reader, lines = self.tail_log(count)
+            poller = self._stream_poller(client)
+            last_sent = time.ticks_ms()
+            
+            while self.running:
+                now = time.ticks_ms()
+                if lines:
+                    self._send(client, ''.join(
+                        f'data: {line.replace(chr(10), " ")}\n\n' for line in lines).encode())
+                    last_sent = now
+                elif time.ticks_diff(now, last_sent) >= self.STREAM_HEARTBEAT * 1000:
+                    client.send(b': ping\n\n')
+                    last_sent = now
+                
+                if self._client_closed(poller, client, self.LOGS_FOLLOW_INTERVAL_MS):
+                    break
+                logger.flush()
+                lines = []
+                try:
+                    if os.stat(logger.log_path)[6] < reader.offset:
+                        # Rotacionado: termina o arquivo antigo (se ainda não
+                        # foi comprimido) e segue o novo desde o início
+                        reader.path = logger.archive_path(0)
+                        lines = list(reader.read())
+                        reader = LogReader(logger.log_path)
+                    lines.extend(reader.read())
+                except OSError:
+                    reader = LogReader(logger.log_path)  # Novo arquivo ainda não criado
+        
+        except OSError:
+            self.logger.debug('web_server', 'Cliente do follow de logs desconectou')
+        except Exception as e:
+            self.logger.error('web_server', f'Erro no follow de logs: {e}')
         finally:
+            self._release_stream()
             client.close()
+    
+    def send_aggregate(self, client, request):
+        """Envia agregados da janela (/aggregate?window=<s>&signals=<a,b>)
+        
+        Mín/máx/média/último de cada sinal numérico nos últimos `window`
+        segundos (1, 10 ou 60; padrão 10). `sub=<id>` usa os sinais da
+        assinatura; sem filtro, todos os sinais com amostras na janela.
+        """
+        query = request.query
+        if 'sub' in query:
+            names = self.get_subscription(query['sub']).names
+        elif query.get('signals'):
+            names = query['signals'].split(',')
+        else:
+            names = None
+            
+        aggregates = self.can_handler.aggregates
+        try:
+            window = int(query.get('window', 10))
+            signals = aggregates.query(window, names)
+        except ValueError:
+            windows = ', '.join(str(w) for w in aggregates.WINDOWS)
+            raise HTTPError(400, f'Janela inválida (use {windows})')
+            
+        return self.send_json_response(client, {
+            'timestamp': clock.unix(),
+            'window': window,
+            'signals': signals
+        })
+        
+    def handle_subscribe(self, client, request):
+        """Registra assinatura de sinais (POST /subscribe com JSON)
+        
+        Corpo: {"signals": [...], "pgns": [...], "sources": [...],
+        "rate": Hz, "deadband": número ou {sinal: número}}. O ID retornado
+        é usado em /data?sub=<id> e /stream?sub=<id>.
+        """
+        spec = request.json()
+        if not isinstance(spec, dict):
+            raise HTTPError(400, 'Assinatura inválida')
+        try:
+            sub = self.subscriptions.create(spec)
+        except (ValueError, TypeError) as e:
+            raise HTTPError(400, str(e))
+        self.logger.debug('web_server', 'Assinatura %s: %s sinais', sub.id, len(sub.names))
+        return self.send_json_response(client, sub.to_dict())
+        
+    def send_subscription(self, client, request):
+        """Consulta (GET) ou remove (DELETE) assinatura: /subscribe?id=<id>"""
+        sub = self.get_subscription(request.query.get('id'))
+        if request.method == 'DELETE':
+            self.subscriptions.remove(sub.id)
+        return self.send_json_response(client, sub.to_dict())
+        
+    def get_subscription(self, sub_id):
+        """Retorna assinatura pelo ID da query ou levanta HTTPError"""
+        try:
+            sub = self.subscriptions.get(int(sub_id))
+        except (TypeError, ValueError):
+            raise HTTPError(400, 'ID de assinatura inválido')
+        if sub is None:
+            # Expirada ou ESP32 reiniciou: o cliente deve assinar de novo
+            raise HTTPError(404, 'Assinatura desconhecida')
+        return sub
+        
+    def handle_connect(self, client, request):
+        """Conecta na rede WiFi enviada pelo portal captivo"""
+        config = request.json()
+        success = self.wifi_manager.connect(config['ssid'], config['password'])
+        
+        if success:
+            # Desativa modo AP e passa a manter a nova conexão
+            self.wifi_manager.start_monitoring()
+            self.wifi_manager.stop_ap()
+            if self.dns_server:
+                self.dns_server.stop()
+            self.running = False
+        elif self.wifi_manager.get_status()['ap_active']:
+            self.wifi_manager.start_scanner()
             
+        return self.send_json_response(client, {
+            'status': 'success' if success else 'error',
+            'ip': self.wifi_manager.get_status()['sta_ip']
+        })
+        
     def validate_config(self, config):
         """Valida dados de configuração"""
         required = ['ssid', 'password']
@@ -115,42 +757,62 @@ class WebServer:
                
     def send_cors_headers(self, client):
         """Envia headers CORS"""
-        response = """HTTP/1.1 200 OK
-Access-Control-Allow-Origin: *
-Access-Control-Allow-Methods: GET, POST, OPTIONS
-Access-Control-Allow-Headers: Content-Type
-Access-Control-Max-Age: 86400
-
-"""
-        client.send(response.encode())
+        client.send(('HTTP/1.1 200 OK\r\n'
+                     'Access-Control-Allow-Origin: *\r\n'
+                     'Access-Control-Allow-Methods: GET, POST, DELETE, OPTIONS\r\n'
+                     'Access-Control-Allow-Headers: Content-Type, If-None-Match, Last-Event-ID, Range, X-Auth-Token\r\n'
+                     'Access-Control-Max-Age: 86400\r\n'
+                     f'{self._connection_header(client)}'
+                     'Content-Length: 0\r\n\r\n').encode())
+    
+    def _reserve_stream(self):
+        """Ocupa uma vaga de stream; False se as MAX_STREAMS estão em uso"""
+        with self._streams_lock:
+            if self._streams >= self.MAX_STREAMS:
+                return False
+            self._streams += 1
+            return True
+    
+    def _release_stream(self):
+        """Libera a vaga de um stream encerrado"""
+        with self._streams_lock:
+            self._streams -= 1
+    
+    def send_streams_busy(self, client):
+        """Envia 503: limite de streams simultâneos atingido"""
+        self.logger.warning('web_server', 'Limite de streams atingido')
+        client.send(('HTTP/1.1 503 Service Unavailable\r\nRetry-After: 5\r\n'
+                     f'{self._connection_header(client)}Content-Length: 0\r\n\r\n').encode())
         
     def send_unauthorized(self, client):
         """Envia resposta não autorizado"""
-        response = """HTTP/1.1 401 Unauthorized
-Content-Type: application/json
-
-{"error": "Não autorizado"}"""
-        client.send(response.encode())
+        self.send_status(client, 401, 'Não autorizado')
         
     def send_error(self, client, message):
         """Envia resposta de erro"""
-        response = f"""HTTP/1.1 400 Bad Request
-Content-Type: application/json
+        self.send_status(client, 400, message)
+        
+    def send_status(self, client, status, message):
+        """Envia resposta de erro com código de status"""
+        self.send_response(client, json.dumps({'error': message}).encode(), status=status)
 
-{{"error": "{message}"}}"""
-        client.send(response.encode())
+    def send_rate_limited(self, client, wait):
+        """Envia 429 com o tempo até o cliente ter um novo token"""
+        body = json.dumps({'error': 'Limite de requisições excedido'}).encode()
+        self.send_response(client, body, status=429, headers=f'Retry-After: {int(wait) + 1}\r\n')
 
     def start_ap_mode(self):
         """Inicia modo AP com captive portal"""
         try:
             self.logger.info('web_server', 'Iniciando modo AP...')
             
-            # Configura WiFi em modo AP
+            # Configura WiFi em modo AP e varre redes em segundo plano
             self.wifi_manager.start_ap()
+            self.wifi_manager.start_scanner()
             
             # Inicia servidor DNS
             self.logger.info('web_server', 'Iniciando servidor DNS...')
-            self.dns_server = DNSServer()
+            self.dns_server = DNSServer(self.wifi_manager.ap_if.ifconfig()[0])
             _thread.start_new_thread(self.dns_server.start, ())
             
             # Configura portal captivo
@@ -162,15 +824,9 @@ Content-Type: application/json
             sock = socket.socket()
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             sock.bind(('0.0.0.0', 80))  # Força porta 80 em modo AP
-            sock.listen(1)
-            
-            while self.running:
-                try:
-                    client, addr = sock.accept()
-                    self.logger.debug('web_server', f'Nova conexão de {addr}')
-                    self.handle_request(client)
-                except Exception as e:
-                    self.logger.error('web_server', f'Erro na conexão: {e}')
+            sock.listen(self.MAX_CONNECTIONS)
+            boot_profile.mark('server_ready')
+            self.serve(sock, self.web_routes)
                     
         except Exception as e:
             self.logger.error('web_server', f'Erro no modo AP: {e}')
@@ -181,16 +837,10 @@ Content-Type: application/json
             sock = socket.socket()
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             sock.bind(('0.0.0.0', self.WEB_PORT))
-            sock.listen(1)
+            sock.listen(self.MAX_CONNECTIONS)
             self.logger.info('web_server', f'Servidor web pronto na porta {self.WEB_PORT}')
-            
-            while self.running:
-                try:
-                    client, addr = sock.accept()
-                    self.logger.debug('web_server', f'Nova conexão de {addr}')
-                    self.handle_request(client)
-                except Exception as e:
-                    self.logger.error('web_server', f'Erro na conexão: {e}')
+            boot_profile.mark('server_ready')
+            self.serve(sock, self.web_routes)
                 
         except Exception as e:
             self.logger.error('web_server', f'Erro ao iniciar servidor web: {e}')
@@ -201,7 +851,7 @@ Content-Type: application/json
             self.data_socket = socket.socket()
             self.data_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.data_socket.bind(('0.0.0.0', self.DATA_PORT))
-            self.data_socket.listen(1)
+            self.data_socket.listen(self.MAX_CONNECTIONS)
             self.logger.info('web_server', f'Servidor de dados iniciado na porta {self.DATA_PORT}')
             _thread.start_new_thread(self._handle_data_requests, ())
             
@@ -210,42 +860,678 @@ Content-Type: application/json
             
     def _handle_data_requests(self):
         """Processa requisições de dados do Streamlit"""
-        while self.running:
-            try:
-                client, addr = self.data_socket.accept()
-                self.logger.debug('web_server', f'Nova conexão de dados de {addr}')
+        try:
+            self.serve(self.data_socket, self.data_routes)
+        except Exception as e:
+            self.logger.error('web_server', f'Erro ao processar dados: {e}')
                 
-                request = client.recv(1024).decode()
-                if "GET /data" in request:
-                    data = self.can_handler.read_message()
-                    response = {
-                        'timestamp': time.time(),
-                        'data': data
-                    }
-                    self.send_json_response(client, response)
+    def handle_stream(self, client, request):
+        """Inicia envio de eventos SSE (/stream?rate=<Hz>&mode=change)
+        
+        Retorna True se a conexão passou para a thread de streaming.
+        """
+        query, headers = request.query, request.headers
+        sub = self.get_subscription(query['sub']) if 'sub' in query else None
+        try:
+            rate = float(query.get('rate', sub.rate if sub else 1))
+        except ValueError:
+            rate = 1
+        rate = min(max(rate, 0.1), self.STREAM_MAX_RATE)
+        on_change = query.get('mode') == 'change'
+        
+        # Cursor de retomada (header padrão ou query para clientes sem EventSource)
+        try:
+            last_id = int(headers.get('last-event-id', query.get('last_id', -1)))
+        except ValueError:
+            last_id = -1
+            
+        if not self._reserve_stream():
+            self.send_streams_busy(client)
+            return False
+        try:
+            if sub:
+                _thread.start_new_thread(self._subscription_loop, (client, rate, sub))
+            else:
+                _thread.start_new_thread(self._stream_loop, (client, rate, on_change, last_id))
+        except Exception as e:
+            self._release_stream()
+            self.logger.error('web_server', f'Erro ao iniciar stream: {e}')
+            return False
+        return True
+        
+    def _send_stream_header(self, client):
+        """Envia cabeçalho da resposta SSE"""
+        client.send(b'HTTP/1.1 200 OK\r\n'
+                    b'Content-Type: text/event-stream\r\n'
+                    b'Cache-Control: no-cache\r\n'
+                    b'Connection: keep-alive\r\n'
+                    b'Access-Control-Allow-Origin: *\r\n\r\n'
+                    b'retry: 2000\n\n')
+        
+    def _stream_loop(self, client, rate, on_change, last_id):
+        """Envia dados decodificados como eventos SSE até o cliente desconectar"""
+        interval = int(1000 / rate)
+        try:
+            client.settimeout(self.STREAM_SEND_TIMEOUT)
+            self._send_stream_header(client)
+            self.logger.debug('web_server', 'Stream iniciado (%s Hz, change=%s)', rate, on_change)
+            
+            poller = self._stream_poller(client)
+            last_sent = time.ticks_ms()
+            while self.running:
+                version = self.can_handler.version
+                now = time.ticks_ms()
+                
+                if not on_change or version != last_id:
+                    version, _, body = self.get_snapshot()
+                    self._send(client, b''.join((
+                        f'id: {version}\nticks: {time.ticks_ms()}\ndata: '.encode(), body, b'\n\n')))
+                    last_id = version
+                    last_sent = now
+                elif time.ticks_diff(now, last_sent) >= self.STREAM_HEARTBEAT * 1000:
+                    # Comentário SSE mantém proxies e NAT com a conexão viva
+                    client.send(b': ping\n\n')
+                    last_sent = now
                     
-                client.close()
+                if self._client_closed(poller, client, interval):
+                    break
                 
-            except Exception as e:
-                self.logger.error('web_server', f'Erro ao processar dados: {e}')
+        except OSError:
+            self.logger.debug('web_server', 'Cliente do stream desconectou')
+        except Exception as e:
+            self.logger.error('web_server', f'Erro no stream: {e}')
+        finally:
+            self._release_stream()
+            client.close()
+    
+    @staticmethod
+    def _stream_poller(client):
+        """Poll do socket de um stream, para perceber o cliente fechando"""
+        poller = select.poll()
+        poller.register(client, select.POLLIN)
+        return poller
+    
+    @staticmethod
+    def _client_closed(poller, client, ms):
+        """Aguarda `ms` no poll do stream; retorna True se o cliente fechou
+        
+        Clientes SSE não enviam nada após a requisição: bytes recebidos são
+        descartados e fim de conexão (ou erro) encerra o stream na hora, sem
+        esperar o próximo envio (até STREAM_HEARTBEAT com mode=change).
+        """
+        for entry in poller.poll(ms):
+            if entry[1] & (select.POLLHUP | select.POLLERR) or not client.recv(64):
+                return True
+        return False
+            
+    def _subscription_loop(self, client, rate, sub):
+        """Envia como eventos SSE apenas os sinais assinados que mudaram
+        
+        Cada evento é um delta no formato de /data (`delta: true`), exceto
+        o primeiro, com todos os sinais assinados.
+        """
+        interval = int(1000 / rate)
+        can = self.can_handler
+        delta = False
+        try:
+            client.settimeout(self.STREAM_SEND_TIMEOUT)
+            self._send_stream_header(client)
+            self.logger.debug('web_server', 'Stream da assinatura %s iniciado (%s Hz)', sub.id, rate)
+            
+            sub.sent.clear()
+            sub.version = -1
+            poller = self._stream_poller(client)
+            last_sent = time.ticks_ms()
+            while self.running and sub.id in self.subscriptions.subs:
+                now = time.ticks_ms()
+                sub.last_used = now  # Stream aberto mantém a assinatura viva
+                version = can.version
+                signals = None
+                if version != sub.version:
+                    version, values, _, sources, ticks = can.read_state()
+                    sub.version = version
+                    signals = sub.select(values, sources)
+                    
+                if signals:
+                    body = json.dumps({
+                        'timestamp': clock.unix(),
+                        'version': version,
+                        'delta': delta,
+                        'ticks': {'bus': ticks[0], 'decoded': ticks[1]},
+                        'signals': signals
+                    })
+                    self._send(client, f'id: {version}\nticks: {time.ticks_ms()}\ndata: {body}\n\n'.encode())
+                    delta = True
+                    last_sent = now
+                elif time.ticks_diff(now, last_sent) >= self.STREAM_HEARTBEAT * 1000:
+                    client.send(b': ping\n\n')
+                    last_sent = now
+                    
+                if self._client_closed(poller, client, interval):
+                    break
                 
-    def send_json_response(self, client, data):
+        except OSError:
+            self.logger.debug('web_server', 'Cliente do stream desconectou')
+        except Exception as e:
+            self.logger.error('web_server', f'Erro no stream: {e}')
+        finally:
+            self._release_stream()
+            client.close()
+            
+    def handle_websocket(self, client, request):
+        """Aceita upgrade WebSocket em /ws para envio de frames brutos
+        
+        Retorna True se a conexão passou para a thread do WebSocket.
+        """
+        headers = request.headers
+        key = headers.get('sec-websocket-key')
+        if not key or headers.get('upgrade', '').lower() != 'websocket':
+            self.send_error(client, 'Upgrade WebSocket requerido')
+            return False
+            
+        if not self._reserve_stream():
+            self.send_streams_busy(client)
+            return False
+            
+        accept = ubinascii.b2a_base64(hashlib.sha1((key + self.WS_GUID).encode()).digest())[:-1]
+        client.send(b'HTTP/1.1 101 Switching Protocols\r\n'
+                    b'Upgrade: websocket\r\n'
+                    b'Connection: Upgrade\r\n'
+                    b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+                    
+        try:
+            _thread.start_new_thread(self._ws_loop, (client,))
+        except Exception as e:
+            self._release_stream()
+            self.logger.error('web_server', f'Erro ao iniciar WebSocket: {e}')
+            return False
+        return True
+        
+    def _ws_loop(self, client):
+        """Envia lotes binários de frames do buffer circular
+        
+        Cada mensagem binária é um lote wire_format.KIND_FRAMES (cabeçalho
+        seguido de registros FrameBuffer.RECORD).
+        O cliente envia texto JSON {"op": "subscribe"|"unsubscribe", "pgns": [...]}
+        para filtrar PGNs; sem filtros todos os frames são enviados.
+        """
+        frames = self.can_handler.frames
+        header_size = wire_format.HEADER_SIZE
+        out = bytearray(header_size + self.WS_BATCH_FRAMES * frames.RECORD_SIZE)
+        view = memoryview(out)
+        pgns = None
+        cursor = frames.seq
+        
+        poller = select.poll()
+        poller.register(client, select.POLLIN)
+        self.logger.debug('web_server', 'WebSocket de frames iniciado')
+        try:
+            client.settimeout(self.STREAM_SEND_TIMEOUT)
+            while self.running:
+                # Mensagens do cliente (filtros, ping, close)
+                if poller.poll(self.WS_INTERVAL_MS):
+                    opcode, payload = self._ws_recv(client)
+                    if opcode == 0x8:
+                        self._ws_send(client, 0x8, payload[:2])
+                        break
+                    elif opcode == 0x9:
+                        self._ws_send(client, 0xA, payload)
+                    elif opcode == 0x1:
+                        pgns = self._ws_apply_filter(pgns, payload)
+                        
+                # Cliente lento: descarta o atraso em vez de acumular
+                skipped = frames.seq - cursor > self.WS_MAX_BACKLOG
+                if skipped:
+                    cursor = frames.seq - self.WS_MAX_BACKLOG
+                    self.ws_dropped += 1
+                    
+                # Envia todos os frames novos em lotes
+                while cursor < frames.seq:
+                    cursor, count, overrun = frames.read_into(
+                        cursor, view[header_size:], self.WS_BATCH_FRAMES, pgns)
+                    overrun = overrun or skipped
+                    skipped = False
+                    if overrun:
+                        self.logger.warning('web_server', 'WebSocket perdeu frames (buffer sobrescrito)')
+                    if count:
+                        wire_format.pack_header(out, wire_format.KIND_FRAMES,
+                                                wire_format.FLAG_OVERRUN if overrun else 0,
+                                                count, cursor)
+                        self._ws_send(client, 0x2, view[:header_size + count * frames.RECORD_SIZE])
+                        
+        except OSError:
+            self.logger.debug('web_server', 'Cliente WebSocket desconectou')
+        except Exception as e:
+            self.logger.error('web_server', f'Erro no WebSocket: {e}')
+        finally:
+            self._release_stream()
+            client.close()
+            
+    def _ws_apply_filter(self, pgns, payload):
+        """Aplica mensagem de subscribe/unsubscribe ao conjunto de PGNs"""
+        try:
+            msg = json.loads(payload)
+            requested = set(int(p) for p in msg.get('pgns', []))
+            if msg.get('op') == 'subscribe':
+                pgns = (pgns or set()) | requested
+            elif msg.get('op') == 'unsubscribe':
+                if pgns is not None:
+                    pgns = (pgns - requested) or None
+            self.logger.debug('web_server', 'Filtro WebSocket: %s', pgns)
+        except Exception as e:
+            self.logger.warning('web_server', f'Mensagem WebSocket inválida: {e}')
+        return pgns
+        
+    def _recv_exact(self, client, size):
+        """Lê exatamente `size` bytes do socket"""
+        data = b''
+        while len(data) < size:
+            chunk = client.recv(size - len(data))
+            if not chunk:
+                raise OSError('Conexão fechada')
+            data += chunk
+        return data
+        
+    def _ws_recv(self, client):
+        """Lê um frame WebSocket do cliente, retornando (opcode, payload)"""
+        b0, b1 = self._recv_exact(client, 2)
+        length = b1 & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', self._recv_exact(client, 2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', self._recv_exact(client, 8))[0]
+        mask = self._recv_exact(client, 4) if b1 & 0x80 else None
+        payload = bytearray(self._recv_exact(client, length)) if length else bytearray()
+        if mask:
+            for i in range(length):
+                payload[i] ^= mask[i & 3]
+        return b0 & 0x0F, bytes(payload)
+        
+    def _ws_send(self, client, opcode, payload):
+        """Envia frame WebSocket (servidor não usa máscara)"""
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('>BB', 0x80 | opcode, length)
+        else:
+            header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+        client.send(header)
+        self._send(client, payload)
+        
+    def start_publisher(self):
+        """Inicia publicação periódica de datagramas UDP"""
+        try:
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self.UDP_ADDRESS.endswith('.255'):
+                self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            self.udp_target = socket.getaddrinfo(self.UDP_ADDRESS, self.UDP_PORT)[0][-1]
+            _thread.start_new_thread(self._publish_loop, ())
+            self.logger.info('web_server', f'Publicação UDP ({self.UDP_MODE}) em {self.UDP_ADDRESS}:{self.UDP_PORT}')
+        except Exception as e:
+            self.logger.error('web_server', f'Erro ao iniciar publicação UDP: {e}')
+            
+    def _publish_loop(self):
+        """Envia um datagrama por tick, independente do número de ouvintes"""
+        frames = self.can_handler.frames
+        offset = wire_format.DATAGRAM_HEADER_SIZE
+        
+        if self.UDP_MODE == 'frames':
+            out = bytearray(offset + wire_format.HEADER_SIZE + self.UDP_BATCH_FRAMES * frames.RECORD_SIZE)
+            view = memoryview(out)
+            cursor = frames.seq
+        else:
+            # Encoder próprio: o buffer do HTTP é usado por outra thread
+            encoder = wire_format.SnapshotEncoder(self.can_handler.decoder, frames.RECORD_SIZE)
+            out = bytearray(offset + len(encoder.buf))
+            view = memoryview(out)
+            
+        interval = int(1000 / self.UDP_RATE)
+        seq = 0
+        while self.running:
+            if not self.wifi_manager.connected:
+                # Sem rede: não monta datagramas até a reconexão
+                time.sleep_ms(interval)
+                continue
+            try:
+                if self.UDP_MODE == 'frames':
+                    # Todos os frames novos, em quantos datagramas forem necessários
+                    while cursor < frames.seq:
+                        cursor, count, overrun = frames.read_into(
+                            cursor, view[offset + wire_format.HEADER_SIZE:], self.UDP_BATCH_FRAMES)
+                        wire_format.pack_header(view[offset:], wire_format.KIND_FRAMES,
+                                                wire_format.FLAG_OVERRUN if overrun else 0,
+                                                count, cursor)
+                        struct.pack_into(wire_format.DATAGRAM_HEADER, out, 0, seq)
+                        seq = (seq + 1) & 0xFFFFFFFF
+                        size = offset + wire_format.HEADER_SIZE + count * frames.RECORD_SIZE
+                        self.udp_socket.sendto(view[:size], self.udp_target)
+                else:
+                    version, signals, _ = self.can_handler.read_signals()
+                    record = frames.record(frames.seq - 1) if frames.seq else None
+                    payload = encoder.encode(version, clock.unix(), record, signals)
+                    struct.pack_into(wire_format.DATAGRAM_HEADER, out, 0, seq)
+                    seq = (seq + 1) & 0xFFFFFFFF
+                    view[offset:offset + len(payload)] = payload
+                    self.udp_socket.sendto(view[:offset + len(payload)], self.udp_target)
+                    
+            except OSError as e:
+                # Sem rede momentaneamente: o receptor verá a lacuna na sequência
+                self.logger.debug('web_server', 'Falha ao enviar datagrama: %s', e)
+            time.sleep_ms(interval)
+            
+    def get_schema(self):
+        """Retorna esquema de sinais para clientes do formato binário"""
+        return {
+            'content_type': wire_format.CONTENT_TYPE,
+            'signals': self.can_handler.decoder.get_schema()
+        }
+        
+    def get_snapshot(self, binary=False, frame=True):
+        """Retorna (versão, sequência de frames, corpo) do snapshot completo
+        
+        Os sinais são serializados uma vez por versão dos dados e servidos
+        a todos os clientes (HTTP e SSE) até a próxima mudança. Hora e,
+        com `frame`, o último frame bruto entram em cada resposta, sobre a
+        parte em cache. A sequência é lida antes do frame, para o ETag
+        nunca ser mais novo que o corpo.
+        """
+        version, signals_part = self._cached_signals(binary)
+        frames = self.can_handler.frames
+        seq = frames.seq
+        if binary:
+            body = bytearray(signals_part)
+            struct.pack_into('<I', body, wire_format.HEADER_SIZE, int(clock.unix()) & 0xFFFFFFFF)
+            if frame and seq:
+                body[wire_format.HEADER_SIZE + 4:self.snapshot_encoder.signals_offset] = frames.record(seq - 1)
+                body[1] |= wire_format.FLAG_FRAME
+            return version, seq, body
+        return version, seq, b''.join((
+            f'{{"timestamp": {json.dumps(clock.unix())}, "data": '.encode(),
+            json.dumps(self.can_handler.read_message() if frame else None).encode(),
+            b', ', signals_part))
+    
+    def _cached_signals(self, binary):
+        """(versão, parte do snapshot sem hora e frame), serializada uma vez por versão
+        
+        Binário: snapshot sem frame, com hora e frame preenchidos por
+        resposta. JSON: o objeto a partir de `version`, sem a `{` inicial.
+        """
+        fmt = 'bin' if binary else 'json'
+        version = self.can_handler.version
+        cached = self._snapshot_cache.get(fmt)
+        if cached and cached[0] == version:
+            self.cache_hits += 1
+            return cached
+            
+        with self._cache_lock:
+            cached = self._snapshot_cache.get(fmt)
+            if cached and cached[0] == version:
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+            
+            # Versão e sinais da mesma publicação da aquisição
+            version, signals, ticks = self.can_handler.read_signals()
+            if binary:
+                part = bytes(self.snapshot_encoder.encode(version, 0, None, signals))
+            else:
+                part = json.dumps({
+                    'version': version,
+                    'delta': False,
+                    'ticks': {'bus': ticks[0], 'decoded': ticks[1]},
+                    'signals': signals
+                }).encode()[1:]
+            cached = (version, part)
+            self._snapshot_cache[fmt] = cached
+            return cached
+            
+    def send_data(self, client, request):
+        """Envia snapshot atual em JSON ou, se pedido via Accept, em binário
+        
+        `/data?since=<versão>` envia apenas os sinais alterados depois da
+        versão informada. O último frame bruto só vai no corpo com
+        `frame=1` (ou por /frames). O ETag é a versão dos sinais
+        (`"<versão>"`; `"<versão>.<seq do frame>"` com `frame=1`) e
+        `If-None-Match` igual recebe 304 sem corpo. Os sinais do snapshot
+        completo vêm do cache.
+        """
+        query, headers = request.query, request.headers
+        binary = wire_format.accepts_binary(headers)
+        version = self.can_handler.version
+        frame = bool(query.get('frame')) and 'sub' not in query
+        # Com o frame bruto no corpo, o ETag muda a cada frame
+        etag = f'"{version}.{self.can_handler.frames.seq}"' if frame else f'"{version}"'
+        if headers.get('if-none-match') == etag:
+            return self.send_not_modified(client, etag)
+            
+        if 'sub' in query:
+            return self.send_subscription_data(client, self.get_subscription(query['sub']), binary)
+            
+        try:
+            since = int(query['since']) if 'since' in query else None
+        except ValueError:
+            return self.send_error(client, 'Versão inválida')
+            
+        # Sem versão ou versão futura (ESP32 reiniciou): snapshot completo
+        if since is None or since > version:
+            version, seq, body = self.get_snapshot(binary, frame)
+            etag = f'"{version}.{seq}"' if frame else f'"{version}"'
+            content_type = wire_format.CONTENT_TYPE if binary else 'application/json'
+            self._send(client, b''.join(((
+                'HTTP/1.1 200 OK\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'ETag: {etag}\r\n'
+                'Vary: Accept\r\n'
+                'Access-Control-Allow-Origin: *\r\n'
+                'Access-Control-Expose-Headers: ETag, X-Device-Ticks\r\n'
+                f'{self._connection_header(client)}'
+                f'X-Device-Ticks: {time.ticks_ms()}\r\n\r\n').encode(), body)))
+            return
+            
+        frames = self.can_handler.frames
+        seq = frames.seq if frame else 0
+        version, signals, ticks = self.can_handler.read_signals(since)
+        data = self.can_handler.read_message() if frame else None
+        etag = f'"{version}.{seq}"' if frame else f'"{version}"'
+        
+        if binary:
+            record = frames.record(seq - 1) if seq else None
+            with self._cache_lock:
+                payload = bytes(self.snapshot_encoder.encode(
+                    version, clock.unix(), record, signals, True))
+            return self.send_binary_response(client, payload, {'ETag': etag})
+            
+        return self.send_json_response(client, {
+            'timestamp': clock.unix(),
+            'version': version,
+            'delta': True,
+            'ticks': {'bus': ticks[0], 'decoded': ticks[1]},
+            'data': data,
+            'signals': signals
+        }, {'ETag': etag})
+        
+    def send_subscription_data(self, client, sub, binary):
+        """Envia apenas os sinais da assinatura que mudaram além da banda morta
+        
+        A primeira leitura traz todos os sinais assinados (`delta: false`);
+        as seguintes, apenas o que mudou desde a última entrega.
+        """
+        can = self.can_handler
+        version = can.version
+        delta = bool(sub.sent)
+        signals = {}
+        ticks = None
+        if version != sub.version:
+            version, values, _, sources, ticks = can.read_state()
+            signals = sub.select(values, sources)
+        sub.version = version
+        etag = f'"{version}"'
+        
+        if binary:
+            with self._cache_lock:
+                payload = bytes(self.snapshot_encoder.encode(version, clock.unix(), None, signals, delta))
+            return self.send_binary_response(client, payload, {'ETag': etag})
+            
+        return self.send_json_response(client, {
+            'timestamp': clock.unix(),
+            'version': version,
+            'delta': delta,
+            'ticks': {'bus': ticks[0], 'decoded': ticks[1]} if ticks else None,
+            'data': None,
+            'signals': signals
+        }, {'ETag': etag})
+        
+    def get_stats(self):
+        """Retorna contadores do servidor"""
+        return {
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'streams': self._streams,
+            'subscriptions': len(self.subscriptions.subs),
+            'suppressed_updates': self.can_handler.suppressed,
+            'rate_limited': self.rate_limiter.rejected,
+            'ws_backlog_drops': self.ws_dropped,
+            'acq_max_gap_ms': self.can_handler.max_gap_ms,
+            'acq_late_polls': self.can_handler.late_polls
+        }
+        
+    def send_frames(self, client, request):
+        """Envia frames do buffer após o cursor (/frames?since=<seq>&max=<n>)
+        
+        Sem `since` começa no frame mais antigo disponível. `next` é o cursor
+        da próxima chamada; `lost` conta frames sobrescritos antes da leitura.
+        """
+        query, headers = request.query, request.headers
+        frames = self.can_handler.frames
+        try:
+            since = int(query.get('since', frames.oldest()))
+            max_count = min(int(query.get('max', self.FRAMES_DEFAULT)), self.FRAMES_MAX)
+        except ValueError:
+            return self.send_error(client, 'Parâmetros inválidos')
+            
+        # Cursor à frente do buffer: ESP32 reiniciou desde a última leitura
+        reset = since > frames.seq
+        if reset:
+            since = frames.oldest()
+        lost = max(0, frames.oldest() - since)
+        
+        if wire_format.accepts_binary(headers):
+            out = bytearray(wire_format.HEADER_SIZE + max_count * frames.RECORD_SIZE)
+            view = memoryview(out)
+            next_seq, count, overrun = frames.read_into(since, view[wire_format.HEADER_SIZE:], max_count)
+            flags = wire_format.FLAG_OVERRUN if overrun or reset else 0
+            wire_format.pack_header(out, wire_format.KIND_FRAMES, flags, count, next_seq)
+            return self.send_binary_response(
+                client, view[:wire_format.HEADER_SIZE + count * frames.RECORD_SIZE])
+                
+        start = max(since, frames.oldest())
+        end = min(frames.seq, start + max_count)
+        items = []
+        for seq in range(start, end):
+            ts, can_id, _, data = frames.unpack(seq)
+            items.append({'seq': seq, 'timestamp': ts, 'id': can_id, 'data': list(data)})
+            
+        return self.send_json_response(client, {
+            'frames': items,
+            'next': end,
+            'overrun': lost > 0 or reset,
+            'lost': lost,
+            'reset': reset
+        })
+        
+    def send_response(self, client, body, content_type='application/json', status=200, headers=''):
+        """Envia resposta completa com Content-Length (conexão reutilizável)
+        
+        Cabeçalho e corpo saem num único send: em dois segmentos pequenos o
+        Nagle do lwIP espera o ACK atrasado do cliente a cada resposta.
+        """
+        self._send(client, (
+            f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Access-Control-Allow-Origin: *\r\n'
+            f'X-Device-Ticks: {time.ticks_ms()}\r\n'
+            f'{self._connection_header(client)}'
+            f'{headers}\r\n'
+        ).encode() + bytes(body))
+    
+    def _send(self, client, data):
+        """Envia dados registrando o tempo bloqueado no histograma de envio"""
+        start = time.ticks_us()
+        client.send(data)
+        self.send_time.observe(time.ticks_diff(time.ticks_us(), start))
+    
+    def send_binary_response(self, client, payload, headers=None):
+        """Envia resposta no formato binário compacto"""
+        extra = ''.join(f'{k}: {v}\r\n' for k, v in headers.items()) if headers else ''
+        self.send_response(client, payload, wire_format.CONTENT_TYPE,
+                           headers='Vary: Accept\r\nAccess-Control-Expose-Headers: ETag, X-Device-Ticks\r\n' + extra)
+        
+    def send_json_response(self, client, data, headers=None):
         """Envia resposta JSON"""
-        response = f"""HTTP/1.1 200 OK
-Content-Type: application/json
-Access-Control-Allow-Origin: *
-
-{json.dumps(data)}"""
-        client.send(response.encode())
+        extra = ''.join(f'{k}: {v}\r\n' for k, v in headers.items()) if headers else ''
+        self.send_response(client, json.dumps(data).encode(),
+                           headers='Access-Control-Expose-Headers: ETag, X-Device-Ticks\r\n' + extra)
         
+    def send_not_modified(self, client, etag):
+        """Envia 304 sem corpo (cliente já tem a versão atual)"""
+        client.send(f'HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\nAccess-Control-Allow-Origin: *\r\n'
+                    f'{self._connection_header(client)}\r\n'.encode())
+        
+    def send_static(self, client, name, request):
+        """Envia página estática da flash em blocos, comprimida com gzip
+        
+        O arquivo `<name>.gz` é enviado sem descompactar; clientes sem
+        suporte a gzip recebem o conteúdo descompactado em fluxo.
+        """
+        headers = request.headers
+        path = name + '.gz'
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.logger.error('web_server', f'Página não encontrada: {path}')
+            client.send(f'HTTP/1.1 404 Not Found\r\n{self._connection_header(client)}Content-Length: 0\r\n\r\n'.encode())
+            return
+            
+        etag = f'"{stat[6]:x}-{stat[8]:x}"'
+        if headers.get('if-none-match') == etag:
+            return self.send_not_modified(client, etag)
+            
+        gzip_ok = 'gzip' in headers.get('accept-encoding', '')
+        if not gzip_ok and deflate is None:
+            client.send(f'HTTP/1.1 406 Not Acceptable\r\n{self._connection_header(client)}Content-Length: 0\r\n\r\n'.encode())
+            return
+            
+        with open(path, 'rb') as f:
+            if gzip_ok:
+                stream = f
+                encoding = f'Content-Encoding: gzip\r\nContent-Length: {stat[6]}\r\n{self._connection_header(client)}'
+            else:
+                # Tamanho descompactado desconhecido: o fim do corpo é o fechamento
+                stream = deflate.DeflateIO(f, deflate.GZIP)
+                encoding = 'Connection: close\r\n'
+                request.keep_alive = False
+                
+            client.send((
+                'HTTP/1.1 200 OK\r\n'
+                'Content-Type: text/html; charset=utf-8\r\n'
+                f'{encoding}'
+                f'Cache-Control: max-age={self.STATIC_MAX_AGE}\r\n'
+                f'ETag: {etag}\r\n'
+                'Vary: Accept-Encoding\r\n\r\n'
+            ).encode())
+            
+            buf = self._static_buf
+            view = memoryview(buf)
+            while True:
+                size = stream.readinto(buf)
+                if not size:
+                    break
+                client.send(view[:size])
+                
     def send_html_response(self, client, html):
         """Envia resposta HTML"""
-        response = f"""HTTP/1.1 200 OK
-Content-Type: text/html
-Access-Control-Allow-Origin: *
-
-{html}"""
-        client.send(response.encode())
+        self.send_response(client, html.encode(), 'text/html')
 
     def handle_disconnect(self):
         """Trata desconexão WiFi"""
@@ -268,10 +1554,15 @@ Access-Control-Allow-Origin: *
         """Inicia os servidores"""
         try:
             if self.wifi_manager.connect_saved():
+                boot_profile.mark('wifi_join')
                 self.logger.info('web_server', 'Conectado à rede WiFi')
+                self.clock.start()
                 self.start_data_server()
+                if self.UDP_ENABLED:
+                    self.start_publisher()
                 self.start_basic_server()
             else:
+                boot_profile.mark('wifi_timeout')
                 self.logger.info('web_server', 'Iniciando modo AP')
                 self.start_ap_mode()
                 
@@ -285,6 +1576,7 @@ Access-Control-Allow-Origin: *
             
             # Para threads e servidores
             self.running = False
+            self.clock.stop()
             
             # Limpa servidor de dados
             if hasattr(self, 'data_socket'):
@@ -315,231 +1607,5 @@ Access-Control-Allow-Origin: *
             self.logger.error('web_server', f'Erro ao limpar recursos: {e}') 
 
     def get_status_page(self):
-        """Retorna página de status do sistema"""
-        return """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>JohnDeere Monitor</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-        :root {
-            --jd-green: #367C2B;
-            --jd-yellow: #FDB515;
-        }
-        body {
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 0;
-            background: #f4f4f4;
-        }
-        .header {
-            background: var(--jd-green);
-            color: white;
-            padding: 1rem;
-            text-align: center;
-            border-bottom: 4px solid var(--jd-yellow);
-        }
-        .container {
-            max-width: 1200px;
-            margin: 20px auto;
-            padding: 20px;
-        }
-        .card {
-            background: white;
-            border-radius: 8px;
-            padding: 20px;
-            margin-bottom: 20px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }
-        .grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 20px;
-        }
-        .metric {
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            text-align: center;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }
-        .metric-value {
-            font-size: 24px;
-            font-weight: bold;
-            color: var(--jd-green);
-            margin: 10px 0;
-        }
-        .metric-label {
-            color: #666;
-            font-size: 14px;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-        }
-        th, td {
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #ddd;
-        }
-        th {
-            background: var(--jd-green);
-            color: white;
-        }
-        tr:nth-child(even) {
-            background: #f9f9f9;
-        }
-        .status {
-            display: inline-block;
-            width: 10px;
-            height: 10px;
-            border-radius: 50%;
-            margin-right: 5px;
-        }
-        .status.online {
-            background: #4CAF50;
-        }
-        h2 {
-            color: var(--jd-green);
-            margin-top: 30px;
-        }
-        .btn {
-            background: var(--jd-yellow);
-            color: white;
-            border: none;
-            padding: 10px 20px;
-            border-radius: 4px;
-            cursor: pointer;
-        }
-        .btn:hover {
-            background: #e5a313;
-        }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🚜 JohnDeere Monitor</h1>
-    </div>
-
-    <div class="container">
-        <div class="grid">
-            <div class="metric">
-                <div class="metric-label">Status</div>
-                <div class="metric-value">
-                    <span class="status online"></span>
-                    Online
-                </div>
-            </div>
-            <div class="metric">
-                <div class="metric-label">IP</div>
-                <div class="metric-value" id="system-ip">-</div>
-            </div>
-            <div class="metric">
-                <div class="metric-label">Porta de Dados</div>
-                <div class="metric-value">8502</div>
-            </div>
-        </div>
-
-        <h2>📊 Dados CAN</h2>
-        <div class="card">
-            <table>
-                <thead>
-                    <tr>
-                        <th>PGN</th>
-                        <th>Descrição</th>
-                        <th>Valor</th>
-                        <th>Unidade</th>
-                        <th>Timestamp</th>
-                    </tr>
-                </thead>
-                <tbody id="can-data">
-                    <!-- Dados serão inseridos aqui -->
-                </tbody>
-            </table>
-        </div>
-
-        <h2>⚙️ Configurações</h2>
-        <div class="card">
-            <table>
-                <tr>
-                    <td><strong>Rede:</strong></td>
-                    <td id="wifi-ssid">-</td>
-                </tr>
-                <tr>
-                    <td><strong>Sinal:</strong></td>
-                    <td id="wifi-signal">-</td>
-                </tr>
-                <tr>
-                    <td><strong>Modo:</strong></td>
-                    <td>Cliente</td>
-                </tr>
-            </table>
-        </div>
-    </div>
-
-    <script>
-        // Atualiza IP e SSID
-        document.getElementById('system-ip').textContent = window.location.hostname;
-        
-        // Atualiza dados CAN a cada segundo
-        setInterval(async () => {
-            try {
-                const response = await fetch('/data');
-                const data = await response.json();
-                
-                if (data && data.data) {
-                    const tbody = document.getElementById('can-data');
-                    tbody.innerHTML = '';
-                    
-                    for (const [key, value] of Object.entries(data.data)) {
-                        const row = document.createElement('tr');
-                        row.innerHTML = `
-                            <td>${getPGN(key)}</td>
-                            <td>${getDescription(key)}</td>
-                            <td>${value}</td>
-                            <td>${getUnit(key)}</td>
-                            <td>${new Date().toLocaleTimeString()}</td>
-                        `;
-                        tbody.appendChild(row);
-                    }
-                }
-            } catch (error) {
-                console.error('Erro:', error);
-            }
-        }, 1000);
-
-        // Funções auxiliares
-        function getPGN(key) {
-            const pgns = {
-                'engine_speed': '0xF004',
-                'engine_temp': '0xFEEE',
-                'vehicle_speed': '0xFEF1'
-            };
-            return pgns[key] || '-';
-        }
-
-        function getDescription(key) {
-            const descriptions = {
-                'engine_speed': 'Velocidade do Motor',
-                'engine_temp': 'Temperatura do Motor',
-                'vehicle_speed': 'Velocidade do Veículo'
-            };
-            return descriptions[key] || key;
-        }
-
-        function getUnit(key) {
-            const units = {
-                'engine_speed': 'RPM',
-                'engine_temp': '°C',
-                'vehicle_speed': 'km/h'
-            };
-            return units[key] || '-';
-        }
-    </script>
-</body>
-</html>
-""" 
\ No newline at end of file
+        """Retorna arquivo da página de status (servido da flash)"""
+        return self.STATUS_PAGE
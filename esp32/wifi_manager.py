@@ -3,16 +3,85 @@ import json
 import os
 import _thread
 import time
-from logger import Logger
+import ubinascii
+from logger import get_logger
 
 class WifiManager:
+    # Varredura em segundo plano enquanto o portal captivo está ativo
+    SCAN_INTERVAL = 30       # Segundos entre varreduras
+    SCAN_TTL = 90            # Resultado mais antigo que isso não é servido
+    SCAN_MIN_INTERVAL = 5    # Segundos mínimos entre varreduras pedidas pelo cliente
+    
+    # Conexão: o caminho rápido usa BSSID, canal e IP da última conexão
+    # (salvos em wifi_config.json) e pula varredura e DHCP
+    CONNECT_TIMEOUT_MS = 10000   # Caminho completo
+    FAST_TIMEOUT_MS = 3000       # Caminho rápido; depois cai no completo
+    FAST_STATIC_IP = True        # Reusa o último IP do DHCP como fixo
+    CONNECT_POLL_MS = 50
+    BOOT_TIMEOUT_MS = 20000      # Espera no boot antes de cair no modo AP
+    
+    # Após o caminho rápido com IP fixo o DHCP é religado em segundo plano:
+    # renova a concessão no roteador (o IP não é tomado por outro aparelho)
+    DHCP_RENEW_DELAY_MS = 5000   # Depois de conectar (deixa o boot terminar)
+    DHCP_TIMEOUT_MS = 10000      # Sem IP nesse prazo volta ao IP fixo
+    
+    # Estados da conexão (ver `step`)
+    IDLE = 'idle'
+    JOINING = 'joining'
+    CONNECTED = 'connected'
+    LOST = 'lost'
+    
+    # Monitoramento: passo da máquina de estados, espera entre tentativas
+    # (dobra a cada falha) e amostragem do sinal
+    MONITOR_INTERVAL_MS = 200
+    BACKOFF_MIN_MS = 1000
+    BACKOFF_MAX_MS = 60000
+    RSSI_INTERVAL_MS = 5000
+    
     def __init__(self):
-        self.logger = Logger()
+        self.logger = get_logger()
         self.sta_if = network.WLAN(network.STA_IF)
         self.ap_if = network.WLAN(network.AP_IF)
         self.config_file = 'wifi_config.json'
-        self._monitor_thread = None
-        self._running = True
+        self._monitoring = False
+        self._monitor_active = False
+        
+        # Máquina de estados (alterada só por `step`)
+        self.config = None
+        self.state = self.IDLE
+        self.state_since = time.ticks_ms()
+        self._listeners = []
+        self._join_fast = False
+        self._join_start = 0
+        self._join_scan_ms = 0
+        self._join_deadline = 0
+        self._join_ap = None
+        self._retry_at = 0
+        self._backoff_ms = self.BACKOFF_MIN_MS
+        self.disconnects = 0
+        self._renew_at = None        # Religar o DHCP (ticks_ms)
+        self._renew_deadline = None  # DHCP religado aguardando concessão
+        
+        # Qualidade da conexão: último RSSI e média móvel exponencial (1/4)
+        self.rssi = None
+        self.rssi_avg = None
+        self._rssi_at = 0
+        
+        # Cache da última varredura (ticks_ms de quando terminou)
+        self._networks = []
+        self._scanned_at = None
+        self._scan_attempt = None
+        self._scanner_running = False
+        self.scanning = False
+        self.scan_requested = False
+        
+        # Estados em que a associação já falhou (não adianta esperar o timeout)
+        self._join_failed = tuple(
+            getattr(network, name) for name in
+            ('STAT_WRONG_PASSWORD', 'STAT_NO_AP_FOUND', 'STAT_ASSOC_FAIL', 'STAT_HANDSHAKE_TIMEOUT')
+            if hasattr(network, name))
+        self.join_path = None
+        self.join_ms = None
         
     def start_ap(self):
         """Inicia modo AP"""
@@ -31,52 +100,338 @@ class WifiManager:
         self.ap_if.active(False)
         
     def scan_networks(self):
-        """Busca redes disponíveis"""
+        """Busca redes disponíveis (ocupa o rádio por alguns segundos)
+        
+        Atualiza o cache lido por `cached_networks`. Cada SSID aparece uma
+        vez, com o sinal mais forte, da rede mais forte para a mais fraca.
+        """
+        self.scanning = True
+        self._scan_attempt = time.ticks_ms()
         try:
             self.sta_if.active(True)
-            networks = self.sta_if.scan()
-            return [{'ssid': net[0].decode(), 'rssi': net[3]} for net in networks]
+            strongest = {}
+            for net in self.sta_if.scan():
+                ssid = net[0].decode()
+                if ssid and net[3] > strongest.get(ssid, -999):
+                    strongest[ssid] = net[3]
+            networks = [{'ssid': ssid, 'rssi': rssi} for ssid, rssi in
+                        sorted(strongest.items(), key=lambda item: -item[1])]
+            self._networks = networks
+            self._scanned_at = time.ticks_ms()
+            return networks
         except Exception as e:
             self.logger.error('wifi', f'Erro ao buscar redes: {e}')
             return []
+        finally:
+            self.scanning = False
             
-    def connect(self, ssid, password):
-        """Conecta em rede WiFi"""
-        try:
-            self.sta_if.active(True)
-            self.sta_if.connect(ssid, password)
+    def cached_networks(self):
+        """Retorna (redes, idade em segundos) da última varredura, sem varrer
+        
+        Sem varredura ou com resultado mais velho que SCAN_TTL, a lista
+        vem vazia; a idade é None se nenhuma varredura terminou.
+        """
+        if self._scanned_at is None:
+            return [], None
+        age = time.ticks_diff(time.ticks_ms(), self._scanned_at) // 1000
+        if age > self.SCAN_TTL:
+            return [], age
+        return self._networks, age
+        
+    def request_scan(self):
+        """Pede ao scanner uma varredura imediata, respeitando SCAN_MIN_INTERVAL"""
+        last = self._scan_attempt
+        if last is None or time.ticks_diff(time.ticks_ms(), last) >= self.SCAN_MIN_INTERVAL * 1000:
+            self.scan_requested = True
             
-            # Aguarda conexão
-            for _ in range(20):  # 10 segundos timeout
-                if self.sta_if.isconnected():
-                    ip = self.sta_if.ifconfig()[0]
-                    self.logger.info('wifi', f'Conectado à rede {ssid}')
-                    self.logger.info('wifi', f'IP na rede local: {ip}')
-                    
-                    # Salva configuração
-                    config = {'ssid': ssid, 'password': password}
-                    with open(self.config_file, 'w') as f:
-                        json.dump(config, f)
-                        
-                    return True
-                time.sleep(0.5)
+    @property
+    def scanner_active(self):
+        """Indica se a varredura periódica está rodando"""
+        return self._scanner_running
+        
+    def start_scanner(self):
+        """Inicia varredura periódica em segundo plano (portal captivo)"""
+        if not self._scanner_running:
+            self._scanner_running = True
+            self.scan_requested = True
+            _thread.start_new_thread(self._scan_loop, ())
             
-            self.logger.error('wifi', f'Timeout ao conectar em {ssid}')
-            return False
+    def stop_scanner(self):
+        """Para a varredura periódica e aguarda a varredura em andamento"""
+        self._scanner_running = False
+        for _ in range(50):
+            if not self.scanning:
+                break
+            time.sleep_ms(100)
             
-        except Exception as e:
-            self.logger.error('wifi', f'Erro ao conectar: {e}')
-            return False
+    def _scan_loop(self):
+        """Varre a cada SCAN_INTERVAL ou quando um cliente pede"""
+        while self._scanner_running:
+            last = self._scan_attempt
+            due = last is None or time.ticks_diff(time.ticks_ms(), last) >= self.SCAN_INTERVAL * 1000
+            if self.scan_requested or due:
+                self.scan_requested = False
+                self.scan_networks()
+            time.sleep_ms(200)
             
+    def connect(self, ssid, password):
+        """Conecta em nova rede (portal captivo) pelo caminho completo
+        
+        Bloqueia quem chama até conectar ou falhar; o monitoramento, se
+        estava ativo, é interrompido.
+        """
+        self.stop_monitoring()
+        self.stop_scanner()  # Varredura em andamento impede a associação
+        self.config = {'ssid': ssid, 'password': password}
+        self._begin_join(False)
+        while self.state == self.JOINING:
+            time.sleep_ms(self.CONNECT_POLL_MS)
+            self.step()
+        return self.state == self.CONNECTED
+    
     def connect_saved(self):
-        """Conecta usando configuração salva"""
+        """Conecta usando configuração salva e mantém a conexão monitorada
+        
+        Aguarda até BOOT_TIMEOUT_MS; sem conexão, para o monitoramento
+        (o chamador cai no modo AP).
+        """
         try:
-            if self.config_file in os.listdir():
-                with open(self.config_file) as f:
-                    config = json.load(f)
-                return self.connect(config['ssid'], config['password'])
-        except:
+            self.config = self.load_config()
+        except Exception as e:
+            self.logger.error('wifi', f'Erro ao ler configuração: {e}')
+            self.config = None
+        if not self.config:
             return False
+        self.start_monitoring()
+        if self.wait_for(self.CONNECTED, self.BOOT_TIMEOUT_MS):
+            return True
+        self.stop_monitoring()
+        return False
+    
+    def load_config(self):
+        """Retorna a configuração salva ou None"""
+        if self.config_file not in os.listdir():
+            return None
+        with open(self.config_file) as f:
+            return json.load(f)
+    
+    def save_config(self, config):
+        """Grava configuração de conexão"""
+        with open(self.config_file, 'w') as f:
+            json.dump(config, f)
+    
+    def _find_ap(self, ssid):
+        """(BSSID, canal) do AP mais forte da rede ou None"""
+        best = None
+        try:
+            for net in self.sta_if.scan():
+                if net[0].decode() == ssid and (best is None or net[3] > best[3]):
+                    best = net
+        except Exception as e:
+            self.logger.warning('wifi', f'Erro na varredura: {e}')
+        return (best[1], best[2]) if best else None
+    
+    def _begin_join(self, fast):
+        """Dispara a associação sem esperar por ela (estado JOINING)
+        
+        O caminho completo varre antes para escolher o AP mais forte; a
+        varredura ocupa a thread que chama por alguns segundos.
+        """
+        config = self.config
+        self._join_fast = fast
+        self._join_start = time.ticks_ms()
+        self._join_scan_ms = 0
+        self._join_ap = None
+        self._renew_at = None
+        self._renew_deadline = None
+        self._set_state(self.JOINING)
+        try:
+            self.sta_if.active(True)
+            if fast:
+                try:
+                    self.sta_if.config(channel=config['channel'])
+                except Exception:
+                    pass  # Firmware sem canal fixo em STA: o BSSID ainda evita a varredura completa
+                if self.FAST_STATIC_IP and config.get('ifconfig'):
+                    self.sta_if.ifconfig(tuple(config['ifconfig']))
+                self.sta_if.connect(config['ssid'], config['password'],
+                                    bssid=ubinascii.unhexlify(config['bssid']))
+                timeout = self.FAST_TIMEOUT_MS
+            else:
+                self._join_ap = self._find_ap(config['ssid'])
+                self._join_scan_ms = time.ticks_diff(time.ticks_ms(), self._join_start)
+                if self._join_ap:
+                    self.sta_if.connect(config['ssid'], config['password'], bssid=self._join_ap[0])
+                else:
+                    self.sta_if.connect(config['ssid'], config['password'])  # Rede oculta ou fora da varredura
+                timeout = self.CONNECT_TIMEOUT_MS
+            self._join_deadline = time.ticks_add(time.ticks_ms(), timeout)
+        except Exception as e:
+            self.logger.error('wifi', f'Erro ao conectar: {e}')
+            self._join_deadline = time.ticks_ms()
+    
+    def _join_failed_now(self):
+        """Trata associação que falhou: caminho rápido cai no completo,
+        o completo agenda nova tentativa com espera exponencial"""
+        config = self.config
+        elapsed = time.ticks_diff(time.ticks_ms(), self._join_start)
+        try:
+            self.sta_if.disconnect()
+        except Exception:
+            pass
+        
+        if self._join_fast:
+            self.logger.warning('wifi', 'Reconexão rápida falhou após %d ms (status %s), usando caminho completo',
+                                elapsed, self.sta_if.status())
+            if self.FAST_STATIC_IP and config.get('ifconfig'):
+                try:
+                    self.sta_if.ifconfig('dhcp')
+                except Exception:
+                    pass
+            self._begin_join(False)
+            return
+        
+        self.logger.error('wifi', 'Falha ao conectar em %s após %d ms; nova tentativa em %d ms',
+                          config['ssid'], elapsed, self._backoff_ms)
+        self._retry_at = time.ticks_add(time.ticks_ms(), self._backoff_ms)
+        self._backoff_ms = min(self._backoff_ms * 2, self.BACKOFF_MAX_MS)
+        self._set_state(self.LOST)
+    
+    def _joined(self):
+        """Registra tempos da conexão e salva BSSID, canal e IP do caminho completo"""
+        config = self.config
+        self.join_path = 'rápido' if self._join_fast else 'completo'
+        self.join_ms = time.ticks_diff(time.ticks_ms(), self._join_start)
+        self._backoff_ms = self.BACKOFF_MIN_MS
+        self.logger.info('wifi', 'Conectado à rede %s em %d ms (caminho %s, varredura %d ms)',
+                         config['ssid'], self.join_ms, self.join_path, self._join_scan_ms)
+        self.logger.info('wifi', 'IP na rede local: %s', self.sta_if.ifconfig()[0])
+        
+        if not self._join_fast:
+            config = {'ssid': config['ssid'], 'password': config['password']}
+            if self._join_ap:
+                config['bssid'] = ubinascii.hexlify(self._join_ap[0]).decode()
+                config['channel'] = self._join_ap[1]
+                config['ifconfig'] = list(self.sta_if.ifconfig())
+            self.config = config
+            try:
+                self.save_config(config)
+            except OSError as e:
+                self.logger.error('wifi', f'Erro ao salvar configuração: {e}')
+        elif self.FAST_STATIC_IP and config.get('ifconfig'):
+            self._renew_at = time.ticks_add(time.ticks_ms(), self.DHCP_RENEW_DELAY_MS)
+        self._rssi_at = time.ticks_add(time.ticks_ms(), -self.RSSI_INTERVAL_MS)
+        self._set_state(self.CONNECTED)
+    
+    def step(self):
+        """Avança a máquina de estados sem esperar pelo rádio
+        
+        idle → joining → connected → lost → joining ... Chamado a cada
+        MONITOR_INTERVAL_MS pela thread de monitoramento; só o caminho
+        completo (varredura) demora, e apenas nessa thread.
+        """
+        state = self.state
+        now = time.ticks_ms()
+        
+        if state == self.JOINING:
+            if self.sta_if.isconnected():
+                self._joined()
+            elif (self.sta_if.status() in self._join_failed or
+                  time.ticks_diff(now, self._join_deadline) >= 0):
+                self._join_failed_now()
+        
+        elif state == self.CONNECTED:
+            if self._renew_deadline is not None:
+                self._check_lease(now)  # Sem IP até o DHCP responder: não é queda
+            elif not self.sta_if.isconnected():
+                self.disconnects += 1
+                self.logger.warning('wifi', 'Conexão perdida (RSSI médio %s dBm)', self.rssi_avg)
+                self._retry_at = now
+                self._set_state(self.LOST)
+            elif self._renew_at is not None and time.ticks_diff(now, self._renew_at) >= 0:
+                self._renew_lease(now)
+            elif time.ticks_diff(now, self._rssi_at) >= self.RSSI_INTERVAL_MS:
+                self._rssi_at = now
+                self._sample_rssi()
+        
+        elif state == self.LOST or state == self.IDLE:
+            if self.config and time.ticks_diff(now, self._retry_at) >= 0:
+                self._begin_join(bool(self.config.get('bssid')))
+    
+    def _renew_lease(self, now):
+        """Religa o DHCP após o caminho rápido com o IP da última concessão"""
+        self._renew_at = None
+        try:
+            self.sta_if.ifconfig('dhcp')
+        except Exception as e:
+            self.logger.warning('wifi', f'Erro ao religar DHCP: {e}')
+            return
+        self._renew_deadline = time.ticks_add(now, self.DHCP_TIMEOUT_MS)
+    
+    def _check_lease(self, now):
+        """Salva o IP da nova concessão; sem concessão no prazo volta ao fixo"""
+        config = self.config
+        ifconfig = list(self.sta_if.ifconfig())
+        has_ip = ifconfig[0] != '0.0.0.0'
+        if has_ip and ifconfig != config['ifconfig']:
+            self._renew_deadline = None
+            self.logger.info('wifi', 'Nova concessão DHCP: %s (era %s)', ifconfig[0], config['ifconfig'][0])
+            config['ifconfig'] = ifconfig
+            try:
+                self.save_config(config)
+            except OSError as e:
+                self.logger.error('wifi', f'Erro ao salvar configuração: {e}')
+        elif time.ticks_diff(now, self._renew_deadline) >= 0:
+            # Mesmo IP renovado, ou DHCP sem resposta (mantém o fixo)
+            self._renew_deadline = None
+            if not has_ip:
+                self.logger.warning('wifi', 'DHCP sem resposta; mantendo IP %s', config['ifconfig'][0])
+                try:
+                    self.sta_if.ifconfig(tuple(config['ifconfig']))
+                except Exception:
+                    pass
+    
+    def _sample_rssi(self):
+        """Lê a intensidade do sinal do AP (dBm)"""
+        try:
+            rssi = self.sta_if.status('rssi')
+        except Exception:
+            return
+        self.rssi = rssi
+        self.rssi_avg = rssi if self.rssi_avg is None else self.rssi_avg + (rssi - self.rssi_avg) / 4
+    
+    def _set_state(self, state):
+        """Troca de estado e avisa os interessados"""
+        previous = self.state
+        if state == previous:
+            return
+        self.state = state
+        self.state_since = time.ticks_ms()
+        self.logger.debug('wifi', 'Estado %s -> %s', previous, state)
+        for callback in self._listeners:
+            try:
+                callback(previous, state)
+            except Exception as e:
+                self.logger.error('wifi', f'Erro no aviso de estado: {e}')
+    
+    def on_change(self, callback):
+        """Registra callback(anterior, novo) chamado a cada troca de estado
+        
+        Roda na thread que avança a máquina: deve ser rápido e não bloquear.
+        """
+        self._listeners.append(callback)
+    
+    def wait_for(self, state, timeout_ms):
+        """Aguarda o estado por até timeout_ms; retorna se chegou nele"""
+        deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+        while self.state != state and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+            time.sleep_ms(self.CONNECT_POLL_MS)
+        return self.state == state
+    
+    @property
+    def connected(self):
+        """Indica se a estação tem IP (leitura sem consultar o rádio)"""
+        return self.state == self.CONNECTED
             
     def get_status(self):
         """Retorna status das conexões"""
@@ -84,34 +439,48 @@ class WifiManager:
             'ap_active': self.ap_if.active(),
             'sta_active': self.sta_if.active(),
             'sta_connected': self.sta_if.isconnected(),
-            'sta_ip': self.sta_if.ifconfig()[0] if self.sta_if.active() else None
+            'sta_ip': self.sta_if.ifconfig()[0] if self.sta_if.active() else None,
+            'state': self.state,
+            'rssi': self.rssi,
+            'join_path': self.join_path,
+            'join_ms': self.join_ms
         }
 
-    def monitor_connection(self):
-        """Monitora conexão WiFi e tenta reconectar se necessário"""
-        while self._running:
-            if not self.sta_if.isconnected():
-                self.logger.warning('wifi', 'Conexão perdida, tentando reconectar...')
-                self.reconnect()
-            time.sleep(5)
+    def start_monitoring(self):
+        """Inicia thread que mantém a conexão (máquina de estados)"""
+        if not self._monitoring:
+            self._monitoring = True
+            self._monitor_active = True
+            self._retry_at = time.ticks_ms()
+            _thread.start_new_thread(self._monitor_loop, ())
             
-    def reconnect(self):
-        """Tenta reconectar usando última configuração"""
+    def stop_monitoring(self):
+        """Para a thread de monitoramento e aguarda o passo em andamento"""
+        self._monitoring = False
+        for _ in range(100):
+            if not self._monitor_active:
+                break
+            time.sleep_ms(100)
+        if self.state == self.JOINING:
+            self.sta_if.disconnect()
+        self._set_state(self.IDLE)
+    
+    def _monitor_loop(self):
+        """Avança a máquina de estados a cada MONITOR_INTERVAL_MS"""
         try:
-            config = self.load_config()
-            if config:
-                self.connect(config['ssid'], config['password'])
-        except:
-            self.logger.error('wifi', 'Falha ao reconectar')
-            
-    def start_monitoring(self):
-        """Inicia thread de monitoramento"""
-        if not self._monitor_thread:
-            self._monitor_thread = _thread.start_new_thread(self.monitor_connection, ())
+            while self._monitoring:
+                try:
+                    self.step()
+                except Exception as e:
+                    self.logger.error('wifi', f'Erro no monitoramento: {e}')
+                time.sleep_ms(self.MONITOR_INTERVAL_MS)
+        finally:
+            self._monitor_active = False
             
     def cleanup(self):
         """Limpa recursos"""
-        self._running = False
+        self._monitoring = False
+        self._scanner_running = False
         if self.sta_if.active():
             self.sta_if.disconnect()
         if self.ap_if.active():
@@ -0,0 +1,82 @@
+import struct
+
+# Formato binário compacto dos endpoints de dados
+#
+# Toda mensagem começa com o cabeçalho '<BBHI':
+#   tipo, flags, quantidade de itens, campo de 32 bits dependente do tipo
+#
+# KIND_FRAMES: u32 = próxima sequência; itens = registros FrameBuffer.RECORD
+# KIND_SNAPSHOT: u32 = versão dos dados; segue timestamp '<I', o último
+#   frame bruto (registro FrameBuffer.RECORD, zerado se FLAG_FRAME ausente)
+#   e os itens '<Bf' (ID do sinal no esquema, valor)
+#
+# Datagramas UDP levam antes da mensagem o número de sequência '<I' do
+# datagrama, para o receptor detectar perdas.
+
+CONTENT_TYPE = 'application/x-jd-bin'
+
+HEADER = '<BBHI'
+HEADER_SIZE = 8
+SIGNAL = '<Bf'
+SIGNAL_SIZE = 5
+DATAGRAM_HEADER = '<I'
+DATAGRAM_HEADER_SIZE = 4
+
+KIND_FRAMES = 1
+KIND_SNAPSHOT = 2
+
+FLAG_OVERRUN = 0x01   # KIND_FRAMES: frames perdidos antes do lote
+FLAG_FRAME = 0x02     # KIND_SNAPSHOT: contém último frame bruto
+FLAG_DELTA = 0x04     # KIND_SNAPSHOT: apenas sinais alterados desde a versão pedida
+
+ENUM_UNKNOWN = 255    # Valor textual fora do esquema
+
+def pack_header(buf, kind, flags, count, value):
+    """Grava cabeçalho no início de `buf`"""
+    struct.pack_into(HEADER, buf, 0, kind, flags, count, value & 0xFFFFFFFF)
+
+class SnapshotEncoder:
+    """Serializa snapshots de sinais decodificados em buffer reutilizado"""
+    
+    def __init__(self, decoder, record_size):
+        self.record_size = record_size
+        self.ids = {}
+        self.enums = {}
+        for signal_id, (name, _, _) in enumerate(decoder.SIGNALS):
+            self.ids[name] = signal_id
+            if name in decoder.ENUMS:
+                self.enums[name] = decoder.ENUMS[name]
+        self.signals_offset = HEADER_SIZE + 4 + record_size
+        self.buf = bytearray(self.signals_offset + len(self.ids) * SIGNAL_SIZE)
+    
+    def encode(self, version, timestamp, record, signals, delta=False):
+        """Retorna memoryview com o snapshot empacotado"""
+        buf = self.buf
+        struct.pack_into('<I', buf, HEADER_SIZE, int(timestamp) & 0xFFFFFFFF)
+        if record is not None:
+            buf[HEADER_SIZE + 4:self.signals_offset] = record
+        else:
+            buf[HEADER_SIZE + 4:self.signals_offset] = bytes(self.record_size)
+        
+        pos = self.signals_offset
+        count = 0
+        for name, value in signals.items():
+            signal_id = self.ids.get(name)
+            if signal_id is None:
+                continue
+            if name in self.enums:
+                values = self.enums[name]
+                value = values.index(value) if value in values else ENUM_UNKNOWN
+            struct.pack_into(SIGNAL, buf, pos, signal_id, value)
+            pos += SIGNAL_SIZE
+            count += 1
+        
+        flags = FLAG_DELTA if delta else 0
+        if record is not None:
+            flags |= FLAG_FRAME
+        pack_header(buf, KIND_SNAPSHOT, flags, count, version)
+        return memoryview(buf)[:pos]
+
+def accepts_binary(headers):
+    """Verifica se o cliente pediu o formato binário no header Accept"""
+    return CONTENT_TYPE in headers.get('accept', '')
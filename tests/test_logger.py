@@ -0,0 +1,142 @@
+import gzip
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'esp32'), os.path.join(ROOT, 'tools')]
+
+MESSAGES = [
+    ('uso 100%', ()),
+    ('uso 100%', ()),          # Segunda ocorrência: vira modelo
+    ('carga %d%%', (75,)),
+    ('%s em 50%%', ('fila',)),
+    ('50% de %s', ()),
+    ('50% de %s', ()),
+]
+EXPECTED = ['uso 100%', 'uso 100%', 'carga 75%', 'fila em 50%', '50% de %s', '50% de %s']
+
+class FakeDeflate:
+    """Módulo deflate do MicroPython sobre o gzip; `fail` simula firmware
+    com o módulo mas sem o compressor"""
+    GZIP = 3
+    
+    def __init__(self, fail=False):
+        self.fail = fail
+    
+    def DeflateIO(self, stream, fmt, wbits):
+        if self.fail:
+            raise OSError(95, 'EOPNOTSUPP')
+        return gzip.GzipFile(fileobj=stream, mode='wb')
+
+@pytest.fixture
+def logger_module(tmp_path, monkeypatch):
+    """Módulo logger gravando em tmp_path, com as funções de tempo do MicroPython"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(time, 'ticks_ms', lambda: int(time.monotonic() * 1000), raising=False)
+    monkeypatch.setattr(time, 'ticks_diff', lambda a, b: a - b, raising=False)
+    real_time = time.time
+    monkeypatch.setattr(time, 'time', lambda: int(real_time()))
+    import logger as logger_module
+    return logger_module
+
+@pytest.fixture
+def logger(logger_module):
+    log = logger_module.Logger()
+    for message, args in MESSAGES:
+        log.info('teste', message, *args)
+    log.flush()
+    return log
+
+def test_log_reader_keeps_literal_percent(logger):
+    from logger import LogReader
+    lines = list(LogReader(logger.log_path).read())
+    assert [line.split('[teste] ', 1)[1] for line in lines] == EXPECTED
+
+def test_expand_logs_keeps_literal_percent(logger):
+    from expand_logs import LogExpander
+    expander = LogExpander()
+    entries = list(expander.parse(expander.read_file(logger.log_path)))
+    assert [entry[3] for entry in entries] == EXPECTED
+
+def rotate(log, first, count):
+    """Uma rotação por linha, com o servidor ocioso entre elas"""
+    for i in range(first, first + count):
+        log.info('teste', 'linha %d %s', i, 'x' * log.MAX_LOG_SIZE)
+        log.flush_if_due()
+
+def archived(log):
+    """Número da linha de cada rotacionado, do mais recente para o mais antigo"""
+    from expand_logs import LogExpander, collect
+    paths = [path for path in collect([log.log_dir]) if path != log.log_path]
+    expander = LogExpander()
+    lines = [[entry[3].split()[1] for entry in expander.parse(expander.read_file(path))]
+             for path in reversed(paths)]
+    return [os.path.basename(path) for path in reversed(paths)], lines
+
+def test_rotation_without_working_deflate_keeps_history(logger_module, monkeypatch):
+    monkeypatch.setattr(logger_module, 'deflate', FakeDeflate(fail=True))
+    monkeypatch.setattr(logger_module.Logger, 'MAX_LOG_SIZE', 100)
+    log = logger_module.Logger()
+    rotate(log, 0, 5)
+    names, lines = archived(log)
+    assert names == [f'{log.log_file}.{i}' for i in range(1, 6)]
+    assert lines == [['4'], ['3'], ['2'], ['1'], ['0']]
+
+def test_failed_compression_is_shifted_not_overwritten(logger_module, monkeypatch):
+    fake = FakeDeflate()
+    monkeypatch.setattr(logger_module, 'deflate', fake)
+    monkeypatch.setattr(logger_module.Logger, 'MAX_LOG_SIZE', 100)
+    log = logger_module.Logger()
+    fake.fail = True    # Falha só depois do teste do boot
+    rotate(log, 0, 3)
+    fake.fail = False
+    rotate(log, 3, 1)
+    names, lines = archived(log)
+    assert names == [f'{log.log_file}.1.gz'] + [f'{log.log_file}.{i}' for i in range(2, 5)]
+    assert lines == [['3'], ['2'], ['1'], ['0']]
+
+def test_deferred_rotation_keeps_buffering(logger_module, monkeypatch):
+    monkeypatch.setattr(logger_module, 'deflate', FakeDeflate())
+    monkeypatch.setattr(logger_module.Logger, 'MAX_LOG_SIZE', 100)
+    log = logger_module.Logger()
+    rotate(log, 0, 1)
+    log.info('teste', 'linha %d %s', 1, 'x' * log.MAX_LOG_SIZE)
+    log._archive()      # Como se a compressão do .1 estivesse em andamento
+    log.info('teste', 'linha %d %s', 2, 'x' * log.MAX_LOG_SIZE)
+    assert log._archive_pending and log._staged
+    
+    writes = []
+    write = log._write
+    monkeypatch.setattr(log, '_write', lambda data: writes.append(len(data)) or write(data))
+    for i in range(3, 6):
+        log.info('teste', 'linha %d %s', i, 'x' * log.MAX_LOG_SIZE)
+    assert writes == []     # Sem uma gravação por linha enquanto a rotação espera
+    
+    for _ in range(3):      # Termina a compressão, faz a rotação adiada e comprime
+        log.flush_if_due()
+    names, lines = archived(log)
+    assert names == [f'{log.log_file}.{i}.gz' for i in range(1, 5)]
+    assert lines == [['3', '4', '5'], ['2'], ['1'], ['0']]
+
+def test_tail_start_matches_full_read(logger_module):
+    from logger import LogReader
+    log = logger_module.Logger()
+    for i in range(log.TAIL_INDEX + 50):
+        log.info('teste' if i % 3 else 'outro', 'linha %d de %s', i, 'x' * (i % 7))
+        if i % 10 == 0:
+            log.info('teste', f'texto pronto {i}')
+    log.flush()
+    full = list(LogReader(log.log_path).read())
+    for count in (0, 1, 20, log.TAIL_INDEX):
+        reader = LogReader(log.log_path, log.tail_start(count))
+        assert list(reader.read()) == full[len(full) - count:]
+    assert log.tail_start(log.TAIL_INDEX + 1) is None
+    
+    # Depois de um boot as linhas anteriores não estão no índice
+    log = logger_module.Logger()
+    assert log.tail_start(1) is None
+    log.info('teste', 'linha nova')
+    assert list(LogReader(log.log_path, log.tail_start(1)).read())[0].endswith('linha nova')
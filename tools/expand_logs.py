@@ -0,0 +1,250 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import struct
+import sys
+from datetime import datetime, timedelta, timezone
+from urllib.request import Request, urlopen
+
+class LogExpander:
+    # Layout binário do ESP32 (ver esp32/logger.py)
+    REC_START = 0
+    REC_MODULE = 1
+    REC_TEMPLATE = 2
+    REC_ENTRY = 3
+    REC_TEXT = 4
+    
+    START = '<3sBH'      # b'JDL', versão, ano da época
+    MODULE = '<BH'       # ID, tamanho do nome
+    TEMPLATE = '<HH'     # ID, tamanho do texto
+    ENTRY = '<IBBHB'     # hora, nível, módulo, modelo, argumentos
+    TEXT = '<IBBH'       # hora, nível, módulo, tamanho do texto
+    
+    LEVELS = {10: 'DEBUG', 20: 'INFO', 30: 'WARNING', 40: 'ERROR', 50: 'CRITICAL'}
+    
+    def __init__(self):
+        self.epoch = datetime(2000, 1, 1, tzinfo=timezone.utc)
+        self.modules = {}
+        self.templates = {}
+    
+    @staticmethod
+    def read_file(path):
+        """Conteúdo do arquivo, descomprimindo os rotacionados (.gz)"""
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            return f.read()
+    
+    def parse(self, data):
+        """Decodifica registros em tuplas (hora, nível, módulo, mensagem)"""
+        offset = 0
+        while offset < len(data):
+            kind = data[offset]
+            offset += 1
+            
+            if kind == self.REC_START:
+                magic, version, year = struct.unpack_from(self.START, data, offset)
+                if magic != b'JDL' or version != 1:
+                    raise ValueError(f"Cabeçalho inválido na posição {offset - 1}")
+                offset += struct.calcsize(self.START)
+                self.epoch = datetime(year, 1, 1, tzinfo=timezone.utc)
+                self.modules = {}
+                self.templates = {}
+            
+            elif kind == self.REC_MODULE:
+                module_id, size = struct.unpack_from(self.MODULE, data, offset)
+                offset += struct.calcsize(self.MODULE)
+                self.modules[module_id] = data[offset:offset + size].decode(errors='replace')
+                offset += size
+            
+            elif kind == self.REC_TEMPLATE:
+                template_id, size = struct.unpack_from(self.TEMPLATE, data, offset)
+                offset += struct.calcsize(self.TEMPLATE)
+                self.templates[template_id] = data[offset:offset + size].decode(errors='replace')
+                offset += size
+            
+            elif kind == self.REC_ENTRY:
+                seconds, level, module_id, template_id, count = struct.unpack_from(self.ENTRY, data, offset)
+                offset += struct.calcsize(self.ENTRY)
+                args = []
+                for _ in range(count):
+                    tag = data[offset:offset + 1]
+                    offset += 1
+                    if tag == b'i':
+                        args.append(struct.unpack_from('<i', data, offset)[0])
+                        offset += 4
+                    elif tag == b'f':
+                        args.append(struct.unpack_from('<f', data, offset)[0])
+                        offset += 4
+                    elif tag == b's':
+                        size = struct.unpack_from('<H', data, offset)[0]
+                        offset += 2
+                        args.append(data[offset:offset + size].decode(errors='replace'))
+                        offset += size
+                    else:
+                        raise ValueError(f"Argumento desconhecido na posição {offset - 1}")
+                template = self.templates.get(template_id, f'<modelo {template_id}>')
+                try:
+                    message = template % tuple(args) if args else template
+                except (TypeError, ValueError):
+                    message = f"{template} {args}"
+                yield self.entry(seconds, level, module_id, message)
+            
+            elif kind == self.REC_TEXT:
+                seconds, level, module_id, size = struct.unpack_from(self.TEXT, data, offset)
+                offset += struct.calcsize(self.TEXT)
+                message = data[offset:offset + size].decode(errors='replace')
+                offset += size
+                yield self.entry(seconds, level, module_id, message)
+            
+            else:
+                raise ValueError(f"Registro desconhecido ({kind}) na posição {offset - 1}")
+    
+    def entry(self, seconds, level, module_id, message):
+        timestamp = self.epoch + timedelta(seconds=seconds)
+        module = self.modules.get(module_id, f'#{module_id}')
+        return timestamp, self.LEVELS.get(level, str(level)), module, message
+
+def collect(paths):
+    """Arquivos de log em ordem cronológica (rotacionados mais antigos primeiro)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in os.listdir(path) if '.jdl' in name)
+        else:
+            files.append(path)
+    
+    def age(path):
+        # jd_monitor.jdl.N[.gz]: maior N = mais antigo; .0 aguarda compressão
+        match = re.search(r'\.jdl\.(\d+)', path)
+        return -int(match.group(1)) if match else 1
+    
+    return sorted(files, key=age)
+
+def download(ip, port, dest, token=None):
+    """Baixa os arquivos de /logs do ESP32 para `dest`
+    
+    Os rotacionados mudam de nome a cada rotação e são baixados de novo;
+    o atual só cresce e é retomado com Range se o início local confere.
+    Fora do modo AP o ESP32 exige o token (auth_token.txt do dispositivo).
+    """
+    base = f"http://{ip}:{port}/logs"
+    headers = {'X-Auth-Token': token} if token else {}
+    with urlopen(Request(base, headers=headers), timeout=10) as response:
+        listing = json.load(response)
+    os.makedirs(dest, exist_ok=True)
+    
+    names = [entry['name'] for entry in listing['files']]
+    for name in os.listdir(dest):
+        if '.jdl' in name and name not in names:
+            os.remove(os.path.join(dest, name))  # Descartado pelo ESP32
+    
+    paths = []
+    for entry in listing['files']:
+        name = entry['name']
+        path = os.path.join(dest, name)
+        have = os.path.getsize(path) if os.path.exists(path) else 0
+        request = Request(f"{base}?file={name}", headers=headers)
+        overlap = 16
+        resume = name == listing['current'] and overlap <= have <= entry['size']
+        if resume:
+            # Sobreposição confirma que é o mesmo arquivo (não rotacionou)
+            request.add_header('Range', f'bytes={have - overlap}-')
+        
+        with urlopen(request, timeout=30) as response:
+            if response.status == 206:
+                with open(path, 'rb') as f:
+                    f.seek(have - overlap)
+                    same = f.read(overlap) == response.read(overlap)
+                if same:
+                    with open(path, 'ab') as f:
+                        shutil.copyfileobj(response, f)
+                    print(f"📥 {name}: +{os.path.getsize(path) - have} bytes", file=sys.stderr)
+                    paths.append(path)
+                    continue
+            else:
+                with open(path, 'wb') as f:
+                    shutil.copyfileobj(response, f)
+                print(f"📥 {name}: {os.path.getsize(path)} bytes", file=sys.stderr)
+                paths.append(path)
+                continue
+        
+        # Atual rotacionou desde o último download: baixa inteiro
+        request = Request(f"{base}?file={name}", headers=headers)
+        with urlopen(request, timeout=30) as response, open(path, 'wb') as f:
+            shutil.copyfileobj(response, f)
+        print(f"📥 {name}: {os.path.getsize(path)} bytes", file=sys.stderr)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Converte os logs binários do ESP32 (.jdl) em texto',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        help='Arquivos .jdl / .jdl.N.gz ou diretório logs copiado do ESP32'
+    )
+    parser.add_argument(
+        '-d', '--device',
+        help='IP do ESP32: baixa os logs por WiFi (/logs) antes de converter'
+    )
+    parser.add_argument(
+        '-p', '--port',
+        type=int,
+        default=8502,
+        help='Porta de dados (padrão: 8502)'
+    )
+    parser.add_argument(
+        '-t', '--token',
+        help='Token de autenticação do ESP32 (auth_token.txt), exigido fora do modo AP'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        default='logs_esp32',
+        help='Diretório dos logs baixados (padrão: logs_esp32)'
+    )
+    parser.add_argument(
+        '-l', '--level',
+        default='DEBUG',
+        choices=list(LogExpander.LEVELS.values()),
+        help='Nível mínimo exibido (padrão: DEBUG)'
+    )
+    parser.add_argument(
+        '-m', '--module',
+        action='append',
+        help='Módulo a exibir (ex: can); pode repetir'
+    )
+    
+    args = parser.parse_args()
+    if not args.paths and not args.device:
+        parser.error('informe arquivos de log ou --device')
+    levels = {name: value for value, name in LogExpander.LEVELS.items()}
+    min_level = levels[args.level]
+    
+    paths = list(args.paths)
+    if args.device:
+        try:
+            paths += download(args.device, args.port, args.output, args.token)
+        except OSError as e:
+            print(f"❌ Erro ao baixar logs: {e}", file=sys.stderr)
+            return
+    
+    for path in collect(paths):
+        expander = LogExpander()
+        try:
+            for timestamp, level, module, message in expander.parse(expander.read_file(path)):
+                if levels.get(level, 0) < min_level:
+                    continue
+                if args.module and module not in args.module:
+                    continue
+                print(f"{timestamp:%Y-%m-%d %H:%M:%S} {level:<8} [{module}] {message}")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"❌ {path}: {e}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from datetime import datetime
+
+import websocket
+
+# Formato binário do ESP32, o mesmo decodificado pelo app web
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web_app'))
+import wire_format
+
+class FrameMonitor:
+    # Configurações padrão
+    DEFAULT_PORT = 8502
+    
+    # Layout binário do ESP32 (ver WebServer._ws_loop)
+    BATCH_HEADER = wire_format.HEADER   # tipo (KIND_FRAMES), flags, quantidade, próxima sequência
+    RECORD = wire_format.RECORD         # timestamp (ms), ID 29 bits, DLC, dados
+    
+    def __init__(self, ip, port=DEFAULT_PORT, pgns=None):
+        self.url = f"ws://{ip}:{port}/ws"
+        self.pgns = pgns or []
+        self.ws = None
+        self.total = 0
+        self.overruns = 0
+    
+    @classmethod
+    def parse_batch(cls, payload):
+        """Decodifica lote binário em lista de (timestamp, can_id, dados)"""
+        kind, flags, count, next_seq = struct.unpack_from(cls.BATCH_HEADER, payload)
+        if kind != wire_format.KIND_FRAMES:
+            raise ValueError(f"Tipo de lote inesperado: {kind}")
+        
+        offset = struct.calcsize(cls.BATCH_HEADER)
+        size = struct.calcsize(cls.RECORD)
+        frames = []
+        for _ in range(count):
+            ts, can_id, dlc, data = struct.unpack_from(cls.RECORD, payload, offset)
+            frames.append((ts, can_id, data[:dlc]))
+            offset += size
+        return frames, bool(flags & wire_format.FLAG_OVERRUN), next_seq
+    
+    def connect(self):
+        """Conecta no WebSocket e envia filtros de PGN"""
+        try:
+            print(f"\n🔌 Conectando em {self.url}...")
+            self.ws = websocket.create_connection(self.url, timeout=10)
+            if self.pgns:
+                self.ws.send(json.dumps({'op': 'subscribe', 'pgns': self.pgns}))
+                print(f"📊 Filtro de PGNs: {', '.join(hex(p) for p in self.pgns)}")
+            print("✅ Conectado com sucesso!")
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao conectar: {e}")
+            return False
+    
+    def monitor(self, quiet=False):
+        """Recebe e imprime frames até Ctrl+C"""
+        print("\n📡 Recebendo frames... (Ctrl+C para parar)\n")
+        start = time.time()
+        try:
+            while True:
+                opcode, payload = self.ws.recv_data()
+                if opcode != websocket.ABNF.OPCODE_BINARY:
+                    continue
+                
+                frames, overrun, _ = self.parse_batch(payload)
+                if overrun:
+                    self.overruns += 1
+                    print("🟡 Frames perdidos no ESP32 (buffer sobrescrito)")
+                self.total += len(frames)
+                
+                if not quiet:
+                    for ts, can_id, data in frames:
+                        pgn = (can_id >> 8) & 0x1FFFF
+                        print(f"{ts:>10} {can_id:08X} PGN {pgn:05X} [{len(data)}] {data.hex(' ')}")
+        
+        except KeyboardInterrupt:
+            print("\n⛔ Monitoramento interrompido pelo usuário")
+        except Exception as e:
+            print(f"\n❌ Erro: {e}")
+        finally:
+            elapsed = max(time.time() - start, 1e-6)
+            print(f"📍 {self.total} frames em {elapsed:.1f}s ({self.total / elapsed:.0f} frames/s), "
+                  f"{self.overruns} lotes com perda")
+            if self.ws:
+                self.ws.close()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Monitor de frames CAN brutos via WebSocket',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('ip', help='IP do ESP32')
+    parser.add_argument(
+        '-p', '--port',
+        type=int,
+        default=FrameMonitor.DEFAULT_PORT,
+        help=f'Porta de dados (padrão: {FrameMonitor.DEFAULT_PORT})'
+    )
+    parser.add_argument(
+        '--pgn',
+        action='append',
+        type=lambda v: int(v, 0),
+        help='PGN a receber (ex: 0xF004); pode repetir'
+    )
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='Mostra apenas estatísticas'
+    )
+    
+    args = parser.parse_args()
+    
+    print("\n🚀 Monitor de Frames CAN")
+    print("=" * 50)
+    print(f"Início: {datetime.now().strftime('%H:%M:%S')}")
+    
+    monitor = FrameMonitor(args.ip, args.port, args.pgn)
+    if monitor.connect():
+        monitor.monitor(args.quiet)
+
+if __name__ == "__main__":
+    main()
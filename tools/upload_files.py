@@ -2,6 +2,8 @@ import sys
 import time
 import subprocess
 import os
+import gzip
+import tempfile
 from serial.tools import list_ports
 import serial
 
@@ -74,13 +76,42 @@ def flash_micropython(port):
         print(f"\nErro durante instalação: {e}")
         return False
 
+def compress_static_pages(build_dir):
+    """Gera em `build_dir` versões gzip das páginas web para servir direto da flash"""
+    pages = [
+        ("esp32/www/status.html", ":status.html.gz"),
+        ("esp32/www/config.html", ":config.html.gz")
+    ]
+    
+    files = []
+    for local, remote in pages:
+        with open(local, 'rb') as f:
+            data = f.read()
+        # mtime=0 mantém o arquivo idêntico entre builds (ETag estável)
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        target = os.path.join(build_dir, os.path.basename(remote[1:]))
+        with open(target, 'wb') as f:
+            f.write(compressed)
+        print(f"{os.path.basename(local)}: {len(data)} -> {len(compressed)} bytes (gzip)")
+        files.append((target, remote))
+    return files
+
 def transfer_files(port):
     """Transfere os arquivos Python para o ESP32"""
     try:
         # Lista de arquivos para transferir
         files = [
             ("esp32/main.py", ":main.py"),
+            ("esp32/boot_profile.py", ":boot_profile.py"),
             ("esp32/can_handler.py", ":can_handler.py"),
+            ("esp32/frame_buffer.py", ":frame_buffer.py"),
+            ("esp32/latest_values.py", ":latest_values.py"),
+            ("esp32/aggregates.py", ":aggregates.py"),
+            ("esp32/wire_format.py", ":wire_format.py"),
+            ("esp32/subscriptions.py", ":subscriptions.py"),
+            ("esp32/rate_limit.py", ":rate_limit.py"),
+            ("esp32/metrics.py", ":metrics.py"),
+            ("esp32/clock.py", ":clock.py"),
             ("esp32/wifi_manager.py", ":wifi_manager.py"),
             ("esp32/web_server.py", ":web_server.py"),
             ("esp32/j1939_decoder.py", ":j1939_decoder.py"),
@@ -99,20 +130,24 @@ def transfer_files(port):
                 print(f"- {f}")
             return False
         
-        # Transfere arquivos
-        print("\nTransferindo arquivos...")
-        for local, remote in files:
-            print(f"Enviando {os.path.basename(local)}...")
-            try:
-                subprocess.run([
-                    sys.executable, "-m", "mpremote",
-                    "connect", port,
-                    "cp", local, remote
-                ], check=True)
-                time.sleep(1)
-            except Exception as e:
-                print(f"Erro ao enviar {local}: {e}")
-                return False
+        # Páginas web comprimidas num diretório removido ao fim da transferência
+        with tempfile.TemporaryDirectory(prefix="jd_www_") as build_dir:
+            files += compress_static_pages(build_dir)
+        
+            # Transfere arquivos
+            print("\nTransferindo arquivos...")
+            for local, remote in files:
+                print(f"Enviando {os.path.basename(local)}...")
+                try:
+                    subprocess.run([
+                        sys.executable, "-m", "mpremote",
+                        "connect", port,
+                        "cp", local, remote
+                    ], check=True)
+                    time.sleep(1)
+                except Exception as e:
+                    print(f"Erro ao enviar {local}: {e}")
+                    return False
             
         print("\nTodos os arquivos transferidos com sucesso!")
         return True
@@ -1,10 +1,14 @@
 import streamlit as st
 import requests
 import json
+import threading
 import time
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
+from wire_format import WireDecoder, CONTENT_TYPE
+from udp_receiver import TelemetryReceiver
+from clock_sync import ClockSync, STAGES
 
 # Paleta de cores John Deere
 JOHN_DEERE_GREEN = "#367C2B"
@@ -16,10 +20,101 @@ JOHN_DEERE_LIGHT_YELLOW = "#FFD47F"
 BACKGROUND_COLOR = "#E8F0E7"  # Verde muito claro para fundo
 CARD_BACKGROUND = "#F5F9F5"   # Verde mais claro ainda para cards
 
+@st.cache_resource
+def get_udp_receiver(ip, data_port):
+    """Receptor UDP único por processo (a porta só pode ser aberta uma vez)"""
+    receiver = TelemetryReceiver.from_device(ip, data_port)
+    receiver.start()
+    return receiver
+
+class StreamReader:
+    """Lê o stream SSE do ESP32 em thread de fundo, guardando só o evento mais novo
+    
+    O ESP32 envia na taxa pedida e o Streamlit lê uma vez por reexecução:
+    lendo um evento por vez, os demais acumulariam no socket e o painel
+    mostraria dados cada vez mais antigos. Deltas de assinatura são
+    combinados ao chegar, para nenhum sinal se perder entre leituras.
+    """
+    
+    def __init__(self, response):
+        self.response = response
+        self.latest = None
+        self.last_event_id = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+    
+    def _read_loop(self):
+        """Lê eventos até o stream terminar"""
+        event_id = None
+        sent = None
+        lines = []
+        try:
+            for line in self.response.iter_lines(decode_unicode=True):
+                if not line:
+                    if lines:
+                        self._publish(event_id, sent, lines)
+                    event_id = None
+                    sent = None
+                    lines = []
+                    continue
+                if line.startswith(':'):
+                    continue  # Heartbeat
+                
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                if field == 'id':
+                    event_id = value
+                elif field == 'ticks':
+                    sent = int(value)
+                elif field == 'data':
+                    lines.append(value)
+            self.error = "Stream encerrado pelo ESP32"
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self._ready.set()
+    
+    def _publish(self, event_id, sent, lines):
+        """Substitui o evento mais novo (combinando deltas)"""
+        data = json.loads('\n'.join(lines))
+        data['sent_ticks'] = sent
+        data['received'] = time.time()
+        with self._lock:
+            if data.get('delta') and self.latest is not None:
+                data['signals'] = {**self.latest['signals'], **data['signals']}
+            self.latest = data
+            if event_id is not None:
+                self.last_event_id = event_id
+        self._ready.set()
+    
+    def read(self, timeout):
+        """Evento mais novo; espera o primeiro por até `timeout` segundos"""
+        if not self._ready.wait(timeout):
+            raise requests.exceptions.ConnectionError("Nenhum evento do ESP32")
+        if self.error is not None:
+            raise requests.exceptions.ConnectionError(self.error)
+        with self._lock:
+            return dict(self.latest)
+    
+    def close(self):
+        """Fecha a conexão (encerra a thread de leitura)"""
+        self.response.close()
+
 class JDMonitor:
     # Configurações
     ESP32_WEB_PORT = 8080
     ESP32_DATA_PORT = 8502
+    STREAM_READ_TIMEOUT = 30  # Maior que o heartbeat do ESP32 (15s)
+    FRAMES_PER_REQUEST = 200  # Máximo aceito por /frames
+    FRAME_LOG_SIZE = 1000
+    CLOCK_RESYNC_INTERVAL = 60  # s entre estimativas do relógio do ESP32 (deriva do cristal)
+    LATENCY_SAMPLES = 200
+    
+    # Sinais exibidos nos gauges e métricas (assinatura no ESP32)
+    DASHBOARD_SIGNALS = ['engine_speed', 'engine_temp', 'vehicle_speed', 'fuel_level']
     
     def __init__(self):
         # Configuração da página
@@ -40,6 +135,30 @@ class JDMonitor:
             st.session_state.esp32_ip = "192.168.4.1"
         if 'data_buffer' not in st.session_state:
             st.session_state.data_buffer = []
+        if 'stream' not in st.session_state:
+            st.session_state.stream = None
+        if 'last_event_id' not in st.session_state:
+            st.session_state.last_event_id = None
+        if 'wire_decoder' not in st.session_state:
+            st.session_state.wire_decoder = None
+        if 'last_snapshot' not in st.session_state:
+            st.session_state.last_snapshot = None
+        if 'http' not in st.session_state:
+            # Sessão reaproveita a conexão TCP (keep-alive) entre atualizações
+            st.session_state.http = requests.Session()
+        if 'subscription' not in st.session_state:
+            st.session_state.subscription = None
+            st.session_state.subscription_params = None
+        if 'stream_params' not in st.session_state:
+            st.session_state.stream_params = None
+        if 'clock_sync' not in st.session_state:
+            st.session_state.clock_sync = None
+            st.session_state.latency = []
+            st.session_state.latency_version = None
+        if 'frame_cursor' not in st.session_state:
+            st.session_state.frame_cursor = None
+            st.session_state.frame_log = []
+            st.session_state.frames_lost = 0
             
     def apply_theme(self):
         """Aplica tema John Deere"""
@@ -181,6 +300,42 @@ class JDMonitor:
                 value=1
             )
             
+            # Recebe dados por conexão persistente em vez de polling
+            self.use_stream = st.checkbox(
+                "Streaming (SSE)",
+                value=True,
+                help="Mantém uma conexão aberta com /stream em vez de uma requisição por atualização"
+            )
+            
+            # Assinatura: o ESP32 envia só os sinais exibidos
+            self.use_subscription = st.checkbox(
+                "Apenas sinais exibidos",
+                value=True,
+                help="Assina no ESP32 apenas os sinais dos gauges e recebe só o que mudou"
+            )
+            
+            # Telemetria publicada pelo ESP32 (WebServer.UDP_ENABLED)
+            self.use_udp = st.checkbox(
+                "Receber via UDP",
+                value=False,
+                help="Escuta os datagramas publicados pelo ESP32 na porta 8503; não gera requisições"
+            )
+            
+            # Todos os frames brutos desde a última atualização
+            self.show_frames = st.checkbox(
+                "Frames brutos",
+                value=False,
+                help="Busca em lote os frames recebidos entre atualizações (/frames)"
+            )
+            
+            # Formato binário compacto no polling de /data
+            self.use_binary = st.checkbox(
+                "Formato binário",
+                value=True,
+                disabled=self.use_stream,
+                help="Recebe /data em formato binário (esquema de sinais carregado uma vez)"
+            )
+            
     def test_connection(self, ip):
         """Testa conexão com ESP32"""
         try:
@@ -188,8 +343,15 @@ class JDMonitor:
             url = f"http://{ip}:{self.ESP32_DATA_PORT}/data"
             print(f"Tentando conectar em: {url}")  # Debug
             
-            response = requests.get(url, timeout=5)
+            response = st.session_state.http.get(url, timeout=5)
             if response.status_code == 200:
+                self.close_stream()
+                self.delete_subscription()  # Libera a vaga no ESP32 anterior
+                st.session_state.wire_decoder = None
+                st.session_state.frame_cursor = None
+                st.session_state.last_snapshot = None
+                st.session_state.clock_sync = None
+                st.session_state.latency = []
                 st.session_state.connected = True
                 st.session_state.esp32_ip = ip
                 st.success(f"✅ Conectado ao ESP32 em {ip}:{self.ESP32_DATA_PORT}")
@@ -216,38 +378,269 @@ class JDMonitor:
                 pgns.add(hex(data['pgn']))
         return list(pgns)
             
+    def get_subscription(self):
+        """Registra no ESP32 a assinatura dos sinais exibidos
+        
+        Reaproveitada enquanto taxa e sinais não mudam; se mudarem, a
+        anterior é removida e uma nova é registrada.
+        """
+        params = {'signals': self.DASHBOARD_SIGNALS, 'rate': 1 / self.update_rate}
+        if st.session_state.subscription is not None and st.session_state.subscription_params != params:
+            self.delete_subscription()
+        if st.session_state.subscription is None:
+            url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}/subscribe"
+            response = st.session_state.http.post(url, json=params, timeout=5)
+            response.raise_for_status()
+            st.session_state.subscription = response.json()['id']
+            st.session_state.subscription_params = params
+            st.session_state.last_snapshot = None
+        return st.session_state.subscription
+        
+    def delete_subscription(self):
+        """Remove a assinatura atual no ESP32 (se já expirou, basta esquecê-la)"""
+        if st.session_state.subscription is None:
+            return
+        url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}/subscribe"
+        try:
+            st.session_state.http.delete(url, params={'id': st.session_state.subscription}, timeout=5)
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao remover assinatura: {e}")  # Debug
+        st.session_state.subscription = None
+        
+    def open_stream(self):
+        """Abre conexão SSE com o ESP32, retomando do último evento recebido"""
+        self.close_stream()
+        url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}/stream"
+        headers = {}
+        params = {'rate': 1 / self.update_rate}
+        st.session_state.stream_params = self.stream_params()
+        if self.use_subscription:
+            params['sub'] = self.get_subscription()
+        elif st.session_state.last_event_id is not None:
+            headers['Last-Event-ID'] = st.session_state.last_event_id
+            
+        response = st.session_state.http.get(
+            url,
+            params=params,
+            headers=headers,
+            stream=True,
+            timeout=(5, self.STREAM_READ_TIMEOUT)
+        )
+        if response.status_code == 404 and 'sub' in params:
+            st.session_state.subscription = None  # Expirou ou ESP32 reiniciou
+        response.raise_for_status()
+        st.session_state.stream = StreamReader(response)
+        
+    def stream_params(self):
+        """Parâmetros do stream aberto (mudou algum, o stream é reaberto)"""
+        return 1 / self.update_rate, self.use_subscription
+        
+    def close_stream(self):
+        """Fecha conexão SSE, se houver"""
+        if st.session_state.stream is not None:
+            try:
+                st.session_state.stream.close()
+            except Exception:
+                pass
+            st.session_state.stream = None
+            
+    def read_stream_event(self):
+        """Retorna o evento SSE mais novo recebido pela thread de leitura"""
+        stream = st.session_state.stream
+        data = stream.read(self.STREAM_READ_TIMEOUT)
+        if stream.last_event_id is not None:
+            st.session_state.last_event_id = stream.last_event_id
+        return data
+        
+    def fetch_data(self):
+        """Obtém um snapshot via UDP, stream SSE ou, se desativados, via GET /data"""
+        if not self.use_subscription:
+            self.delete_subscription()  # Desmarcada na barra lateral: libera a vaga no ESP32
+        if self.use_udp:
+            self.close_stream()
+            receiver = get_udp_receiver(st.session_state.esp32_ip, self.ESP32_DATA_PORT)
+            stats = receiver.stats()
+            if stats['lost']:
+                print(f"Datagramas perdidos: {stats['lost']} ({stats['loss_pct']}%)")  # Debug
+            return dict(receiver.latest) if receiver.latest else None
+            
+        if self.use_stream:
+            # Taxa ou assinatura alterada na barra lateral: reabre o stream
+            if st.session_state.stream is None or st.session_state.stream_params != self.stream_params():
+                self.open_stream()
+            try:
+                return self.merge_delta(self.read_stream_event())
+            except Exception:
+                self.close_stream()
+                raise
+                
+        self.close_stream()
+        url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}/data"
+        headers = {}
+        params = {}
+        if self.use_binary:
+            self.load_schema()
+            headers['Accept'] = CONTENT_TYPE
+            
+        # Pede apenas o que mudou desde a última versão recebida
+        last = st.session_state.last_snapshot
+        if self.use_subscription:
+            params['sub'] = self.get_subscription()
+        elif last is not None and 'version' in last:
+            params['since'] = last['version']
+        if last is not None and last.get('etag'):
+            headers['If-None-Match'] = last['etag']
+            
+        response = st.session_state.http.get(url, params=params, headers=headers, timeout=2)
+        if response.status_code == 304:
+            return dict(last)
+        if response.status_code == 404 and 'sub' in params:
+            st.session_state.subscription = None  # Expirou ou ESP32 reiniciou
+            return None
+        if response.status_code != 200:
+            print(f"Erro ao obter dados: Status {response.status_code}")  # Debug
+            return None
+            
+        if response.headers.get('Content-Type') == CONTENT_TYPE:
+            data = st.session_state.wire_decoder.decode_snapshot(response.content)
+        else:
+            data = response.json()
+        sent = response.headers.get('X-Device-Ticks')
+        data['sent_ticks'] = int(sent) if sent is not None else None
+        data['etag'] = response.headers.get('ETag')
+        return self.merge_delta(data)
+            
+    def merge_delta(self, data):
+        """Combina snapshot delta com os sinais já conhecidos"""
+        last = st.session_state.last_snapshot
+        if data.get('delta') and last is not None:
+            data['signals'] = {**last.get('signals', {}), **data['signals']}
+        st.session_state.last_snapshot = data
+        return dict(data)
+        
+    def update_frames(self):
+        """Busca em lote todos os frames recebidos desde o último cursor"""
+        self.load_schema()
+        url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}/frames"
+        decoder = st.session_state.wire_decoder
+        
+        while True:
+            since = st.session_state.frame_cursor
+            params = {'max': self.FRAMES_PER_REQUEST}
+            if since is not None:
+                params['since'] = since
+            response = st.session_state.http.get(url, params=params, headers={'Accept': CONTENT_TYPE}, timeout=2)
+            response.raise_for_status()
+            
+            frames, overrun, next_seq = decoder.decode_frames(response.content)
+            if overrun and since is not None:
+                # Sem filtro os frames são contíguos: o primeiro tem seq next - count
+                st.session_state.frames_lost += max(0, next_seq - len(frames) - since)
+            st.session_state.frame_cursor = next_seq
+            st.session_state.frame_log.extend(frames)
+            
+            if len(frames) < self.FRAMES_PER_REQUEST:
+                break
+                
+        del st.session_state.frame_log[:-self.FRAME_LOG_SIZE]
+        
+    def render_frames(self):
+        """Renderiza últimos frames brutos"""
+        with st.expander(f"🧾 Frames brutos ({st.session_state.frames_lost} perdidos)"):
+            if st.session_state.frame_log:
+                df = pd.DataFrame(st.session_state.frame_log[-100:])
+                df['pgn'] = df['pgn'].apply(hex)
+                df['data'] = df['data'].apply(lambda d: bytes(d).hex(' '))
+                st.dataframe(df, use_container_width=True)
+            else:
+                st.info("Nenhum frame recebido")
+                
+    def load_schema(self):
+        """Carrega esquema de sinais do ESP32 (uma vez por conexão)"""
+        if st.session_state.wire_decoder is None:
+            url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}/schema"
+            response = st.session_state.http.get(url, timeout=5)
+            response.raise_for_status()
+            st.session_state.wire_decoder = WireDecoder(response.json())
+            
+    def sync_clock(self):
+        """Estima o relógio do ESP32 na conexão e a cada CLOCK_RESYNC_INTERVAL"""
+        sync = st.session_state.clock_sync
+        if sync is not None and time.time() - sync.estimated_at < self.CLOCK_RESYNC_INTERVAL:
+            return sync
+        url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}"
+        try:
+            sync = ClockSync().estimate(st.session_state.http, url)
+        except Exception as e:
+            # Firmware sem /time: só as etapas medidas no host
+            print(f"Erro ao estimar relógio do ESP32: {e}")  # Debug
+            sync = st.session_state.clock_sync or ClockSync()
+            sync.estimated_at = time.time()
+        st.session_state.clock_sync = sync
+        return sync
+        
     def update_data(self):
         """Atualiza dados do ESP32"""
         if not st.session_state.connected:
             return False
         
         try:
-            url = f"http://{st.session_state.esp32_ip}:{self.ESP32_DATA_PORT}/data"
-            response = requests.get(url, timeout=2)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Adiciona timestamp local
-                data['local_time'] = datetime.now().strftime('%H:%M:%S')
-                st.session_state.data_buffer.append(data)
+            sync = self.sync_clock()
+            data = self.fetch_data()
+            if data is None:
+                return False
                 
-                # Mantém buffer com tamanho máximo
-                if len(st.session_state.data_buffer) > 1000:
-                    st.session_state.data_buffer.pop(0)
-                return True
+            # Horário do frame no barramento (relógio do ESP32 convertido);
+            # sem estimativa do relógio, horário de recepção
+            data.setdefault('received', time.time())  # Stream: instante da chegada do evento
+            bus = sync.to_host((data.get('ticks') or {}).get('bus'), data['received'])
+            data['local_time'] = datetime.fromtimestamp(bus or data['received']).strftime('%H:%M:%S')
+            st.session_state.data_buffer.append(data)
             
-            else:
-                print(f"Erro ao obter dados: Status {response.status_code}")  # Debug
-                return False
+            # Mantém buffer com tamanho máximo
+            if len(st.session_state.data_buffer) > 1000:
+                st.session_state.data_buffer.pop(0)
+            return True
         
         except requests.exceptions.ConnectionError:
-            print(f"Erro de conexão com ESP32")  # Debug
+            print("Erro de conexão com ESP32")  # Debug
             st.session_state.connected = False  # Marca como desconectado
             return False
         except Exception as e:
             print(f"Erro ao atualizar dados: {e}")  # Debug
             return False
         
+    def record_latency(self, data):
+        """Registra a latência por etapa do último dado renderizado"""
+        if data.get('version') == st.session_state.latency_version:
+            return  # 304 ou heartbeat: dado já medido
+        st.session_state.latency_version = data.get('version')
+        sync = st.session_state.clock_sync
+        st.session_state.latency.append(sync.stages(
+            data.get('ticks'), data.get('sent_ticks'), data['received'], time.time()))
+        del st.session_state.latency[:-self.LATENCY_SAMPLES]
+        
+    def render_latency(self):
+        """Renderiza latência por etapa (barramento → tela)"""
+        sync = st.session_state.clock_sync
+        with st.expander("⏱️ Latência por etapa"):
+            if sync is None or sync.offset is None:
+                st.info("Relógio do ESP32 não estimado (/time indisponível)")
+            else:
+                origin = 'SNTP' if sync.synced else 'sem SNTP'
+                st.caption(f"Relógio do ESP32 estimado com RTT de {sync.rtt:.1f} ms "
+                           f"(erro ≤ {sync.rtt / 2:.1f} ms, {origin})")
+            if not st.session_state.latency:
+                st.info("Sem medições")
+                return
+            df = pd.DataFrame(st.session_state.latency, columns=STAGES)
+            summary = pd.DataFrame({
+                'último (ms)': df.iloc[-1],
+                'média (ms)': df.mean(),
+                'p95 (ms)': df.quantile(0.95)
+            }).round(1)
+            st.dataframe(summary, use_container_width=True)
+        
     def render_metrics(self, data):
         """Renderiza métricas principais"""
         try:
@@ -256,8 +649,8 @@ class JDMonitor:
                 st.warning("Aguardando dados do ESP32...")
                 return
             
-            # Extrai dados com segurança
-            can_data = data.get('data', {})
+            # Extrai dados com segurança (sinais decodificados, se disponíveis)
+            can_data = data.get('signals') or data.get('data') or {}
             if not can_data:
                 st.warning("Sem dados CAN disponíveis")
                 return
@@ -299,6 +692,8 @@ class JDMonitor:
             data = {}
             if 'data' in last_data and isinstance(last_data['data'], dict):
                 data = last_data['data']
+            if isinstance(last_data.get('signals'), dict):
+                data = {**data, **last_data['signals']}
             
             # Valores padrão para teste/desenvolvimento
             default_data = {
@@ -776,6 +1171,16 @@ class JDMonitor:
                     # Dados brutos (expansível)
                     with st.expander("🔍 Dados ISO BUS"):
                         st.json(st.session_state.data_buffer[-1])
+                        
+                    self.record_latency(st.session_state.data_buffer[-1])
+                    self.render_latency()
+                        
+                    if self.show_frames:
+                        try:
+                            self.update_frames()
+                        except Exception as e:
+                            print(f"Erro ao buscar frames: {e}")  # Debug
+                        self.render_frames()
                 else:
                     st.warning("⏳ Aguardando dados do ESP32...")
                 
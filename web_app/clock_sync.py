@@ -0,0 +1,77 @@
+import time
+
+# Relógio do ESP32 visto pelo host e latência por etapa (ver GET /time)
+
+STAGES = ('decodificação', 'envio', 'rede', 'renderização', 'total')
+
+class ClockSync:
+    """Estima o deslocamento entre os ticks_ms do ESP32 e o relógio do host
+    
+    Como no NTP: a leitura de /time corresponde ao ponto médio da ida e
+    volta da requisição. Vale a amostra de menor RTT, cujo erro é no
+    máximo RTT/2.
+    """
+    
+    SAMPLES = 8
+    
+    def __init__(self):
+        self.offset = None      # ms do host - ticks do ESP32
+        self.rtt = None
+        self.period = None
+        self.synced = False
+        self.estimated_at = None
+    
+    def estimate(self, session, base_url, samples=SAMPLES):
+        """Mede `samples` idas e voltas em /time e guarda a melhor"""
+        best = None
+        for _ in range(samples):
+            start = time.time() * 1000
+            response = session.get(f"{base_url}/time", timeout=2)
+            end = time.time() * 1000
+            response.raise_for_status()
+            status = response.json()
+            rtt = end - start
+            if best is None or rtt < best[0]:
+                best = (rtt, (start + end) / 2 - status['ticks'], status)
+        
+        self.rtt, self.offset, status = best
+        self.period = status['ticks_period']
+        self.synced = status['synced']
+        self.estimated_at = time.time()
+        return self
+    
+    def elapsed(self, start, end):
+        """Intervalo em ms entre dois ticks do ESP32 (com volta do contador)"""
+        return (end - start) % self.period
+    
+    def to_host(self, ticks, now=None):
+        """Converte ticks do ESP32 em horário do host (s desde a época)"""
+        if self.offset is None or ticks is None:
+            return None
+        now_ms = (now or time.time()) * 1000
+        host = ticks + self.offset
+        # O contador dá a volta a cada `period` ms: usa a volta mais próxima de agora
+        host += round((now_ms - host) / self.period) * self.period
+        return host / 1000
+    
+    def stages(self, ticks, sent, received, rendered):
+        """Latência (ms) de cada etapa: barramento → decodificação → envio
+        → recepção → renderização
+        
+        `ticks` é o campo de mesmo nome do snapshot, `sent` o X-Device-Ticks
+        da resposta e `received`/`rendered` horários do host. Etapas sem
+        dados (ex.: formato binário não traz `ticks`) ficam None.
+        """
+        result = dict.fromkeys(STAGES)
+        bus = decoded = None
+        if ticks and self.period:
+            bus, decoded = ticks['bus'], ticks['decoded']
+            result['decodificação'] = self.elapsed(bus, decoded)
+        if decoded is not None and sent is not None:
+            result['envio'] = self.elapsed(decoded, sent)
+        if sent is not None and self.offset is not None:
+            result['rede'] = (received - self.to_host(sent, received)) * 1000
+        result['renderização'] = (rendered - received) * 1000
+        if bus is not None and self.offset is not None:
+            result['total'] = (rendered - self.to_host(bus, received)) * 1000
+        return result
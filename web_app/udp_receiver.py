@@ -0,0 +1,144 @@
+import argparse
+import socket
+import struct
+import threading
+import time
+
+import requests
+
+from wire_format import (WireDecoder, DATAGRAM_HEADER, DATAGRAM_HEADER_SIZE,
+                         KIND_FRAMES, KIND_SNAPSHOT)
+
+class TelemetryReceiver:
+    """Recebe datagramas UDP publicados pelo ESP32 e detecta perdas"""
+    
+    DEFAULT_PORT = 8503
+    
+    def __init__(self, schema, port=DEFAULT_PORT, group=None):
+        self.decoder = WireDecoder(schema)
+        self.port = port
+        self.group = group
+        self.sock = None
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        
+        # Estado e estatísticas
+        self.latest = None
+        self.frames = []
+        self.received = 0
+        self.lost = 0
+        self.device_overruns = 0
+        self.last_seq = None
+        self.last_time = None
+    
+    @classmethod
+    def from_device(cls, ip, data_port=8502, **kwargs):
+        """Cria receptor com o esquema de sinais lido do ESP32"""
+        response = requests.get(f"http://{ip}:{data_port}/schema", timeout=5)
+        response.raise_for_status()
+        return cls(response.json(), **kwargs)
+    
+    def open(self):
+        """Abre socket UDP e entra no grupo multicast, se configurado"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('', self.port))
+        if self.group:
+            membership = struct.pack('4s4s', socket.inet_aton(self.group),
+                                     socket.inet_aton('0.0.0.0'))
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sock.settimeout(1)
+    
+    def start(self):
+        """Inicia recepção em thread de fundo"""
+        if self._thread is None:
+            self.open()
+            self._running = True
+            self._thread = threading.Thread(target=self._receive_loop, daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        """Para recepção e fecha socket"""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+    
+    def _receive_loop(self):
+        """Loop de recepção de datagramas"""
+        while self._running:
+            try:
+                payload, _ = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                self.handle_datagram(payload)
+            except Exception as e:
+                print(f"Datagrama inválido: {e}")  # Debug
+    
+    def handle_datagram(self, payload):
+        """Processa um datagrama, atualizando contadores de perda"""
+        seq, = struct.unpack_from(DATAGRAM_HEADER, payload)
+        message = payload[DATAGRAM_HEADER_SIZE:]
+        kind = self.decoder.decode_header(message)[0]
+        
+        with self._lock:
+            if self.last_seq is not None:
+                gap = (seq - self.last_seq - 1) & 0xFFFFFFFF
+                # Lacuna "negativa" indica que o ESP32 reiniciou: recomeça a contagem
+                if gap < 0x80000000:
+                    self.lost += gap
+            self.last_seq = seq
+            self.received += 1
+            self.last_time = time.time()
+            
+            if kind == KIND_SNAPSHOT:
+                self.latest = self.decoder.decode_snapshot(message)
+            elif kind == KIND_FRAMES:
+                frames, overrun, _ = self.decoder.decode_frames(message)
+                if overrun:
+                    self.device_overruns += 1
+                self.frames.extend(frames)
+                del self.frames[:-1000]
+    
+    def stats(self):
+        """Retorna estatísticas de recepção"""
+        with self._lock:
+            total = self.received + self.lost
+            return {
+                'received': self.received,
+                'lost': self.lost,
+                'loss_pct': round(100 * self.lost / total, 2) if total else 0.0,
+                'device_overruns': self.device_overruns,
+                'last_seq': self.last_seq,
+                'age': round(time.time() - self.last_time, 1) if self.last_time else None
+            }
+
+def main():
+    parser = argparse.ArgumentParser(description='Receptor de telemetria UDP do ESP32')
+    parser.add_argument('ip', help='IP do ESP32 (para ler o esquema)')
+    parser.add_argument('-p', '--port', type=int, default=TelemetryReceiver.DEFAULT_PORT,
+                        help=f'Porta UDP (padrão: {TelemetryReceiver.DEFAULT_PORT})')
+    parser.add_argument('-g', '--group', help='Grupo multicast (ex: 239.10.0.1)')
+    args = parser.parse_args()
+    
+    receiver = TelemetryReceiver.from_device(args.ip, port=args.port, group=args.group)
+    receiver.start()
+    print(f"📡 Recebendo na porta UDP {args.port}... (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(1)
+            print(receiver.stats(), receiver.latest and receiver.latest['signals'])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.stop()
+
+if __name__ == "__main__":
+    main()
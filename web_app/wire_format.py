@@ -0,0 +1,91 @@
+import struct
+
+# Decodificador do formato binário do ESP32 (ver esp32/wire_format.py)
+
+CONTENT_TYPE = 'application/x-jd-bin'
+
+HEADER = '<BBHI'
+RECORD = '<IIB8s'
+SIGNAL = '<Bf'
+DATAGRAM_HEADER = '<I'
+
+KIND_FRAMES = 1
+KIND_SNAPSHOT = 2
+
+FLAG_OVERRUN = 0x01
+FLAG_FRAME = 0x02
+FLAG_DELTA = 0x04
+
+ENUM_UNKNOWN = 255
+
+HEADER_SIZE = struct.calcsize(HEADER)
+RECORD_SIZE = struct.calcsize(RECORD)
+SIGNAL_SIZE = struct.calcsize(SIGNAL)
+DATAGRAM_HEADER_SIZE = struct.calcsize(DATAGRAM_HEADER)
+
+class WireDecoder:
+    """Converte mensagens binárias do ESP32 para o mesmo formato do JSON"""
+    
+    def __init__(self, schema):
+        self.signals = {s['id']: s for s in schema['signals']}
+    
+    @staticmethod
+    def decode_header(payload):
+        """Retorna (tipo, flags, quantidade, valor de 32 bits)"""
+        return struct.unpack_from(HEADER, payload)
+    
+    @staticmethod
+    def decode_record(payload, offset):
+        """Decodifica registro de frame bruto em dicionário"""
+        ts, can_id, dlc, data = struct.unpack_from(RECORD, payload, offset)
+        return {
+            'pgn': (can_id >> 8) & 0x1FFFF,
+            'source': can_id & 0xFF,
+            'priority': (can_id >> 26) & 0x07,
+            'timestamp': ts,
+            'data': list(data[:dlc])
+        }
+    
+    def decode_frames(self, payload):
+        """Decodifica lote de frames, retornando (frames, houve perda, próxima sequência)"""
+        kind, flags, count, next_seq = self.decode_header(payload)
+        if kind != KIND_FRAMES:
+            raise ValueError(f"Tipo de mensagem inesperado: {kind}")
+        
+        frames = [self.decode_record(payload, HEADER_SIZE + i * RECORD_SIZE)
+                  for i in range(count)]
+        return frames, bool(flags & FLAG_OVERRUN), next_seq
+    
+    def decode_snapshot(self, payload):
+        """Decodifica snapshot no mesmo formato da resposta JSON de /data"""
+        kind, flags, count, version = self.decode_header(payload)
+        if kind != KIND_SNAPSHOT:
+            raise ValueError(f"Tipo de mensagem inesperado: {kind}")
+        
+        timestamp, = struct.unpack_from('<I', payload, HEADER_SIZE)
+        offset = HEADER_SIZE + 4
+        data = self.decode_record(payload, offset) if flags & FLAG_FRAME else None
+        offset += RECORD_SIZE
+        
+        signals = {}
+        for _ in range(count):
+            signal_id, value = struct.unpack_from(SIGNAL, payload, offset)
+            offset += SIGNAL_SIZE
+            signal = self.signals.get(signal_id)
+            if signal is None:
+                continue  # Sinal mais novo que o esquema carregado
+            
+            if 'enum' in signal:
+                index = int(value)
+                value = signal['enum'][index] if index != ENUM_UNKNOWN else 'Unknown'
+            else:
+                value = round(value, 3)
+            signals[signal['name']] = value
+        
+        return {
+            'timestamp': timestamp,
+            'version': version,
+            'delta': bool(flags & FLAG_DELTA),
+            'data': data,
+            'signals': signals
+        }